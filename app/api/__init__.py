@@ -1,3 +1,10 @@
 from .upload import router as upload_router
+from .batch import router as batch_router
+from .threads import router as threads_router
+from .rules import router as rules_router
+from .history import router as history_router
+from .near_duplicates import router as near_duplicates_router
+from .jobs import router as jobs_router
+from .admin import router as admin_router
 
-__all__ = ['upload_router'] 
\ No newline at end of file
+__all__ = ['upload_router', 'batch_router', 'threads_router', 'rules_router', 'history_router', 'near_duplicates_router', 'jobs_router', 'admin_router']
\ No newline at end of file
@@ -0,0 +1,52 @@
+import asyncio
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+
+from ..config import settings
+from ..profiling import stack_sampler
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+def require_admin(token: Optional[str]):
+    if not settings.admin_token:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Admin options are disabled.")
+    if not token or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="A valid X-Admin-Token header is required.")
+
+
+@router.post("/sampler")
+async def start_sampler(
+    seconds: float = Query(30.0, gt=0),
+    interval: Optional[float] = Query(None, ge=0.001, le=1.0),
+    x_admin_token: Optional[str] = Header(None)
+):
+    # Samples this worker only; under the prefork server each worker has its
+    # own sampler, and the response says which one answered.
+    require_admin(x_admin_token)
+    if not stack_sampler.start(seconds, interval):
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail="The sampler is already running in this worker.")
+    return stack_sampler.stats()
+
+
+@router.get("/sampler")
+async def get_sampler(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return stack_sampler.stats()
+
+
+@router.delete("/sampler")
+async def stop_sampler(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    await asyncio.to_thread(stack_sampler.stop)
+    return stack_sampler.stats()
+
+
+@router.get("/sampler/stacks", response_class=PlainTextResponse)
+async def get_sampler_stacks(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return PlainTextResponse(stack_sampler.collapsed(), headers={"X-Sampler-Pid": str(stack_sampler.stats()["pid"])})
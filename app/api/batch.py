@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.status import HTTP_400_BAD_REQUEST
+
+from ..audit.executor import audit_executor
+from ..audit.pipeline import auditor, audit_eml_bytes, EMLParseError
+from ..parser.sources import MessageRef, read_message
+from ..rules.plans import ExecutionPlan
+from .upload import VIEW_PATTERN, resolve_plan
+from .ingest import spool_batch
+
+router = APIRouter(prefix="/api/v1", tags=["audit"])
+
+
+def _result_line(index: int, filename: str, report: bytes) -> bytes:
+    # The report is already JSON; splice it in instead of decoding it.
+    return b'{"index": %d, "filename": %s, "report": %s}\n' % (index, json.dumps(filename).encode("utf-8"), report)
+
+
+def _error_line(index: int, filename: str, error: str) -> bytes:
+    return json.dumps({"index": index, "filename": filename, "error": error}).encode("utf-8") + b"\n"
+
+
+async def _audit_one(index: int, ref: MessageRef, view: str, plan: ExecutionPlan,
+                     selection: Tuple[Optional[str], Optional[Sequence[str]]], limiter: asyncio.Semaphore) -> bytes:
+    # Messages are read from disk under the limiter so a batch only holds
+    # the ones being audited in memory.
+    filename = ref.source_id
+    async with limiter:
+        try:
+            content = await asyncio.to_thread(read_message, ref)
+        except OSError as e:
+            return _error_line(index, filename, f"Failed to read message: {str(e)}")
+        digest = hashlib.sha256(content).hexdigest()
+        report = auditor.get_cached_report(digest, plan)
+        if report is not None:
+            return _result_line(index, filename, report.view(view))
+
+        try:
+            report = await audit_executor.run(audit_eml_bytes, content, digest, *selection, wait=True)
+            auditor.cache_report(digest, report, plan)
+            return _result_line(index, filename, report.view(view))
+        except EMLParseError as e:
+            return _error_line(index, filename, f"Failed to parse EML: {str(e)}")
+        except Exception as e:
+            return _error_line(index, filename, f"Audit failed: {str(e)}")
+
+
+async def _stream_results(refs: List[MessageRef], view: str, plan: ExecutionPlan,
+                         selection: Tuple[Optional[str], Optional[Sequence[str]]]) -> AsyncIterator[bytes]:
+    # Keep one batch from occupying the whole admission queue so interactive
+    # requests can still get in.
+    limiter = asyncio.Semaphore(audit_executor.max_workers)
+    tasks = [
+        asyncio.create_task(_audit_one(index, ref, view, plan, selection, limiter))
+        for index, ref in enumerate(refs)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/audit/batch")
+async def audit_batch(
+    files: List[UploadFile] = File(...),
+    view: str = Query("full", pattern=VIEW_PATTERN),
+    profile: Optional[str] = Query(None),
+    rules: Optional[str] = Query(None)
+):
+    plan, rule_names = resolve_plan(profile, rules)
+    batch = await spool_batch(files)
+    if not batch.refs:
+        batch.close()
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="No .eml messages found in upload.")
+    # The background task runs once the stream ends or the client goes away.
+    return StreamingResponse(
+        _stream_results(batch.refs, view, plan, (profile, rule_names)),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(batch.close)
+    )
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette.status import HTTP_404_NOT_FOUND
+
+from ..history import history_store
+
+router = APIRouter(prefix="/api/v1/history", tags=["history"])
+
+PERIOD_PATTERN = "^(day|week|month)$"
+
+
+def _require_history():
+    if not history_store.path:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Audit history is disabled.")
+
+
+@router.get("/rules")
+async def rule_history(
+    period: str = Query("week", pattern=PERIOD_PATTERN),
+    rule: Optional[str] = None,
+    domain: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    by_domain: bool = True
+):
+    _require_history()
+    return {
+        "period": period,
+        "stats": await asyncio.to_thread(history_store.rule_stats, period, rule, domain, since, until, by_domain)
+    }
+
+
+@router.get("/audits")
+async def audit_history(
+    period: str = Query("week", pattern=PERIOD_PATTERN),
+    domain: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    by_domain: bool = False
+):
+    _require_history()
+    return {
+        "period": period,
+        "stats": await asyncio.to_thread(history_store.audit_stats, period, domain, since, until, by_domain)
+    }
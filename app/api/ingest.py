@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, UploadFile
+from loguru import logger
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+from ..config import settings
+from ..parser.sources import ArchiveTooLargeError, MessageRef, detect_source_kind, extract_zip_messages, iter_path_refs
+
+
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class UploadTooLargeError(Exception):
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit} byte limit")
+        self.limit = limit
+
+
+class InFlightBytesExceededError(Exception):
+    pass
+
+
+class ByteBudget:
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: int):
+        with self._lock:
+            if self._used + amount > self.limit:
+                raise InFlightBytesExceededError(
+                    f"In-flight upload bytes would exceed {self.limit}"
+                )
+            self._used += amount
+
+    def release(self, amount: int):
+        with self._lock:
+            self._used -= amount
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+
+inflight_bytes = ByteBudget(settings.max_inflight_bytes)
+
+
+class SpooledUpload:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def add_chunk(self, chunk: bytes):
+        self.size += len(chunk)
+        self._sha256.update(chunk)
+
+    @property
+    def digest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+@asynccontextmanager
+async def spool_upload(upload: UploadFile) -> AsyncIterator[SpooledUpload]:
+    max_bytes = settings.max_upload_bytes
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    # The request body already counts against the in-flight budget, which
+    # UploadLimitMiddleware charges as it arrives.
+    fd, path = tempfile.mkstemp(prefix="eml-upload-", suffix=".eml")
+    spooled = SpooledUpload(path)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(settings.upload_chunk_bytes)
+                if not chunk:
+                    break
+                if spooled.size + len(chunk) > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                spooled.add_chunk(chunk)
+                out.write(chunk)
+        yield spooled
+    finally:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"Failed to remove spooled upload {path}: {str(e)}")
+
+
+async def save_upload(upload: UploadFile, path: str, max_bytes: int) -> int:
+    # For uploads kept on disk past the request, such as job inputs; they do
+    # not count against the in-flight budget.
+    size = 0
+    with open(path, "wb") as out:
+        while True:
+            chunk = await upload.read(settings.upload_chunk_bytes)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            out.write(chunk)
+    return size
+
+
+def stored_name(index: int, filename: str, kind: str) -> str:
+    # iter_path_refs picks the reader by extension, so the name must carry it.
+    name = UNSAFE_NAME.sub("_", os.path.basename(filename or "upload"))
+    extension = f".{kind}"
+    if kind != "zip" and not name.lower().endswith(extension):
+        name += extension
+    return f"{index:04d}-{name}"
+
+
+async def store_uploads(files: List[UploadFile], directory: str, max_bytes: int) -> List[Tuple[str, str]]:
+    # max_bytes covers all the files together.
+    uploads = []
+    remaining = max_bytes
+    for index, upload in enumerate(files):
+        head = await upload.read(5)
+        await upload.seek(0)
+        path = os.path.join(directory, stored_name(index, upload.filename, detect_source_kind(upload.filename, head)))
+        remaining -= await save_upload(upload, path, remaining)
+        uploads.append((path, os.path.basename(upload.filename or "upload")))
+    return uploads
+
+
+def collect_message_refs(uploads: List[Tuple[str, str]], directory: str, max_extracted_bytes: int) -> List[MessageRef]:
+    # Sources are named after the upload, not the file it was stored in:
+    # "c.zip/f1.eml", "box.mbox#3" or "a.eml".
+    refs = []
+    remaining = max_extracted_bytes
+    for path, name in uploads:
+        if path.lower().endswith(".zip"):
+            extracted = extract_zip_messages(path, os.path.join(directory, os.path.basename(path)[:-4]), remaining)
+            os.unlink(path)
+            for target, member in extracted:
+                refs.append(MessageRef(f"{name}/{member}", target))
+                remaining -= os.path.getsize(target)
+            continue
+        refs.extend(ref._replace(source_id=name + ref.source_id[len(path):]) for ref in iter_path_refs(path))
+    return refs
+
+
+class SpooledBatch:
+
+    def __init__(self, directory: str, refs: List[MessageRef]):
+        self.directory = directory
+        self.refs = refs
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+async def spool_batch(files: List[UploadFile]) -> SpooledBatch:
+    # Messages of /audit/batch and /threads stay on disk and are read one at
+    # a time while they are audited.
+    directory = tempfile.mkdtemp(prefix="eml-batch-")
+    try:
+        uploads = await store_uploads(files, directory, settings.max_batch_upload_bytes)
+        refs = await asyncio.to_thread(collect_message_refs, uploads, directory, settings.max_batch_extracted_bytes)
+    except (UploadTooLargeError, ArchiveTooLargeError) as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Failed to read upload: {str(e)}")
+    return SpooledBatch(directory, refs)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import shutil
+from typing import List, Optional
+
+from fastapi import APIRouter, Request, UploadFile, File, Header, HTTPException, Query
+from fastapi.responses import Response
+from starlette.status import (
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+)
+
+from ..config import settings
+from ..jobs import PRIORITIES, job_store
+from ..parser.sources import ArchiveTooLargeError
+from .ingest import UploadTooLargeError, collect_message_refs, store_uploads
+from .upload import VIEW_PATTERN, resolve_plan
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+PRIORITY_PATTERN = f"^({'|'.join(PRIORITIES)})$"
+
+
+def _require_jobs():
+    if not settings.jobs_db_path:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="The job API is disabled.")
+
+
+@router.post("", status_code=HTTP_202_ACCEPTED)
+async def create_job(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    priority: str = Query("normal", pattern=PRIORITY_PATTERN),
+    profile: Optional[str] = Query(None),
+    rules: Optional[str] = Query(None),
+    x_client_id: Optional[str] = Header(None)
+):
+    _require_jobs()
+    _, rule_names = resolve_plan(profile, rules)
+    # X-Client-Id is not authenticated, so the concurrency cap is keyed on
+    # the peer address as well; the header only tells apart callers behind
+    # one address.
+    address = request.client.host if request.client else "anonymous"
+    client = f"{address}/{x_client_id}" if x_client_id else address
+
+    job_id = job_store.new_job_id()
+    directory = job_store.job_directory(job_id)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        uploads = await store_uploads(files, directory, settings.job_max_upload_bytes)
+        refs = await asyncio.to_thread(collect_message_refs, uploads, directory, settings.job_max_extracted_bytes)
+        if not refs:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="No .eml messages found in upload.")
+        total = await asyncio.to_thread(job_store.create_job, job_id, client, PRIORITIES[priority], refs, profile, rule_names)
+    except (UploadTooLargeError, ArchiveTooLargeError) as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except HTTPException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Failed to read upload: {str(e)}")
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "priority": priority,
+        "total": total,
+        "status_url": f"/api/v1/jobs/{job_id}",
+        "results_url": f"/api/v1/jobs/{job_id}/results"
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    _require_jobs()
+    job = await asyncio.to_thread(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    job["results_url"] = f"/api/v1/jobs/{job_id}/results"
+    return job
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    view: str = Query("full", pattern=VIEW_PATTERN)
+):
+    _require_jobs()
+    job = await asyncio.to_thread(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    rows = await asyncio.to_thread(job_store.results, job_id, offset, limit, view)
+
+    items = []
+    for seq, source_id, status, report, error in rows:
+        source = json.dumps(source_id).encode("utf-8")
+        if status == "done":
+            # Stored reports are JSON already; splice them in as /audit/batch does.
+            items.append(b'{"index": %d, "source": %s, "report": %s}' % (seq, source, report))
+        else:
+            items.append(json.dumps({
+                "index": seq,
+                "source": source_id,
+                "error": error or "Job cancelled before this message was audited"
+            }).encode("utf-8"))
+    next_offset = rows[-1][0] + 1 if rows else offset
+    body = b'{"job_id": %s, "status": %s, "offset": %d, "next_offset": %d, "total": %d, "results": [%s]}' % (
+        json.dumps(job_id).encode("utf-8"), json.dumps(job["status"]).encode("utf-8"),
+        offset, next_offset, job["progress"]["total"], b", ".join(items)
+    )
+    return Response(content=body, media_type="application/json")
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    _require_jobs()
+    if not await asyncio.to_thread(job_store.cancel, job_id):
+        job = await asyncio.to_thread(job_store.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=f"Job '{job_id}' is already {job['status']}.")
+    return await asyncio.to_thread(job_store.get_job, job_id)
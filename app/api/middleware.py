@@ -0,0 +1,108 @@
+import time
+from typing import Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.status import HTTP_413_REQUEST_ENTITY_TOO_LARGE, HTTP_503_SERVICE_UNAVAILABLE
+
+from ..config import settings
+from ..metrics import stage_duration
+from .ingest import InFlightBytesExceededError, inflight_bytes
+
+
+class RequestTimingMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Endpoints read this back to time multipart form parsing, which
+        # FastAPI finishes before the handler runs.
+        started = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = started
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is not None:
+                stage_duration.observe(time.perf_counter() - started, stage=f"request:{path}")
+
+
+# Room for the multipart boundaries and part headers around a file that is
+# exactly at its limit.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _body_limit(path: str) -> Tuple[int, bool]:
+    # (largest request body, whether it counts against the in-flight
+    # budget). Job uploads are stored for later rather than held in flight.
+    if path.startswith("/api/v1/jobs"):
+        return settings.job_max_upload_bytes, False
+    if path.startswith(("/api/v1/audit/batch", "/api/v1/threads")):
+        return settings.max_batch_upload_bytes, True
+    return settings.max_upload_bytes, True
+
+
+class UploadLimitMiddleware:
+
+    # Enforces the upload limits on the raw body while it arrives, before
+    # the multipart parser has buffered it: an oversized upload is refused
+    # on its Content-Length, or cut off at the limit, rather than received
+    # in full and rejected afterwards.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit, budgeted = _body_limit(scope["path"])
+        limit += MULTIPART_OVERHEAD_BYTES
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                response = JSONResponse(
+                    {"detail": f"Upload exceeds the {limit} byte limit"},
+                    status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+                await response(scope, receive, send)
+                return
+
+        received = 0
+        held = 0
+
+        async def limited_receive():
+            nonlocal received, held
+            message = await receive()
+            if message["type"] == "http.request":
+                size = len(message.get("body", b""))
+                received += size
+                if received > limit:
+                    raise HTTPException(
+                        status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Upload exceeds the {limit} byte limit"
+                    )
+                if budgeted and size:
+                    try:
+                        inflight_bytes.acquire(size)
+                    except InFlightBytesExceededError:
+                        raise HTTPException(
+                            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Too much upload data is being processed, please retry later.",
+                            headers={"Retry-After": str(settings.retry_after_seconds)}
+                        )
+                    held += size
+            return message
+
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            # Held until the response is done, streamed responses included,
+            # as the body or copies of it live that long.
+            inflight_bytes.release(held)
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette.status import HTTP_404_NOT_FOUND
+
+from ..dedup import near_dup_index
+
+router = APIRouter(prefix="/api/v1/near-duplicates", tags=["near-duplicates"])
+
+
+@router.get("/clusters")
+async def near_duplicate_clusters(
+    window: Optional[float] = Query(None, gt=0, description="Seconds to look back; defaults to the index window"),
+    min_size: int = Query(2, ge=1),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    if not near_dup_index.enabled:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Near-duplicate detection is disabled.")
+    return {
+        "window_seconds": window if window is not None else near_dup_index.window_seconds,
+        "clusters": near_dup_index.clusters(window, min_size, limit)
+    }
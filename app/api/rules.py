@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header
+
+from .admin import require_admin
+from ..rules.plans import UnknownRuleError
+from ..rules.registry import RuleSet, rule_registry
+
+router = APIRouter(prefix="/api/v1", tags=["rules"])
+
+
+def _describe_profile(ruleset: RuleSet, name: str) -> Dict[str, Any]:
+    try:
+        plan = ruleset.plan(name)
+    except UnknownRuleError as e:
+        return {"name": name, "error": str(e)}
+    return {
+        "name": name,
+        "description": ruleset.profiles[name].get("description", ""),
+        "rules": plan.rule_names,
+        "weights": plan.weights,
+        "fields": sorted(plan.fields)
+    }
+
+
+def _describe(ruleset: RuleSet) -> Dict[str, Any]:
+    return {
+        "fingerprint": ruleset.fingerprint,
+        "generation": rule_registry.generation,
+        "rules": [
+            {
+                "name": rule.name,
+                "description": rule.description,
+                "weight": rule.weight,
+                "default_enabled": rule.default_enabled,
+                "required_fields": sorted(rule.required_fields)
+            }
+            for rule in ruleset.rules.values()
+        ],
+        "profiles": [_describe_profile(ruleset, name) for name in ruleset.profiles]
+    }
+
+
+@router.get("/rules")
+async def list_rules():
+    return _describe(rule_registry.ruleset)
+
+
+@router.post("/rules/reload")
+async def reload_rules(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    # Importing modules and compiling patterns happens off the event loop;
+    # audits keep using the previous rule set until the swap.
+    ruleset = await asyncio.get_running_loop().run_in_executor(None, rule_registry.reload)
+    return _describe(ruleset)
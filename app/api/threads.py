@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.status import HTTP_404_NOT_FOUND
+
+from ..audit.executor import audit_executor
+from ..audit.pipeline import auditor, audit_eml_bytes
+from ..audit.report import RenderedReport
+from ..models import HeaderFields
+from ..parser import EMLParser
+from ..parser.sources import MessageRef, read_message
+from ..threads import thread_index
+from ..threads.index import normalize_message_id
+from .ingest import spool_batch
+
+router = APIRouter(prefix="/api/v1", tags=["threads"])
+
+header_parser = EMLParser()
+
+
+def _require_threads():
+    if not thread_index.path:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="The thread API is disabled.")
+
+
+async def _audit_new_message(ref: MessageRef, digest: str, limiter: asyncio.Semaphore) -> RenderedReport:
+    report = auditor.get_cached_report(digest)
+    if report is None:
+        async with limiter:
+            content = await asyncio.to_thread(read_message, ref)
+            report = await audit_executor.run(audit_eml_bytes, content, digest, wait=True)
+        auditor.cache_report(digest, report)
+    return report
+
+
+@router.post("/threads")
+async def audit_threads(files: List[UploadFile] = File(...)):
+    _require_threads()
+    batch = await spool_batch(files)
+    try:
+        return await _audit_thread_messages(batch.refs)
+    finally:
+        batch.close()
+
+
+async def _audit_thread_messages(refs: List[MessageRef]) -> JSONResponse:
+    # Messages are read once here for their headers and again when audited,
+    # so only the ones being worked on are held in memory.
+    pending = []
+    errors = []
+    reused = []
+    seen = set()
+    for index, ref in enumerate(refs):
+        filename = ref.source_id
+        content = await asyncio.to_thread(read_message, ref)
+        digest = hashlib.sha256(content).hexdigest()
+        try:
+            headers = header_parser.parse_eml_headers(content)
+        except Exception as e:
+            errors.append({"index": index, "filename": filename, "error": f"Failed to parse EML: {str(e)}"})
+            continue
+
+        message_id = normalize_message_id(headers.get('message-id')) or f"<{digest}@email-audit-service>"
+        if message_id in seen or await asyncio.to_thread(thread_index.has_message, message_id):
+            reused.append(message_id)
+            continue
+        seen.add(message_id)
+        pending.append((index, filename, ref, digest, message_id, headers))
+
+    limiter = asyncio.Semaphore(audit_executor.max_workers)
+    results = await asyncio.gather(
+        *(_audit_new_message(ref, digest, limiter) for _, _, ref, digest, _, _ in pending),
+        return_exceptions=True
+    )
+
+    audited = []
+    for (index, filename, _, _, message_id, headers), report in zip(pending, results):
+        if isinstance(report, BaseException):
+            errors.append({"index": index, "filename": filename, "error": f"Audit failed: {str(report)}"})
+            continue
+        audited.append((message_id, headers, report.full))
+
+    threads = await asyncio.to_thread(_index_messages, audited, reused)
+    return JSONResponse(content={
+        "threads": threads,
+        "reused_messages": reused,
+        "errors": errors
+    })
+
+
+def _index_messages(audited: List[Tuple[str, HeaderFields, bytes]], reused: List[str]) -> List[Dict[str, Any]]:
+    # Runs in a thread: every call here is a SQLite round trip.
+    for message_id, headers, report_json in audited:
+        thread_index.add_message(message_id, headers, report_json)
+
+    # Thread ids are looked up once everything is added, as a later message
+    # may have merged the thread an earlier one went into.
+    touched: Dict[str, List[str]] = {}
+    for message_id, _, _ in audited:
+        touched.setdefault(thread_index.get_thread_id(message_id), []).append(message_id)
+    for message_id in reused:
+        thread_id = thread_index.get_thread_id(message_id)
+        if thread_id:
+            touched.setdefault(thread_id, [])
+    return [thread_index.thread_report(thread_id, new_ids) for thread_id, new_ids in touched.items()]
+
+
+@router.get("/threads/{thread_id}")
+async def get_thread(thread_id: str):
+    _require_threads()
+    report = await asyncio.to_thread(thread_index.thread_report, thread_id)
+    if not report["messages"]:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"Thread '{thread_id}' not found")
+    return JSONResponse(content=report)
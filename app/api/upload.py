@@ -1,39 +1,123 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from starlette.status import HTTP_400_BAD_REQUEST
+import json
+import time
+from typing import Optional, Sequence, Tuple
 
-from ..parser import parse_eml_data
-from ..models import EmailMessage, EmailThread, Attachment
-from ..audit import Auditor, ReportGenerator
+from fastapi import APIRouter, Request, UploadFile, File, Header, HTTPException, Query
+from fastapi.responses import Response
+from starlette.status import (
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+from ..audit.executor import audit_executor, PoolSaturatedError
+from ..audit.pipeline import auditor, audit_eml_file, describe_eml_file, EMLParseError
+from ..audit.report import RenderedReport
+from ..config import settings
+from ..metrics import stage_duration
+from ..models import EmailMessage
+from ..profiling import ProfilerBusyError, profile_call
+from ..rules.plans import ExecutionPlan, UnknownRuleError, parse_rule_list
+from .admin import require_admin
+from .ingest import spool_upload, UploadTooLargeError
 
 router = APIRouter(prefix="/api/v1", tags=["audit"])
 
-auditor = Auditor()
-report_generator = ReportGenerator()
+VIEW_PATTERN = "^(full|summary)$"
+
+
+def resolve_plan(profile: Optional[str], rules: Optional[str]) -> Tuple[ExecutionPlan, Optional[Sequence[str]]]:
+    rule_names = parse_rule_list(rules)
+    try:
+        return auditor.rule_registry.plan(profile, rule_names), rule_names
+    except UnknownRuleError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
 
 @router.post("/audit")
-async def audit_eml(file: UploadFile = File(...)):
+async def audit_eml(
+    request: Request,
+    file: UploadFile = File(...),
+    view: str = Query("full", pattern=VIEW_PATTERN),
+    profile: Optional[str] = Query(None),
+    rules: Optional[str] = Query(None),
+    profiling: bool = Query(False),
+    if_none_match: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
+):
+    if profiling:
+        require_admin(x_admin_token)
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        stage_duration.observe(time.perf_counter() - received_at, stage="form_parse")
+    if not file.filename or not file.filename.endswith(".eml"):
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Only .eml files are supported.")
+    plan, rule_names = resolve_plan(profile, rules)
+    try:
+        spool_started = time.perf_counter()
+        async with spool_upload(file) as spooled:
+            stage_duration.observe(time.perf_counter() - spool_started, stage="spool")
+            if profiling:
+                # Always audited afresh, bypassing the cache and ETags, so
+                # there is something to profile.
+                report, profile_data = await audit_executor.run(
+                    profile_call, audit_eml_file, spooled.path, spooled.digest, profile, rule_names
+                )
+                auditor.cache_report(spooled.digest, report, plan)
+                body = b'{"report": %s, "profile": %s}' % (report.view(view), json.dumps(profile_data).encode("utf-8"))
+                return Response(content=body, media_type="application/json")
+            # Each view is its own representation and needs its own validator.
+            cache_key = auditor.cache_key(spooled.digest, plan)
+            etag = f'"{cache_key}"' if view == "full" else f'"{cache_key}:{view}"'
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            
+            report: Optional[RenderedReport] = auditor.get_cached_report(spooled.digest, plan)
+            if report is None:
+                report = await audit_executor.run(audit_eml_file, spooled.path, spooled.digest, profile, rule_names)
+                auditor.cache_report(spooled.digest, report, plan)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit service is at capacity, please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+    except EMLParseError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Failed to parse EML: {str(e)}")
+    # A report that was not cached must not be revalidated with a 304 later.
+    headers = {"ETag": etag} if report.cacheable else {}
+    return Response(content=report.view(view), media_type="application/json", headers=headers)
+
+
+@router.post("/parse", response_model=EmailMessage)
+async def parse_eml(file: UploadFile = File(...)):
     if not file.filename or not file.filename.endswith(".eml"):
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Only .eml files are supported.")
-    content = await file.read()
     try:
-        parsed = parse_eml_data(content)
-        
-        attachments = []
-        if parsed.get('attachments'):
-            for att_data in parsed['attachments']:
-                attachment = Attachment(**att_data)
-                attachments.append(attachment)
-        
-        email_message = EmailMessage(
-            headers=parsed['headers'],
-            content=parsed['content'],
-            metadata=parsed['metadata'],
-            attachments=attachments
+        async with spool_upload(file) as spooled:
+            return await audit_executor.run(describe_eml_file, spooled.path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit service is at capacity, please retry later.",
+            headers={"Retry-After": str(settings.retry_after_seconds)}
         )
-        email_thread = EmailThread(messages=[email_message])
-    except Exception as e:
+    except EMLParseError as e:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Failed to parse EML: {str(e)}")
-    audit_result = auditor.audit_email_thread(email_thread)
-    json_report = report_generator.generate_json_report(audit_result)
-    return JSONResponse(content=json_report) 
\ No newline at end of file
@@ -1,48 +1,84 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence
 from loguru import logger
 
-from ..models import EmailThread, AuditResult, RuleResult
+from ..models import ParsedThread, AuditResult, RuleResult
 from ..models.audit import RuleStatus
-from ..rules.registry import RuleRegistry
+from ..rules.plans import ExecutionPlan
+from ..rules.registry import rule_registry
+from .cache import ResultCache
+from .report import RenderedReport
 
 
 class Auditor:
     
     def __init__(self):
-        self.rule_registry = RuleRegistry()
+        self.rule_registry = rule_registry
+        self.result_cache = ResultCache.from_settings()
     
-    def audit_email_thread(self, email_thread: EmailThread) -> AuditResult:
+    def cache_key(self, message_digest: str, plan: Optional[ExecutionPlan] = None) -> str:
+        plan = plan or self.rule_registry.plan()
+        return f"{message_digest}:{self.rule_registry.fingerprint}:{plan.key}"
+    
+    def get_cached_report(self, message_digest: str, plan: Optional[ExecutionPlan] = None) -> Optional[RenderedReport]:
+        return self.result_cache.get(self.cache_key(message_digest, plan))
+    
+    def cache_report(self, message_digest: str, report: RenderedReport, plan: Optional[ExecutionPlan] = None):
+        if report.cacheable:
+            self.result_cache.set(self.cache_key(message_digest, plan), report)
+    
+    def audit_email_thread(self, email_thread: ParsedThread, plan: Optional[ExecutionPlan] = None,
+                           reused: Optional[Dict[str, RuleResult]] = None) -> AuditResult:
         logger.info(f"Starting audit for {len(email_thread.messages)} messages")
         
         try:
-            rule_results = self.rule_registry.execute_all_rules(email_thread)
-            
-            overall_score = self._calculate_overall_score(rule_results)
-            summary = self._generate_summary(rule_results)
-            recommendations = self._generate_recommendations(rule_results)
-            statistics = self._calculate_statistics(rule_results)
-            
-            return AuditResult(
-                audit_timestamp=datetime.utcnow().isoformat(),
-                overall_score=overall_score,
-                summary=summary,
-                recommendations=recommendations,
-                rule_results=rule_results,
-                statistics=statistics,
-                email_thread=email_thread
-            )
+            plan = plan or self.rule_registry.plan()
+            rule_results = self.rule_registry.execute_plan(plan, email_thread, reused=reused)
+            return self._build_result(rule_results, plan)
             
         except Exception as e:
             logger.error(f"Audit failed: {str(e)}")
             return self._create_error_result(email_thread, str(e))
     
-    def _calculate_overall_score(self, rule_results: List[RuleResult]) -> float:
-        if not rule_results:
+    def audit_email_threads(self, email_threads: Sequence[ParsedThread], plan: Optional[ExecutionPlan] = None,
+                            reused: Optional[Sequence[Optional[Dict[str, RuleResult]]]] = None) -> Iterator[AuditResult]:
+        # Yields one result per thread, in order, each built as it is asked for.
+        logger.info(f"Starting batch audit for {len(email_threads)} threads")
+        plan = plan or self.rule_registry.plan()
+        try:
+            batch = self.rule_registry.execute_plan_batch(plan, email_threads, reused)
+        except Exception as e:
+            logger.error(f"Batch audit failed, auditing per message: {str(e)}")
+            for index, email_thread in enumerate(email_threads):
+                yield self.audit_email_thread(email_thread, plan, reused[index] if reused is not None else None)
+            return
+        
+        for index, email_thread in enumerate(email_threads):
+            try:
+                yield self._build_result(batch.results(index), plan)
+            except Exception as e:
+                logger.error(f"Audit failed: {str(e)}")
+                yield self._create_error_result(email_thread, str(e))
+    
+    def _build_result(self, rule_results: List[RuleResult], plan: ExecutionPlan) -> AuditResult:
+        return AuditResult(
+            audit_timestamp=datetime.utcnow().isoformat(),
+            overall_score=self._calculate_overall_score(rule_results, plan),
+            summary=self._generate_summary(rule_results),
+            recommendations=self._generate_recommendations(rule_results),
+            rule_results=rule_results,
+            statistics=self._calculate_statistics(rule_results)
+        )
+    
+    def _calculate_overall_score(self, rule_results: List[RuleResult], plan: ExecutionPlan) -> float:
+        # Timed out rules reached no verdict, so they do not drag the score down.
+        judged = [result for result in rule_results if result.status != RuleStatus.TIMEOUT]
+        total_weight = sum(plan.weight(result.rule_name) for result in judged)
+        if total_weight <= 0:
             return 0.0
         
-        total_score = sum(result.score for result in rule_results)
-        return total_score / len(rule_results)
+        total_score = sum(result.score * plan.weight(result.rule_name) for result in judged)
+        return total_score / total_weight
     
     def _generate_summary(self, rule_results: List[RuleResult]) -> str:
         total_count = len(rule_results)
@@ -58,7 +94,11 @@ class Auditor:
         else:
             quality = "poor"
         
-        return f"Email quality is {quality}. {passed_count}/{total_count} rules passed ({pass_rate:.1%})."
+        summary = f"Email quality is {quality}. {passed_count}/{total_count} rules passed ({pass_rate:.1%})."
+        timed_out_count = sum(1 for result in rule_results if result.status == RuleStatus.TIMEOUT)
+        if timed_out_count:
+            summary += f" {timed_out_count} rules timed out."
+        return summary
     
     def _generate_recommendations(self, rule_results: List[RuleResult]) -> List[str]:
         recommendations = []
@@ -74,6 +114,8 @@ class Auditor:
                         recommendations.append("Your email is too long - be more concise")
                 elif "attachment" in result.rule_name.lower():
                     recommendations.append("Consider adding visual content to your email")
+                elif result.details and result.details.get("recommendation"):
+                    recommendations.append(result.details["recommendation"])
         
         if not recommendations:
             recommendations.append("Great job! Your email meets all quality standards.")
@@ -83,23 +125,27 @@ class Auditor:
     def _calculate_statistics(self, rule_results: List[RuleResult]) -> dict:
         total_rules = len(rule_results)
         passed_rules = sum(1 for result in rule_results if result.status == RuleStatus.PASS)
-        failed_rules = total_rules - passed_rules
+        timed_out_rules = sum(1 for result in rule_results if result.status == RuleStatus.TIMEOUT)
+        reused_rules = sum(1 for result in rule_results if result.details and "near_duplicate_of" in result.details)
+        failed_rules = total_rules - passed_rules - timed_out_rules
         pass_rate = passed_rules / total_rules if total_rules > 0 else 0.0
         
         return {
             "total_rules": total_rules,
             "passed_rules": passed_rules,
             "failed_rules": failed_rules,
+            "timed_out_rules": timed_out_rules,
+            "reused_rules": reused_rules,
             "pass_rate": pass_rate
         }
     
-    def _create_error_result(self, email_thread: EmailThread, error_message: str) -> AuditResult:
+    def _create_error_result(self, email_thread: ParsedThread, error_message: str) -> AuditResult:
         return AuditResult(
             audit_timestamp=datetime.utcnow().isoformat(),
             overall_score=0.0,
             summary=f"Audit failed: {error_message}",
             recommendations=["Please try again or contact support if the issue persists."],
             rule_results=[],
-            statistics={"total_rules": 0, "passed_rules": 0, "failed_rules": 0, "pass_rate": 0.0},
-            email_thread=email_thread
+            statistics={"total_rules": 0, "passed_rules": 0, "failed_rules": 0, "timed_out_rules": 0, "reused_rules": 0, "pass_rate": 0.0},
+            audit_failed=True
         ) 
\ No newline at end of file
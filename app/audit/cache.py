@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+from ..config import settings
+from .report import RenderedReport
+
+
+class LRUCache:
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._connect()
+        # A forked server worker opens its own connection; SQLite handles must
+        # not be shared across fork.
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Reports are stored as the JSON bytes that are sent, so a hit needs
+            # no decoding.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit_reports ("
+                "key TEXT PRIMARY KEY, full_json BLOB NOT NULL, summary_json BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS audit_reports_stored_at ON audit_reports (stored_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def get(self, key: str) -> Optional[RenderedReport]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT full_json, summary_json, stored_at FROM audit_reports WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and time.time() - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM audit_reports WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return RenderedReport(full=bytes(row[0]), summary=bytes(row[1]))
+
+    def set(self, key: str, value: RenderedReport):
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO audit_reports (key, full_json, summary_json, stored_at) VALUES (?, ?, ?, ?)",
+                (key, value.full, value.summary, time.time())
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM audit_reports WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM audit_reports WHERE key IN ("
+            "SELECT key FROM audit_reports ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ResultCache:
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @classmethod
+    def from_settings(cls) -> "ResultCache":
+        disk = None
+        if settings.cache_db_path:
+            try:
+                disk = SQLiteCache(settings.cache_db_path, settings.cache_db_max_entries, settings.cache_ttl_seconds)
+                logger.info(f"Using on-disk audit cache at {settings.cache_db_path}")
+            except Exception as e:
+                logger.error(f"Failed to open audit cache database: {str(e)}")
+        return cls(LRUCache(settings.cache_max_entries, settings.cache_ttl_seconds), disk)
+
+    def _count(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+
+    def get(self, key: str) -> Optional[RenderedReport]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits", "memory_hits")
+            return value
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except Exception as e:
+                logger.warning(f"Audit cache read failed: {str(e)}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("hits", "disk_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: RenderedReport):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                logger.warning(f"Audit cache write failed: {str(e)}")
+        self._count("stores")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        counters["memory_entries"] = len(self.memory)
+        counters["disk_enabled"] = self.disk is not None
+        return counters
@@ -0,0 +1,187 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+from loguru import logger
+
+from ..config import settings
+from ..dedup.index import near_dup_index
+from ..history.store import history_store
+from ..metrics import metrics
+from ..rules.registry import rule_registry
+
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+def _init_worker():
+    metrics.reset()
+    history_store.drain()
+    near_dup_index.drain()
+
+
+def _call_in_worker(fn: Callable[..., Any], rules_fingerprint: str, *args: Any) -> Any:
+    # Runs in a pool process: pick up a rule reload done in the parent, then
+    # ship the metrics, history and near-duplicate entries recorded for this
+    # call back with the result.
+    rule_registry.ensure_fingerprint(rules_fingerprint)
+    result = fn(*args)
+    return result, metrics.drain(), history_store.drain(), near_dup_index.drain()
+
+
+class PoolSaturatedError(Exception):
+
+    def __init__(self, retry_after: int):
+        super().__init__("Audit worker pool is saturated")
+        self.retry_after = retry_after
+
+
+class AuditExecutor:
+
+    def __init__(self, mode: str = "thread", max_workers: int = 1, max_queue: int = 0, retry_after: int = 1):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {EXECUTION_MODES}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._rejected = 0
+        self._completed = 0
+
+    @classmethod
+    def from_settings(cls) -> "AuditExecutor":
+        return cls(
+            mode=settings.execution_mode,
+            max_workers=settings.max_workers,
+            max_queue=settings.max_queue,
+            retry_after=settings.retry_after_seconds
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            initializer=_init_worker
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="audit-worker"
+                        )
+                    logger.info(f"Started {self.mode} audit pool with {self.max_workers} workers")
+        return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise PoolSaturatedError(self.retry_after)
+            self._in_flight += 1
+
+    async def _admit_when_free(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._in_flight < self.capacity:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        handoff = None
+                    else:
+                        # We were already woken; pass the wake-up on.
+                        handoff = self._waiters.popleft() if self._waiters else None
+                if handoff is not None:
+                    handoff.get_loop().call_soon_threadsafe(self._wake, handoff)
+                raise
+
+    def _release(self, _future: Optional[Future] = None):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            waiter = self._waiters.popleft() if self._waiters else None
+        if waiter is not None:
+            waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+        if wait:
+            await self._admit_when_free()
+        else:
+            self._admit()
+
+        if self.mode == "inline":
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        try:
+            if self.mode == "process":
+                future = self._get_executor().submit(_call_in_worker, fn, rule_registry.fingerprint, *args)
+            else:
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Release the slot when the worker is actually done, not when the
+        # awaiting request goes away, so cancelled requests still count.
+        future.add_done_callback(self._release)
+        result = await asyncio.wrap_future(future)
+        if self.mode == "process":
+            result, snapshot, history, near_duplicates = result
+            metrics.merge(snapshot)
+            history_store.submit(history)
+            near_dup_index.submit(near_duplicates)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = self._in_flight
+            rejected = self._rejected
+            completed = self._completed
+
+        active = min(in_flight, self.max_workers)
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "waiting": len(self._waiters),
+            "active": active,
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "saturation": active / self.max_workers,
+            "accepting": in_flight < self.capacity,
+            "rejected": rejected,
+            "completed": completed
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+audit_executor = AuditExecutor.from_settings()
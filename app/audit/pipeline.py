@@ -0,0 +1,176 @@
+import hashlib
+import os
+from array import array
+from datetime import datetime
+from typing import AbstractSet, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..dedup.index import near_dup_index
+from ..history.store import build_entry, history_store
+from ..metrics import attachments_seen, bytes_parsed, stage_duration
+from ..parser import parse_eml_data, parse_eml_file
+from ..models import AuditResult, HeaderFields, ParsedMessage, ParsedThread, RuleResult
+from ..rules.plans import ExecutionPlan
+from .auditor import Auditor
+from .report import RenderedReport, ReportGenerator
+
+
+class EMLParseError(Exception):
+    pass
+
+
+auditor = Auditor()
+report_generator = ReportGenerator()
+
+
+def build_email_thread(parsed: ParsedMessage) -> ParsedThread:
+    return ParsedThread([parsed])
+
+
+def _file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _prepare(
+    parse: Callable[[AbstractSet[str]], ParsedMessage],
+    size: int,
+    plan: ExecutionPlan,
+    fingerprint: str
+) -> Tuple[ParsedThread, Optional[array], Optional[Dict[str, RuleResult]], Dict[str, str]]:
+    try:
+        with stage_duration.time(stage="parse"):
+            email_thread = build_email_thread(parse(plan.fields))
+    except Exception as e:
+        raise EMLParseError(str(e))
+    bytes_parsed.inc(size)
+    attachments_seen.inc(sum(len(message.attachments) for message in email_thread.messages))
+
+    signature, reused, reuse_keys = None, None, {}
+    if near_dup_index.enabled:
+        with stage_duration.time(stage="near_dup"):
+            message = email_thread.messages[0]
+            signature = near_dup_index.signature_for(message)
+            # Reuse keys read the same input the rules do, so they are only
+            # worth computing when results can actually be reused.
+            if near_dup_index.reuse and plan.content_rules:
+                for rule in plan.rules:
+                    key = rule.reuse_key(message) if rule.content_only else None
+                    if key is not None:
+                        reuse_keys[rule.name] = key
+                match = near_dup_index.lookup(signature)
+                reused = near_dup_index.reusable_results(match, fingerprint, reuse_keys)
+    return email_thread, signature, reused, reuse_keys
+
+
+def _emit(
+    audit_result: AuditResult,
+    headers: HeaderFields,
+    parsed_date: Optional[datetime],
+    signature: Optional[array],
+    reuse_keys: Dict[str, str],
+    digest: Callable[[], str],
+    plan: ExecutionPlan,
+    fingerprint: str,
+    profile: Optional[str],
+    rule_names: Optional[Sequence[str]]
+) -> RenderedReport:
+    with stage_duration.time(stage="report"):
+        report = report_generator.render(audit_result)
+
+    message_hash = digest() if signature or history_store.enabled else None
+    if signature:
+        near_dup_index.add(message_hash, signature, fingerprint, headers, audit_result, reuse_keys)
+    # History tracks the full rule set; partial selections would skew it.
+    if history_store.enabled and report.cacheable and profile is None and rule_names is None:
+        history_store.record(build_entry(message_hash, fingerprint, headers, parsed_date, audit_result))
+    return report
+
+
+def _audit_parsed(
+    parse: Callable[[AbstractSet[str]], ParsedMessage],
+    size: int,
+    digest: Callable[[], str],
+    profile: Optional[str] = None,
+    rule_names: Optional[Sequence[str]] = None
+) -> RenderedReport:
+    # Resolved here rather than passed in so pool workers compile and cache
+    # the plan against their own rule set.
+    plan = auditor.rule_registry.plan(profile, rule_names)
+    fingerprint = auditor.rule_registry.fingerprint
+    email_thread, signature, reused, reuse_keys = _prepare(parse, size, plan, fingerprint)
+    message = email_thread.messages[0]
+    headers, parsed_date = message.headers, message.date
+
+    with stage_duration.time(stage="audit"):
+        audit_result = auditor.audit_email_thread(email_thread, plan, reused)
+    # Only the result is needed from here on; let the bodies and spilled
+    # attachments go before the report is encoded.
+    del email_thread, message
+
+    return _emit(audit_result, headers, parsed_date, signature, reuse_keys, digest, plan, fingerprint, profile, rule_names)
+
+
+def audit_eml_bytes(content: bytes, digest: Optional[str] = None, profile: Optional[str] = None,
+                    rule_names: Optional[Sequence[str]] = None) -> RenderedReport:
+    return _audit_parsed(
+        lambda fields: parse_eml_data(content, fields),
+        len(content),
+        lambda: digest or hashlib.sha256(content).hexdigest(),
+        profile,
+        rule_names
+    )
+
+
+def audit_eml_file(file_path: str, digest: Optional[str] = None, profile: Optional[str] = None,
+                   rule_names: Optional[Sequence[str]] = None) -> RenderedReport:
+    return _audit_parsed(
+        lambda fields: parse_eml_file(file_path, fields),
+        os.path.getsize(file_path),
+        lambda: digest or _file_digest(file_path),
+        profile,
+        rule_names
+    )
+
+
+def describe_eml_file(file_path: str) -> Dict[str, Any]:
+    # Debug view: the only place the pydantic message model is built.
+    try:
+        return parse_eml_file(file_path).to_model().model_dump(mode="json")
+    except Exception as e:
+        raise EMLParseError(str(e))
+
+
+def audit_eml_batch(contents: Sequence[bytes], profile: Optional[str] = None,
+                    rule_names: Optional[Sequence[str]] = None) -> Iterator[Tuple[Optional[RenderedReport], Optional[Exception]]]:
+    # Bulk counterpart of audit_eml_bytes: rules with evaluate_batch run once
+    # over every message that parsed. Yields (report, None) or (None, error)
+    # per message, in order.
+    plan = auditor.rule_registry.plan(profile, rule_names)
+    fingerprint = auditor.rule_registry.fingerprint
+    prepared: List[Any] = []
+    for content in contents:
+        try:
+            prepared.append(_prepare(lambda fields, content=content: parse_eml_data(content, fields), len(content), plan, fingerprint))
+        except Exception as e:
+            prepared.append(e)
+
+    staged = [item for item in prepared if not isinstance(item, Exception)]
+    audits = auditor.audit_email_threads([item[0] for item in staged], plan, [item[2] for item in staged])
+    for content, item in zip(contents, prepared):
+        if isinstance(item, Exception):
+            yield None, item
+            continue
+        email_thread, signature, _, reuse_keys = item
+        message = email_thread.messages[0]
+        try:
+            with stage_duration.time(stage="audit"):
+                audit_result = next(audits)
+            yield _emit(
+                audit_result, message.headers, message.date, signature, reuse_keys,
+                lambda content=content: hashlib.sha256(content).hexdigest(), plan, fingerprint, profile, rule_names
+            ), None
+        except Exception as e:
+            yield None, e
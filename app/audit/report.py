@@ -1,8 +1,28 @@
 import json
-from typing import Dict, Any
+from typing import NamedTuple
 from loguru import logger
 
 from ..models import AuditResult
+from ..models.audit import RuleStatus
+
+
+VIEWS = ("full", "summary")
+
+# Fields kept by ?view=summary: the score, each rule's status and the counts.
+SUMMARY_FIELDS = {
+    "overall_score": True,
+    "statistics": True,
+    "rule_results": {"__all__": {"rule_name", "status"}},
+}
+
+
+class RenderedReport(NamedTuple):
+    full: bytes
+    summary: bytes
+    cacheable: bool = True
+    
+    def view(self, name: str) -> bytes:
+        return self.summary if name == "summary" else self.full
 
 
 class ReportGenerator:
@@ -10,32 +30,28 @@ class ReportGenerator:
     def __init__(self):
         pass
     
-    def generate_json_report(self, audit_result: AuditResult) -> Dict[str, Any]:
+    def render(self, audit_result: AuditResult) -> RenderedReport:
+        # pydantic-core writes JSON bytes straight from the models, so the
+        # report is encoded once, here, and reused by the cache and responses.
         try:
-            report = {
-                "audit_timestamp": audit_result.audit_timestamp,
-                "overall_score": audit_result.overall_score,
-                "summary": audit_result.summary,
-                "recommendations": audit_result.recommendations,
-                "rule_results": [
-                    {
-                        "rule_name": result.rule_name,
-                        "status": result.status,
-                        "score": result.score,
-                        "justification": result.justification,
-                        "details": result.details
-                    }
-                    for result in audit_result.rule_results
-                ],
-                "statistics": audit_result.statistics
-            }
+            # A timeout or a failed audit reflects the moment, not the
+            # message, so it must not be cached or validated by an ETag.
+            transient = audit_result.audit_failed or any(
+                result.status == RuleStatus.TIMEOUT for result in audit_result.rule_results
+            )
+            report = RenderedReport(
+                full=audit_result.model_dump_json().encode(),
+                summary=audit_result.model_dump_json(include=SUMMARY_FIELDS).encode(),
+                cacheable=not transient
+            )
             
             logger.info(f"Generated JSON report with {len(audit_result.rule_results)} rules")
             return report
             
         except Exception as e:
             logger.error(f"Failed to generate JSON report: {str(e)}")
-            return {
+            error = json.dumps({
                 "error": "Failed to generate report",
                 "message": str(e)
-            } 
\ No newline at end of file
+            }).encode()
+            return RenderedReport(full=error, summary=error, cacheable=False)
@@ -0,0 +1,261 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from functools import partial
+from itertools import chain, islice
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+from loguru import logger
+
+from .audit.pipeline import auditor, audit_eml_batch, EMLParseError
+from .audit.report import RenderedReport
+from .parser.sources import MessageRef, iter_path_refs, read_message
+from .rules.discovery import MANIFEST_PATH, write_manifest
+from .rules.plans import UnknownRuleError, parse_rule_list
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, EMLParseError):
+        return f"Failed to parse EML: {str(error)}"
+    return f"Audit failed: {str(error)}"
+
+
+def _audit_refs(profile: Optional[str], rule_names: Optional[Sequence[str]],
+                refs: List[MessageRef]) -> List[Tuple[str, Optional[RenderedReport], Optional[str]]]:
+    # A whole batch per call, so rules with evaluate_batch run once over it.
+    results: List[Tuple[str, Optional[RenderedReport], Optional[str]]] = [(ref.source_id, None, None) for ref in refs]
+    read: List[Tuple[int, bytes]] = []
+    for index, ref in enumerate(refs):
+        try:
+            read.append((index, read_message(ref)))
+        except Exception as e:
+            results[index] = (ref.source_id, None, _error_text(e))
+    audited = audit_eml_batch([content for _, content in read], profile, rule_names)
+    for (index, _), (report, error) in zip(read, audited):
+        results[index] = (refs[index].source_id, report, _error_text(error) if error is not None else None)
+    return results
+
+
+def _load_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+
+def _iter_pending(paths: List[str], done: Set[str]) -> Iterator[MessageRef]:
+    for path in paths:
+        for ref in iter_path_refs(path):
+            if ref.source_id not in done:
+                yield ref
+
+
+def _iter_batches(refs: Iterator[MessageRef], size: int) -> Iterator[List[MessageRef]]:
+    while True:
+        batch = list(islice(refs, size))
+        if not batch:
+            return
+        yield batch
+
+
+class JSONLWriter:
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, source_id: str, report: Optional[RenderedReport], error: Optional[str]):
+        if error is not None:
+            self.stream.write(json.dumps({"source": source_id, "error": error}) + "\n")
+            return
+        # Splice the already encoded report in rather than decoding it.
+        self.stream.write('{"source": %s, "report": %s}\n' % (json.dumps(source_id), report.full.decode("utf-8")))
+
+
+class CSVWriter:
+
+    def __init__(self, stream, rule_names: List[str], write_header: bool):
+        self.rule_names = rule_names
+        self.writer = csv.writer(stream)
+        if write_header:
+            self.writer.writerow(["source", "overall_score", "passed_rules", "failed_rules"] + rule_names + ["error"])
+
+    def write(self, source_id: str, report: Optional[RenderedReport], error: Optional[str]):
+        if error is not None:
+            self.writer.writerow([source_id, "", "", ""] + [""] * len(self.rule_names) + [error])
+            return
+        summary = json.loads(report.summary)
+        statuses = {result["rule_name"]: result["status"] for result in summary["rule_results"]}
+        statistics = summary["statistics"]
+        self.writer.writerow(
+            [source_id, summary["overall_score"], statistics["passed_rules"], statistics["failed_rules"]]
+            + [statuses.get(name, "") for name in self.rule_names]
+            + [""]
+        )
+
+
+def _commit_checkpoint(output, checkpoint, finished: List[str]):
+    # Results are flushed before their ids are recorded, so a crash can at
+    # worst re-audit a message on resume, never skip one.
+    output.flush()
+    if checkpoint is not None and finished:
+        checkpoint.write("".join(source_id + "\n" for source_id in finished))
+        checkpoint.flush()
+    finished.clear()
+
+
+def run_audit(args: argparse.Namespace) -> int:
+    # Build the rule set before forking so workers inherit it instead of
+    # each discovering the rules again.
+    rule_names = parse_rule_list(args.rules)
+    try:
+        plan = auditor.rule_registry.plan(args.profile, rule_names)
+    except UnknownRuleError as e:
+        logger.error(str(e))
+        return 2
+    audit_refs = partial(_audit_refs, args.profile, rule_names)
+
+    done = _load_checkpoint(args.checkpoint)
+    if done:
+        logger.info(f"Resuming: skipping {len(done)} already audited messages")
+
+    resuming = bool(done) and args.output is not None
+    output = open(args.output, 'a' if resuming else 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    checkpoint = open(args.checkpoint, 'a', encoding='utf-8') if args.checkpoint else None
+
+    if args.format == 'csv':
+        writer = CSVWriter(output, sorted(plan.rule_names), write_header=not resuming)
+    else:
+        writer = JSONLWriter(output)
+
+    audited = failed = 0
+    finished: List[str] = []
+    started = time.monotonic()
+    batches = _iter_batches(_iter_pending(args.paths, done), max(1, args.batch_size))
+
+    try:
+        if args.workers == 1:
+            results = chain.from_iterable(map(audit_refs, batches))
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes=args.workers)
+            chunksize = max(1, args.chunksize // max(1, args.batch_size))
+            results = chain.from_iterable(pool.imap_unordered(audit_refs, batches, chunksize=chunksize))
+
+        for source_id, report, error in results:
+            writer.write(source_id, report, error)
+            audited += 1
+            failed += error is not None
+            finished.append(source_id)
+            if len(finished) >= args.checkpoint_every:
+                _commit_checkpoint(output, checkpoint, finished)
+            if audited % args.progress_every == 0:
+                rate = audited / max(time.monotonic() - started, 1e-9)
+                logger.info(f"Audited {audited} messages ({rate:.0f}/s)")
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted after {audited} messages; rerun with the same --checkpoint to resume")
+        if pool is not None:
+            pool.terminate()
+        return 130
+    finally:
+        _commit_checkpoint(output, checkpoint, finished)
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    logger.info(f"Audited {audited} messages, {failed} failed, in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+def run_rules(args: argparse.Namespace) -> int:
+    if args.write_manifest:
+        targets = write_manifest(args.manifest)
+        logger.info(f"Wrote {len(targets)} rules to {args.manifest}")
+        return 0
+    ruleset = auditor.rule_registry.ruleset
+    for name, rule in ruleset.rules.items():
+        fields = ",".join(sorted(rule.required_fields)) or "headers"
+        print(f"{name}\t{type(rule).__module__}.{type(rule).__qualname__}\tweight={rule.weight}\tdefault={rule.default_enabled}\tfields={fields}")
+    for name in ruleset.profiles:
+        try:
+            plan = ruleset.plan(name)
+        except UnknownRuleError as e:
+            print(f"profile {name}\terror={e}")
+            continue
+        print(f"profile {name}\trules={','.join(plan.rule_names)}\tfields={','.join(sorted(plan.fields)) or 'headers'}")
+    print(f"fingerprint {ruleset.fingerprint}")
+    return 0
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    from .server import serve
+
+    serve(args.host, args.port, args.workers)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Email Audit Service command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    audit = subparsers.add_parser("audit", help="Audit .eml files, directories, mbox files and Maildirs")
+    audit.add_argument("paths", nargs="+", help="Files or directories to audit")
+    audit.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    audit.add_argument("--output", "-o", help="Output file (defaults to stdout)")
+    audit.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1)
+    audit.add_argument("--chunksize", type=int, default=64, help="Messages dispatched to a worker at a time")
+    audit.add_argument("--batch-size", type=int, default=64,
+                       help="Messages whose rules are evaluated together; 1 audits each message on its own")
+    audit.add_argument("--checkpoint", help="File recording finished messages, used to resume")
+    audit.add_argument("--checkpoint-every", type=int, default=500, help="Messages between checkpoint writes")
+    audit.add_argument("--progress-every", type=int, default=10000)
+    audit.add_argument("--profile", help="Named rule profile to audit with")
+    audit.add_argument("--rules", help="Comma-separated rule names to run instead of the whole profile")
+    audit.add_argument("--log-level", default="WARNING")
+    audit.set_defaults(handler=run_audit)
+
+    rules = subparsers.add_parser("rules", help="List the loaded rules or regenerate the rule manifest")
+    rules.add_argument("--write-manifest", action="store_true", help="Scan app/rules and rewrite the manifest")
+    rules.add_argument("--manifest", default=MANIFEST_PATH)
+    rules.add_argument("--log-level", default="WARNING")
+    rules.set_defaults(handler=run_rules)
+
+    serve = subparsers.add_parser("serve", help="Run the API with preforked workers sharing a preloaded rule registry")
+    serve.add_argument("--host", help="Defaults to SERVER_HOST")
+    serve.add_argument("--port", type=int, help="Defaults to SERVER_PORT")
+    serve.add_argument("--workers", "-w", type=int, help="Defaults to SERVER_WORKERS")
+    serve.add_argument("--log-level", default="INFO")
+    serve.set_defaults(handler=run_serve)
+
+    return parser
+
+
+def _configure_logging(level: str):
+    # --log-level applies to the modules the commands call into, which log
+    # every message at INFO. This module's own progress lines are INFO too
+    # and are shown unless the level is set above WARNING.
+    threshold = logger.level(level.upper()).no
+    progress = threshold if threshold > logger.level("WARNING").no else min(threshold, logger.level("INFO").no)
+
+    def keep(record) -> bool:
+        return record["level"].no >= (progress if record["name"] == __name__ else threshold)
+
+    logger.remove()
+    logger.add(sys.stderr, level=progress, filter=keep)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    _configure_logging(args.log_level)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name) or default
+
+
+class Settings:
+
+    def __init__(self):
+        # Used by `python -m app.cli serve`; a plain `uvicorn main:app` runs
+        # one process and ignores these.
+        self.server_host = _env_str("SERVER_HOST", "0.0.0.0")
+        self.server_port = _env_int("SERVER_PORT", 8000)
+        self.server_workers = _env_int("SERVER_WORKERS", os.cpu_count() or 1)
+        # 0 disables recycling on that limit.
+        self.server_max_requests = _env_int("SERVER_MAX_REQUESTS", 0)
+        self.server_max_requests_jitter = _env_int("SERVER_MAX_REQUESTS_JITTER", 0)
+        self.server_max_rss_mb = _env_int("SERVER_MAX_RSS_MB", 0)
+        self.server_graceful_timeout_seconds = _env_float("SERVER_GRACEFUL_TIMEOUT_SECONDS", 30.0)
+        # How often each worker publishes its counters for /metrics on the
+        # other workers.
+        self.server_metrics_publish_seconds = _env_float("SERVER_METRICS_PUBLISH_SECONDS", 5.0)
+        # Messages audited by each worker before it reports ready. Empty
+        # skips the warm-up.
+        self.warmup_dir = _env_str("WARMUP_DIR", "dummy_eml_files")
+
+        # inline | thread | process
+        self.execution_mode = _env_str("AUDIT_EXECUTION_MODE", "thread")
+        self.max_workers = _env_int("AUDIT_MAX_WORKERS", os.cpu_count() or 1)
+        self.max_queue = _env_int("AUDIT_MAX_QUEUE", 32)
+        self.retry_after_seconds = _env_int("AUDIT_RETRY_AFTER_SECONDS", 1)
+
+        # fast reads raw header text and decodes a header on first use;
+        # structured builds policy.default header objects for every header.
+        self.parser_header_mode = _env_str("PARSER_HEADER_MODE", "fast")
+
+        self.upload_chunk_bytes = _env_int("UPLOAD_CHUNK_BYTES", 64 * 1024)
+        self.max_upload_bytes = _env_int("MAX_UPLOAD_BYTES", 50 * 1024 * 1024)
+        # Request body limit for /audit/batch and /threads, whose uploads
+        # carry many messages or archives.
+        self.max_batch_upload_bytes = _env_int("MAX_BATCH_UPLOAD_BYTES", 256 * 1024 * 1024)
+        # Total size of the messages extracted from one such request's zip
+        # archives.
+        self.max_batch_extracted_bytes = _env_int("MAX_BATCH_EXTRACTED_BYTES", 1024 * 1024 * 1024)
+        self.max_inflight_bytes = _env_int("MAX_INFLIGHT_BYTES", 512 * 1024 * 1024)
+        self.attachment_spill_bytes = _env_int("ATTACHMENT_SPILL_BYTES", 1024 * 1024)
+
+        self.cache_max_entries = _env_int("AUDIT_CACHE_MAX_ENTRIES", 1024)
+        self.cache_ttl_seconds = _env_float("AUDIT_CACHE_TTL_SECONDS", 3600.0)
+        # Empty disables the on-disk tier.
+        self.cache_db_path = _env_str("AUDIT_CACHE_DB", "")
+        self.cache_db_max_entries = _env_int("AUDIT_CACHE_DB_MAX_ENTRIES", 100000)
+
+        # Empty disables the thread API.
+        self.thread_index_path = _env_str("THREAD_INDEX_DB", "")
+
+        # Empty disables the audit history store.
+        self.history_db_path = _env_str("AUDIT_HISTORY_DB", "")
+        self.history_batch_size = _env_int("HISTORY_BATCH_SIZE", 500)
+        self.history_flush_seconds = _env_float("HISTORY_FLUSH_SECONDS", 1.0)
+        self.history_max_pending = _env_int("HISTORY_MAX_PENDING", 10000)
+
+        # Signing costs every audit a MinHash pass, so detection is opt-in.
+        self.near_dup_enabled = _env_str("NEAR_DUP_ENABLED", "false").lower() in ("1", "true", "yes")
+        # Reuse content-only rule results from a near-duplicate audited
+        # earlier. Needs NEAR_DUP_ENABLED.
+        self.near_dup_reuse = _env_str("NEAR_DUP_REUSE", "false").lower() in ("1", "true", "yes")
+        self.near_dup_min_similarity = _env_float("NEAR_DUP_MIN_SIMILARITY", 0.85)
+        self.near_dup_window_seconds = _env_float("NEAR_DUP_WINDOW_SECONDS", 86400.0)
+        self.near_dup_max_entries = _env_int("NEAR_DUP_MAX_ENTRIES", 50000)
+        self.near_dup_max_tokens = _env_int("NEAR_DUP_MAX_TOKENS", 1000)
+        # Empty keeps the index in memory only.
+        self.near_dup_db_path = _env_str("NEAR_DUP_DB", "")
+
+        # Empty disables the job API and its worker processes.
+        self.jobs_db_path = _env_str("JOBS_DB", "")
+        self.jobs_dir = _env_str("JOBS_DIR", "data/jobs")
+        self.job_workers = _env_int("JOB_WORKERS", 1)
+        # Added to the worker processes' nice value so bulk work yields the
+        # CPU to interactive requests.
+        self.job_worker_nice = _env_int("JOB_WORKER_NICE", 10)
+        self.job_client_concurrency = _env_int("JOB_CLIENT_CONCURRENCY", 4)
+        self.job_claim_batch = _env_int("JOB_CLAIM_BATCH", 8)
+        self.job_max_attempts = _env_int("JOB_MAX_ATTEMPTS", 3)
+        self.job_message_timeout_seconds = _env_float("JOB_MESSAGE_TIMEOUT_SECONDS", 300.0)
+        self.job_poll_seconds = _env_float("JOB_POLL_SECONDS", 0.5)
+        self.job_retention_seconds = _env_float("JOB_RETENTION_SECONDS", 7 * 86400.0)
+        self.job_cleanup_interval_seconds = _env_float("JOB_CLEANUP_INTERVAL_SECONDS", 300.0)
+        self.job_max_upload_bytes = _env_int("JOB_MAX_UPLOAD_BYTES", 2 * 1024 * 1024 * 1024)
+        # Total size of the messages extracted from a job's zip archives.
+        self.job_max_extracted_bytes = _env_int("JOB_MAX_EXTRACTED_BYTES", 8 * 1024 * 1024 * 1024)
+
+        # Empty uses the manifest shipped in app/rules.
+        self.rules_manifest_path = _env_str("RULES_MANIFEST", "")
+        # Empty uses the profiles shipped in app/rules.
+        self.rule_profiles_path = _env_str("RULE_PROFILES", "")
+
+        self.rule_timeout_seconds = _env_float("RULE_TIMEOUT_SECONDS", 2.0)
+        self.audit_deadline_seconds = _env_float("AUDIT_DEADLINE_SECONDS", 10.0)
+        self.rule_breaker_threshold = _env_int("RULE_BREAKER_THRESHOLD", 3)
+        self.rule_breaker_cooldown_seconds = _env_float("RULE_BREAKER_COOLDOWN_SECONDS", 30.0)
+
+        # Body characters scanned by declarative rules that set no
+        # prefix_length. 0 scans the whole body, which for HTML means
+        # converting all of it.
+        self.declarative_body_scan_chars = _env_int("DECLARATIVE_BODY_SCAN_CHARS", 8000)
+
+        # Smallest batch for which rules with evaluate_batch run once over all
+        # messages instead of once per message.
+        self.rule_batch_min_threads = _env_int("RULE_BATCH_MIN_THREADS", 8)
+
+        # Adds duration_ms to every RuleResult.details.
+        self.rule_timing_details = _env_str("RULE_TIMING_DETAILS", "false").lower() in ("1", "true", "yes")
+
+        # Sent as X-Admin-Token by callers of the admin-only options. Empty
+        # disables them.
+        self.admin_token = _env_str("ADMIN_TOKEN", "")
+        self.profile_top_functions = _env_int("PROFILE_TOP_FUNCTIONS", 30)
+        self.sampler_interval_seconds = _env_float("SAMPLER_INTERVAL_SECONDS", 0.01)
+        self.sampler_max_seconds = _env_float("SAMPLER_MAX_SECONDS", 300.0)
+
+
+settings = Settings()
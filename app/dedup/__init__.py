@@ -0,0 +1,3 @@
+from .index import NearDuplicateIndex, near_dup_index
+
+__all__ = ['NearDuplicateIndex', 'near_dup_index']
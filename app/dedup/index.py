@@ -0,0 +1,326 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+from loguru import logger
+
+from ..config import settings
+from ..metrics import near_dup_lookups, near_dup_matches, near_dup_reused
+from ..models import AuditResult, HeaderFields, RuleResult
+from ..models.audit import RuleStatus
+from .minhash import band_keys, estimate_similarity, minhash_signature
+
+
+# Characters of body text read per signature token. Generous, so the token
+# cap rather than the prefix decides how much of a message is signed.
+PREFIX_CHARS_PER_TOKEN = 16
+
+
+class NearDuplicateEntry:
+
+    __slots__ = ('entry_id', 'message_hash', 'signature', 'seen_at', 'fingerprint', 'sender', 'subject', 'cluster_id', 'results',
+                 'reuse_keys')
+
+    def __init__(self, entry_id: int, message_hash: str, signature: array, seen_at: float, fingerprint: str,
+                 sender: str, subject: str, cluster_id: int, results: Dict[str, RuleResult],
+                 reuse_keys: Dict[str, str]):
+        self.entry_id = entry_id
+        self.message_hash = message_hash
+        self.signature = signature
+        self.seen_at = seen_at
+        self.fingerprint = fingerprint
+        self.sender = sender
+        self.subject = subject
+        self.cluster_id = cluster_id
+        self.results = results
+        self.reuse_keys = reuse_keys
+
+
+class NearDuplicateMatch:
+
+    __slots__ = ('entry', 'similarity')
+
+    def __init__(self, entry: NearDuplicateEntry, similarity: float):
+        self.entry = entry
+        self.similarity = similarity
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, path: str = "", min_similarity: float = 0.85, window_seconds: float = 86400.0,
+                 max_entries: int = 50000, max_tokens: int = 1000, enabled: bool = True, reuse: bool = False):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.window_seconds = window_seconds
+        self.max_entries = max(1, max_entries)
+        self.max_tokens = max_tokens
+        self.enabled = enabled
+        self.reuse = reuse
+        self._entries: "OrderedDict[int, NearDuplicateEntry]" = OrderedDict()
+        self._bands: Dict[bytes, Set[int]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        # Set by start() in the serving process. Until then every process keeps
+        # its own in-memory index.
+        self._pid: Optional[int] = None
+        # Entries added in a forked pool process, handed back to the parent
+        # with the audit result.
+        self._outbox: List[Dict[str, Any]] = []
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS near_dup_entries ("
+                "entry_id INTEGER PRIMARY KEY, message_hash TEXT NOT NULL, signature BLOB NOT NULL, "
+                "seen_at REAL NOT NULL, fingerprint TEXT NOT NULL, sender TEXT, subject TEXT, "
+                "cluster_id INTEGER NOT NULL, results TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS near_dup_entries_seen ON near_dup_entries (seen_at)")
+            # Files written before reuse keys existed; their entries are never
+            # reused.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(near_dup_entries)")}
+            if 'reuse_keys' not in columns:
+                conn.execute("ALTER TABLE near_dup_entries ADD COLUMN reuse_keys TEXT")
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened near-duplicate index at {self.path}")
+        return self._conn
+
+    def start(self):
+        # Loads the persisted window. Only the serving process persists; pool
+        # workers forked after this inherit the loaded entries.
+        self._pid = os.getpid()
+        if not self.enabled or not self.path:
+            return
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT entry_id, message_hash, signature, seen_at, fingerprint, sender, subject, cluster_id, results, reuse_keys "
+                "FROM near_dup_entries WHERE seen_at >= ? ORDER BY entry_id DESC LIMIT ?",
+                (cutoff, self.max_entries)
+            ).fetchall()
+            for entry_id, message_hash, blob, seen_at, fingerprint, sender, subject, cluster_id, results, reuse_keys in reversed(rows):
+                signature = array('I')
+                signature.frombytes(blob)
+                entry = NearDuplicateEntry(
+                    entry_id, message_hash, signature, seen_at, fingerprint, sender or '', subject or '', cluster_id,
+                    {name: RuleResult(**raw) for name, raw in json.loads(results).items()},
+                    json.loads(reuse_keys) if reuse_keys else {}
+                )
+                self._insert(entry)
+                self._next_id = max(self._next_id, entry_id + 1)
+            self._conn.execute("DELETE FROM near_dup_entries WHERE seen_at < ?", (cutoff,))
+            self._conn.commit()
+        logger.info(f"Loaded {len(rows)} near-duplicate entries")
+
+    def signature(self, text: str) -> array:
+        return minhash_signature(text, self.max_tokens)
+
+    def signature_for(self, message: Any) -> array:
+        # Bounded prefix, so HTML-only messages are not converted in full.
+        return self.signature(message.features.lower_prefix(self.max_tokens * PREFIX_CHARS_PER_TOKEN))
+
+    def _insert(self, entry: NearDuplicateEntry):
+        self._entries[entry.entry_id] = entry
+        for key in band_keys(entry.signature):
+            self._bands.setdefault(key, set()).add(entry.entry_id)
+
+    def _evict(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_entries and entry.seen_at >= cutoff:
+                break
+            del self._entries[entry.entry_id]
+            for key in band_keys(entry.signature):
+                bucket = self._bands.get(key)
+                if bucket is not None:
+                    bucket.discard(entry.entry_id)
+                    if not bucket:
+                        del self._bands[key]
+
+    def _best_match(self, signature: array, cutoff: float) -> Optional[NearDuplicateMatch]:
+        candidates: Set[int] = set()
+        for key in band_keys(signature):
+            candidates.update(self._bands.get(key, ()))
+        best: Optional[NearDuplicateMatch] = None
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry.seen_at < cutoff:
+                continue
+            similarity = estimate_similarity(signature, entry.signature)
+            if similarity >= self.min_similarity and (best is None or similarity > best.similarity):
+                best = NearDuplicateMatch(entry, similarity)
+        return best
+
+    def lookup(self, signature: array) -> Optional[NearDuplicateMatch]:
+        if not self.enabled or not signature:
+            return None
+        with self._lock:
+            best = self._best_match(signature, time.time() - self.window_seconds)
+        near_dup_lookups.inc()
+        if best is not None:
+            near_dup_matches.inc()
+        return best
+
+    def reusable_results(self, match: Optional[NearDuplicateMatch], fingerprint: str,
+                         reuse_keys: Dict[str, str]) -> Dict[str, RuleResult]:
+        # A similar body is only a candidate: each rule's result is reused
+        # when the exact input that rule reads is the same as well.
+        if not self.reuse or match is None or match.entry.fingerprint != fingerprint:
+            return {}
+        reused = {}
+        for name, key in reuse_keys.items():
+            result = match.entry.results.get(name)
+            if result is None or match.entry.reuse_keys.get(name) != key:
+                continue
+            details = dict(result.details or {})
+            details.update({
+                "near_duplicate_of": match.entry.message_hash,
+                "similarity": round(match.similarity, 3)
+            })
+            reused[name] = result.model_copy(update={"details": details})
+        near_dup_reused.inc(len(reused))
+        return reused
+
+    def add(self, message_hash: str, signature: array, fingerprint: str, headers: HeaderFields,
+            audit_result: AuditResult, reuse_keys: Dict[str, str]):
+        if not self.enabled or not signature:
+            return
+        results = {}
+        for result in audit_result.rule_results:
+            if result.rule_name not in reuse_keys or result.status == RuleStatus.TIMEOUT:
+                continue
+            details = result.details or {}
+            # Keep first-hand verdicts only, so reuse does not chain.
+            if "near_duplicate_of" in details:
+                continue
+            results[result.rule_name] = result
+        self.submit([{
+            "message_hash": message_hash,
+            "signature": signature.tobytes(),
+            "seen_at": time.time(),
+            "fingerprint": fingerprint,
+            "sender": headers.get('from', ''),
+            "subject": headers.get('subject', ''),
+            "results": {name: result.model_dump(mode="json") for name, result in results.items()},
+            "reuse_keys": {name: reuse_keys[name] for name in results},
+        }])
+
+    def drain(self) -> List[Dict[str, Any]]:
+        items, self._outbox = self._outbox, []
+        return items
+
+    def submit(self, items: Optional[List[Dict[str, Any]]]):
+        if not items:
+            return
+        owner = self._pid == os.getpid()
+        with self._lock:
+            for item in items:
+                self._add_item(item, persist=owner)
+            if owner and self._conn is not None:
+                self._conn.commit()
+        if self._pid is not None and not owner:
+            self._outbox.extend(items)
+
+    def _add_item(self, item: Dict[str, Any], persist: bool):
+        now = time.time()
+        signature = array('I')
+        signature.frombytes(item["signature"])
+        # The cluster is resolved by whichever index stores the entry, so ids
+        # assigned in a pool worker never leak into the parent.
+        anchor = self._best_match(signature, now - self.window_seconds)
+        if anchor is not None and anchor.entry.message_hash == item["message_hash"] \
+                and anchor.entry.fingerprint == item["fingerprint"]:
+            return
+        if persist and self.path:
+            # SQLite assigns the id, so server workers sharing one file never
+            # reuse each other's ids.
+            entry_id = self._connect().execute(
+                "INSERT INTO near_dup_entries "
+                "(message_hash, signature, seen_at, fingerprint, sender, subject, cluster_id, results, reuse_keys) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    item["message_hash"], item["signature"], item["seen_at"], item["fingerprint"], item["sender"],
+                    item["subject"], anchor.entry.cluster_id if anchor is not None else 0, json.dumps(item["results"]),
+                    json.dumps(item["reuse_keys"])
+                )
+            ).lastrowid
+            if anchor is None:
+                self._conn.execute("UPDATE near_dup_entries SET cluster_id = ? WHERE entry_id = ?", (entry_id, entry_id))
+            self._next_id = max(self._next_id, entry_id + 1)
+        else:
+            entry_id = self._next_id
+            self._next_id += 1
+        entry = NearDuplicateEntry(
+            entry_id, item["message_hash"], signature, item["seen_at"], item["fingerprint"],
+            item["sender"], item["subject"], anchor.entry.cluster_id if anchor is not None else entry_id,
+            {name: RuleResult(**raw) for name, raw in item["results"].items()},
+            item["reuse_keys"]
+        )
+        self._insert(entry)
+        self._evict(now)
+
+    def clusters(self, window_seconds: Optional[float] = None, min_size: int = 2, limit: int = 100) -> List[Dict[str, Any]]:
+        cutoff = time.time() - (window_seconds if window_seconds is not None else self.window_seconds)
+        groups: Dict[int, List[NearDuplicateEntry]] = {}
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.seen_at >= cutoff:
+                    groups.setdefault(entry.cluster_id, []).append(entry)
+
+        clusters = []
+        for cluster_id, members in groups.items():
+            distinct = {member.message_hash for member in members}
+            if len(distinct) < min_size:
+                continue
+            first = members[0]
+            clusters.append({
+                "cluster_id": cluster_id,
+                "size": len(distinct),
+                "first_seen": first.seen_at,
+                "last_seen": members[-1].seen_at,
+                "subject": first.subject,
+                "senders": sorted({member.sender for member in members})[:10],
+                "message_hashes": sorted(distinct)[:50],
+            })
+        clusters.sort(key=lambda cluster: (-cluster["size"], -cluster["last_seen"]))
+        return clusters[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "reuse": self.reuse,
+            "entries": len(self._entries),
+            "lookups": int(near_dup_lookups.value()),
+            "matches": int(near_dup_matches.value()),
+            "reused_results": int(near_dup_reused.value()),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+near_dup_index = NearDuplicateIndex(
+    settings.near_dup_db_path,
+    min_similarity=settings.near_dup_min_similarity,
+    window_seconds=settings.near_dup_window_seconds,
+    max_entries=settings.near_dup_max_entries,
+    max_tokens=settings.near_dup_max_tokens,
+    enabled=settings.near_dup_enabled,
+    reuse=settings.near_dup_reuse
+)
@@ -0,0 +1,91 @@
+import random
+import re
+from array import array
+from hashlib import blake2b
+from typing import List, Set
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Campaign copies differ in links, addresses and counters, so those are
+# folded to placeholders before shingling.
+_URL_PATTERN = re.compile(r'(?:https?://|www\.)\S+')
+_EMAIL_PATTERN = re.compile(r'\S+@\S+')
+_DIGIT_PATTERN = re.compile(r'\d+')
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Universal hashing (a * h + b) mod p over 32-bit shingle hashes. Fixed seed:
+# signatures are persisted and compared across processes.
+_PRIME = 4294967311
+_MASK = 0xFFFFFFFF
+_random = random.Random(0x6D696E68)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+if numpy is not None:
+    # a * h needs up to 65 bits, so a is split into 16-bit halves to keep
+    # every intermediate below 2**64 and the result identical to the
+    # pure-Python path.
+    _A_HIGH = numpy.array([a >> 16 for a, _ in _PERMUTATIONS], dtype=numpy.uint64)[:, None]
+    _A_LOW = numpy.array([a & 0xFFFF for a, _ in _PERMUTATIONS], dtype=numpy.uint64)[:, None]
+    _B = numpy.array([b for _, b in _PERMUTATIONS], dtype=numpy.uint64)[:, None]
+    _NP_PRIME = numpy.uint64(_PRIME)
+
+
+def normalize_tokens(text: str, max_tokens: int = 0) -> List[str]:
+    text = _URL_PATTERN.sub(' url ', text.lower())
+    text = _EMAIL_PATTERN.sub(' addr ', text)
+    text = _DIGIT_PATTERN.sub('0', text)
+    tokens = _TOKEN_PATTERN.findall(text)
+    return tokens[:max_tokens] if max_tokens else tokens
+
+
+def shingle_hashes(text: str, max_tokens: int = 0) -> Set[int]:
+    tokens = normalize_tokens(text, max_tokens)
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {' '.join(tokens)} if tokens else set()
+    else:
+        shingles = {' '.join(tokens[index:index + SHINGLE_SIZE]) for index in range(len(tokens) - SHINGLE_SIZE + 1)}
+    return {
+        int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+        for shingle in shingles
+    }
+
+
+def _numpy_signature(hashes: Set[int]) -> array:
+    values = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+    products = (_A_HIGH * values) % _NP_PRIME * numpy.uint64(65536) + _A_LOW * values + _B
+    minima = ((products % _NP_PRIME) & numpy.uint64(_MASK)).min(axis=1)
+    return array('I', minima.astype(numpy.uint32).tobytes())
+
+
+def minhash_signature(text: str, max_tokens: int = 0) -> array:
+    hashes = shingle_hashes(text, max_tokens)
+    if not hashes:
+        return array('I')
+    if numpy is not None:
+        return _numpy_signature(hashes)
+    return array('I', [
+        min([((a * value + b) % _PRIME) & _MASK for value in hashes])
+        for a, b in _PERMUTATIONS
+    ])
+
+
+def band_keys(signature: array) -> List[bytes]:
+    return [
+        bytes((band,)) + signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        for band in range(BANDS)
+    ]
+
+
+def estimate_similarity(left: array, right: array) -> float:
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
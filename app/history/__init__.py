@@ -0,0 +1,3 @@
+from .store import HistoryStore, history_store
+
+__all__ = ['HistoryStore', 'history_store']
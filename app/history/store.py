@@ -0,0 +1,316 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parseaddr
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from ..config import settings
+from ..models import AuditResult, HeaderFields
+
+
+PERIODS = ("day", "week", "month")
+
+_STOP = object()
+
+
+def sender_domain(sender: Optional[str]) -> str:
+    address = parseaddr(sender or '')[1]
+    return address.rpartition('@')[2].lower() if '@' in address else ''
+
+
+def period_buckets(moment: datetime) -> Dict[str, str]:
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    iso_year, iso_week, _ = moment.isocalendar()
+    return {
+        "day": moment.strftime("%Y-%m-%d"),
+        "week": f"{iso_year}-W{iso_week:02d}",
+        "month": moment.strftime("%Y-%m"),
+    }
+
+
+def build_entry(message_hash: str, fingerprint: str, headers: HeaderFields, parsed_date: Optional[datetime], audit_result: AuditResult) -> Dict[str, Any]:
+    return {
+        "message_hash": message_hash,
+        "fingerprint": fingerprint,
+        "audited_at": time.time(),
+        "sender": headers.get('from', ''),
+        "parsed_date": parsed_date.isoformat() if parsed_date else None,
+        "overall_score": audit_result.overall_score,
+        "rules": [
+            (result.rule_name, result.status.value, result.score)
+            for result in audit_result.rule_results
+        ],
+    }
+
+
+class HistoryStore:
+
+    def __init__(self, path: str, batch_size: int = 500, flush_seconds: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.enabled = False
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(0, max_pending))
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        # Entries recorded in a forked pool process, handed back to the
+        # parent with the audit result.
+        self._outbox: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._written = 0
+        self._duplicates = 0
+        self._dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_audits ("
+                "id INTEGER PRIMARY KEY, message_hash TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                "audited_at REAL NOT NULL, sender TEXT, sender_domain TEXT NOT NULL, parsed_date TEXT, "
+                "overall_score REAL NOT NULL, UNIQUE (message_hash, fingerprint))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_rule_outcomes ("
+                "audit_id INTEGER NOT NULL, rule_name TEXT NOT NULL, status TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            # Running totals, updated in the same transaction as the rows they
+            # summarise so queries never scan history_audits.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_rule_stats ("
+                "period TEXT NOT NULL, bucket TEXT NOT NULL, sender_domain TEXT NOT NULL, rule_name TEXT NOT NULL, "
+                "total INTEGER NOT NULL, passed INTEGER NOT NULL, failed INTEGER NOT NULL, timed_out INTEGER NOT NULL, "
+                "score_sum REAL NOT NULL, PRIMARY KEY (period, bucket, sender_domain, rule_name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_audit_stats ("
+                "period TEXT NOT NULL, bucket TEXT NOT NULL, sender_domain TEXT NOT NULL, "
+                "audits INTEGER NOT NULL, score_sum REAL NOT NULL, PRIMARY KEY (period, bucket, sender_domain))"
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened audit history at {self.path}")
+        return self._conn
+
+    def start(self):
+        if not self.path or self._thread is not None:
+            return
+        self.enabled = True
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, entry: Dict[str, Any]):
+        if not self.enabled:
+            return
+        if os.getpid() != self._pid:
+            self._outbox.append(entry)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # The request path never waits on disk; a backlog costs history rows.
+            self._dropped += 1
+
+    def drain(self) -> List[Dict[str, Any]]:
+        entries, self._outbox = self._outbox, []
+        return entries
+
+    def submit(self, entries: Optional[List[Dict[str, Any]]]):
+        for entry in entries or []:
+            self.record(entry)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stopping = item is _STOP
+            if not stopping:
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_seconds
+            while not stopping and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} history entries: {str(e)}")
+            if stopping:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        rule_deltas: Dict[Tuple[str, str, str, str], List[float]] = {}
+        audit_deltas: Dict[Tuple[str, str, str], List[float]] = {}
+
+        with self._lock:
+            conn = self._connect()
+            written = 0
+            for entry in batch:
+                domain = sender_domain(entry["sender"])
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO history_audits "
+                    "(message_hash, fingerprint, audited_at, sender, sender_domain, parsed_date, overall_score) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        entry["message_hash"], entry["fingerprint"], entry["audited_at"], entry["sender"],
+                        domain, entry["parsed_date"], entry["overall_score"]
+                    )
+                )
+                # Re-audits of the same message under the same rules are not
+                # new data points.
+                if cursor.rowcount != 1:
+                    continue
+                written += 1
+                audit_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO history_rule_outcomes (audit_id, rule_name, status, score) VALUES (?, ?, ?, ?)",
+                    [(audit_id, name, status, score) for name, status, score in entry["rules"]]
+                )
+
+                moment = (
+                    datetime.fromisoformat(entry["parsed_date"]) if entry["parsed_date"]
+                    else datetime.fromtimestamp(entry["audited_at"], timezone.utc)
+                )
+                for period, bucket in period_buckets(moment).items():
+                    totals = audit_deltas.setdefault((period, bucket, domain), [0, 0.0])
+                    totals[0] += 1
+                    totals[1] += entry["overall_score"]
+                    for name, status, score in entry["rules"]:
+                        counts = rule_deltas.setdefault((period, bucket, domain, name), [0, 0, 0, 0, 0.0])
+                        counts[0] += 1
+                        counts[1] += status == "pass"
+                        counts[2] += status == "fail"
+                        counts[3] += status == "timeout"
+                        counts[4] += score
+
+            conn.executemany(
+                "INSERT INTO history_rule_stats "
+                "(period, bucket, sender_domain, rule_name, total, passed, failed, timed_out, score_sum) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (period, bucket, sender_domain, rule_name) DO UPDATE SET "
+                "total = total + excluded.total, passed = passed + excluded.passed, "
+                "failed = failed + excluded.failed, timed_out = timed_out + excluded.timed_out, "
+                "score_sum = score_sum + excluded.score_sum",
+                [key + tuple(counts) for key, counts in rule_deltas.items()]
+            )
+            conn.executemany(
+                "INSERT INTO history_audit_stats (period, bucket, sender_domain, audits, score_sum) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (period, bucket, sender_domain) DO UPDATE SET "
+                "audits = audits + excluded.audits, score_sum = score_sum + excluded.score_sum",
+                [key + tuple(totals) for key, totals in audit_deltas.items()]
+            )
+            conn.commit()
+
+        self._written += written
+        self._duplicates += len(batch) - written
+
+    def _filters(self, period: str, domain: Optional[str], since: Optional[str], until: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = ["period = ?"], [period]
+        if domain is not None:
+            clauses.append("sender_domain = ?")
+            params.append(domain.lower())
+        if since:
+            clauses.append("bucket >= ?")
+            params.append(since)
+        if until:
+            clauses.append("bucket <= ?")
+            params.append(until)
+        return " AND ".join(clauses), params
+
+    def rule_stats(self, period: str = "week", rule: Optional[str] = None, domain: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None, by_domain: bool = True) -> List[Dict[str, Any]]:
+        where, params = self._filters(period, domain, since, until)
+        if rule is not None:
+            where += " AND rule_name = ?"
+            params.append(rule)
+        domain_column = "sender_domain" if by_domain else "''"
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT bucket, {domain_column}, rule_name, SUM(total), SUM(passed), SUM(failed), SUM(timed_out), "
+                f"SUM(score_sum) FROM history_rule_stats WHERE {where} "
+                f"GROUP BY bucket, {domain_column}, rule_name ORDER BY bucket, {domain_column}, rule_name",
+                params
+            ).fetchall()
+        return [
+            {
+                "bucket": bucket,
+                "sender_domain": domain_name if by_domain else None,
+                "rule_name": rule_name,
+                "total": total,
+                "passed": passed,
+                "failed": failed,
+                "timed_out": timed_out,
+                "pass_rate": passed / total if total else 0.0,
+                "mean_score": score_sum / total if total else 0.0,
+            }
+            for bucket, domain_name, rule_name, total, passed, failed, timed_out, score_sum in rows
+        ]
+
+    def audit_stats(self, period: str = "week", domain: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None, by_domain: bool = False) -> List[Dict[str, Any]]:
+        where, params = self._filters(period, domain, since, until)
+        domain_column = "sender_domain" if by_domain else "''"
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT bucket, {domain_column}, SUM(audits), SUM(score_sum) FROM history_audit_stats "
+                f"WHERE {where} GROUP BY bucket, {domain_column} ORDER BY bucket, {domain_column}",
+                params
+            ).fetchall()
+        return [
+            {
+                "bucket": bucket,
+                "sender_domain": domain_name if by_domain else None,
+                "audits": audits,
+                "mean_score": score_sum / audits if audits else 0.0,
+            }
+            for bucket, domain_name, audits, score_sum in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": self._queue.qsize(),
+            "written": self._written,
+            "duplicates": self._duplicates,
+            "dropped": self._dropped,
+        }
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        self.enabled = False
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+history_store = HistoryStore(
+    settings.history_db_path,
+    batch_size=settings.history_batch_size,
+    flush_seconds=settings.history_flush_seconds,
+    max_pending=settings.history_max_pending
+)
@@ -0,0 +1,4 @@
+from .runner import JobRunner, job_runner, job_store
+from .store import PRIORITIES, JobStore
+
+__all__ = ['JobRunner', 'JobStore', 'PRIORITIES', 'job_runner', 'job_store']
@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from ..config import settings
+from .store import JobStore
+from .worker import run_worker
+
+
+class JobRunner:
+
+    def __init__(self, store: JobStore, workers: int = 1):
+        self.store = store
+        self.workers = max(0, workers)
+        self._processes: List[multiprocessing.Process] = []
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._restarts = 0
+        self._last_cleanup = 0.0
+        # Spawned rather than forked: workers must not inherit the serving
+        # process's event loop, pools or open SQLite handles.
+        self._context = multiprocessing.get_context("spawn")
+        # Set in processes forked from the supervisor, such as prefork server
+        # workers; they can read the queue but not manage its workers.
+        self._forked = False
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._processes = []
+        self._monitor = None
+        self._stop = threading.Event()
+        self._forked = True
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.store.path)
+
+    def _spawn(self) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=run_worker, args=(self.store.path, self.store.jobs_dir), name="audit-job-worker", daemon=True
+        )
+        process.start()
+        return process
+
+    def start(self):
+        if not self.enabled or self.workers == 0 or self._monitor is not None:
+            return
+        recovered = self.store.recover_all(settings.job_max_attempts)
+        if recovered:
+            logger.warning(f"Requeued {recovered} job messages left running by a previous run")
+        self._stop.clear()
+        self._processes = [self._spawn() for _ in range(self.workers)]
+        self._monitor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+        self._monitor.start()
+        logger.info(f"Started {self.workers} job workers")
+
+    def _supervise(self):
+        while not self._stop.wait(settings.job_poll_seconds):
+            try:
+                self._check_workers()
+                self._check_stale()
+                if time.monotonic() - self._last_cleanup >= settings.job_cleanup_interval_seconds:
+                    self._last_cleanup = time.monotonic()
+                    self.store.cleanup(settings.job_retention_seconds)
+            except Exception as e:
+                logger.error(f"Job supervisor error: {str(e)}")
+
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._stop.is_set():
+                continue
+            reason = f"Worker exited with code {process.exitcode}"
+            released = self.store.release_worker(process.pid, settings.job_max_attempts, reason)
+            logger.warning(f"{reason}; released {released} running messages and restarting it")
+            self._restarts += 1
+            self._processes[index] = self._spawn()
+
+    def _check_stale(self):
+        # A message that has run past its budget is taken to have hung the
+        # worker; killing it sends the message down the crash path above.
+        alive = {process.pid: process for process in self._processes if process.is_alive()}
+        for pid in self.store.stale_workers(settings.job_message_timeout_seconds):
+            process = alive.get(pid)
+            if process is not None:
+                logger.warning(f"Job worker {pid} exceeded {settings.job_message_timeout_seconds:.0f}s on one message, killing it")
+                process.kill()
+                process.join(5)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"enabled": self.enabled, "workers": self.workers}
+        if not self._forked:
+            stats["alive"] = sum(1 for process in self._processes if process.is_alive())
+            stats["restarts"] = self._restarts
+        if self.enabled:
+            stats.update(self.store.stats())
+        return stats
+
+    def shutdown(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        for process in self._processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._processes = []
+        self.store.close()
+
+
+job_store = JobStore(settings.jobs_db_path, settings.jobs_dir)
+job_runner = JobRunner(job_store, settings.job_workers)
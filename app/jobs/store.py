@@ -0,0 +1,355 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from loguru import logger
+
+from ..parser.sources import MessageRef
+
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2}
+
+
+class JobStore:
+
+    def __init__(self, path: str, jobs_dir: str):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # The prefork server forks request workers while the supervisor
+        # thread may hold the lock or the connection.
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            # Workers and the API write to the same file; wait for the lock
+            # rather than failing.
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, client TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, total INTEGER NOT NULL, "
+                "done INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, score_sum REAL NOT NULL DEFAULT 0, "
+                "profile TEXT, rules TEXT, directory TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+            # pending -> claimed (by a worker, not started) -> running -> done | failed
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_messages ("
+                "job_id TEXT NOT NULL, seq INTEGER NOT NULL, source_id TEXT NOT NULL, path TEXT NOT NULL, "
+                "offset INTEGER NOT NULL, length INTEGER NOT NULL, unquote INTEGER NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, worker INTEGER, claimed_at REAL, "
+                "overall_score REAL, report_full BLOB, report_summary BLOB, error TEXT, "
+                "PRIMARY KEY (job_id, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_messages_status ON job_messages (job_id, status, seq)")
+            conn.execute("CREATE INDEX IF NOT EXISTS job_messages_worker ON job_messages (status, worker)")
+            self._conn = conn
+            logger.info(f"Opened job store at {self.path}")
+        return self._conn
+
+    def job_directory(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def create_job(self, job_id: str, client: str, priority: int, refs: Iterable[MessageRef],
+                   profile: Optional[str] = None, rule_names: Optional[Sequence[str]] = None) -> int:
+        rows = [
+            (job_id, seq, ref.source_id, ref.path, ref.offset, ref.length, int(ref.unquote_from), "pending")
+            for seq, ref in enumerate(refs)
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, client, priority, status, created_at, total, profile, rules, directory) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job_id, client, priority, "queued" if rows else "done", time.time(), len(rows), profile,
+                        json.dumps(list(rule_names)) if rule_names is not None else None, self.job_directory(job_id)
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO job_messages (job_id, seq, source_id, path, offset, length, unquote, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT job_id, client, priority, status, created_at, started_at, finished_at, total, done, failed, "
+                "score_sum, profile, rules FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM job_messages WHERE job_id = ? AND status IN ('pending', 'claimed', 'running') "
+                "GROUP BY status",
+                (job_id,)
+            ).fetchall())
+        (job_id, client, priority, status, created_at, started_at, finished_at,
+         total, done, failed, score_sum, profile, rules) = row
+        priority_name = next((name for name, value in PRIORITIES.items() if value == priority), str(priority))
+        return {
+            "job_id": job_id,
+            "client": client,
+            "priority": priority_name,
+            "status": status,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "profile": profile,
+            "rules": json.loads(rules) if rules else None,
+            "progress": {
+                "total": total,
+                "done": done,
+                "failed": failed,
+                "running": counts.get("running", 0) + counts.get("claimed", 0),
+                "pending": counts.get("pending", 0),
+                "fraction": (done + failed) / total if total else 1.0,
+            },
+            "mean_score": score_sum / done if done else None,
+        }
+
+    def results(self, job_id: str, offset: int, limit: int, view: str = "full") -> List[Tuple[int, str, str, Optional[bytes], Optional[str]]]:
+        # Pages stop at the first message still in flight, so a client paging
+        # by next_offset never skips a message that finishes later.
+        column = "report_summary" if view == "summary" else "report_full"
+        with self._lock:
+            conn = self._connect()
+            frontier = conn.execute(
+                "SELECT MIN(seq) FROM job_messages WHERE job_id = ? AND seq >= ? AND status IN ('pending', 'claimed', 'running')",
+                (job_id, offset)
+            ).fetchone()[0]
+            if frontier is not None:
+                limit = min(limit, frontier - offset)
+            return conn.execute(
+                f"SELECT seq, source_id, status, {column}, error FROM job_messages "
+                f"WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+            conn.execute(
+                "UPDATE job_messages SET status = 'cancelled' WHERE job_id = ? AND status IN ('pending', 'claimed')",
+                (job_id,)
+            )
+            conn.execute("COMMIT")
+        return cursor.rowcount == 1
+
+    def claim(self, worker: int, batch_size: int, client_cap: int) -> List[Dict[str, Any]]:
+        # One short write transaction: pick the highest priority job whose
+        # client is under its in-flight cap and claim a batch from it.
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                in_flight = dict(conn.execute(
+                    "SELECT j.client, COUNT(*) FROM job_messages m JOIN jobs j ON j.job_id = m.job_id "
+                    "WHERE m.status IN ('claimed', 'running') GROUP BY j.client"
+                ).fetchall())
+                jobs = conn.execute(
+                    "SELECT job_id, client, profile, rules FROM jobs WHERE status IN ('queued', 'running') "
+                    "ORDER BY priority DESC, created_at"
+                ).fetchall()
+                for job_id, client, profile, rules in jobs:
+                    room = min(batch_size, client_cap - in_flight.get(client, 0)) if client_cap > 0 else batch_size
+                    if room <= 0:
+                        continue
+                    rows = conn.execute(
+                        "SELECT seq, source_id, path, offset, length, unquote FROM job_messages "
+                        "WHERE job_id = ? AND status = 'pending' ORDER BY seq LIMIT ?",
+                        (job_id, room)
+                    ).fetchall()
+                    if not rows:
+                        continue
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE job_messages SET status = 'claimed', worker = ?, claimed_at = ? WHERE job_id = ? AND seq = ?",
+                        [(worker, now, job_id, row[0]) for row in rows]
+                    )
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE job_id = ?",
+                        (now, job_id)
+                    )
+                    conn.execute("COMMIT")
+                    rule_names = json.loads(rules) if rules else None
+                    return [
+                        {
+                            "job_id": job_id,
+                            "seq": seq,
+                            "ref": MessageRef(source_id, path, offset, length, bool(unquote)),
+                            "profile": profile,
+                            "rule_names": rule_names,
+                        }
+                        for seq, source_id, path, offset, length, unquote in rows
+                    ]
+                conn.execute("COMMIT")
+                return []
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def start_message(self, job_id: str, seq: int, worker: int) -> bool:
+        # Attempts count only messages a worker actually began, so a crash
+        # charges the message that caused it and not the rest of the batch.
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE job_messages SET status = 'running', attempts = attempts + 1, claimed_at = ? "
+                "WHERE job_id = ? AND seq = ? AND status = 'claimed' AND worker = ?",
+                (time.time(), job_id, seq, worker)
+            )
+        return cursor.rowcount == 1
+
+    def finish_message(self, job_id: str, seq: int, worker: int, overall_score: Optional[float] = None,
+                       report_full: Optional[bytes] = None, report_summary: Optional[bytes] = None,
+                       error: Optional[str] = None):
+        status = "failed" if error is not None else "done"
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "UPDATE job_messages SET status = ?, overall_score = ?, report_full = ?, report_summary = ?, error = ? "
+                    "WHERE job_id = ? AND seq = ? AND status = 'running' AND worker = ?",
+                    (status, overall_score, report_full, report_summary, error, job_id, seq, worker)
+                )
+                if cursor.rowcount == 1:
+                    self._count_finished(conn, job_id, status, overall_score or 0.0)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _count_finished(self, conn: sqlite3.Connection, job_id: str, status: str, score: float, count: int = 1):
+        if status == "done":
+            conn.execute("UPDATE jobs SET done = done + ?, score_sum = score_sum + ? WHERE job_id = ?", (count, score, job_id))
+        else:
+            conn.execute("UPDATE jobs SET failed = failed + ? WHERE job_id = ?", (count, job_id))
+        conn.execute(
+            "UPDATE jobs SET status = 'done', finished_at = ? "
+            "WHERE job_id = ? AND status = 'running' AND done + failed >= total",
+            (time.time(), job_id)
+        )
+
+    def release_worker(self, worker: int, max_attempts: int, reason: str) -> int:
+        # Called when a worker died or was killed. Its claimed messages go
+        # back to the queue; the one it was running is retried until it has
+        # used max_attempts, then failed.
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE job_messages SET status = 'pending', worker = NULL, claimed_at = NULL "
+                    "WHERE status = 'claimed' AND worker = ?",
+                    (worker,)
+                )
+                rows = conn.execute(
+                    "SELECT job_id, seq, attempts FROM job_messages WHERE status = 'running' AND worker = ?",
+                    (worker,)
+                ).fetchall()
+                for job_id, seq, attempts in rows:
+                    if attempts >= max_attempts:
+                        conn.execute(
+                            "UPDATE job_messages SET status = 'failed', error = ? WHERE job_id = ? AND seq = ?",
+                            (f"{reason} while auditing this message ({attempts} attempts)", job_id, seq)
+                        )
+                        self._count_finished(conn, job_id, "failed", 0.0)
+                    else:
+                        conn.execute(
+                            "UPDATE job_messages SET status = 'pending', worker = NULL, claimed_at = NULL "
+                            "WHERE job_id = ? AND seq = ?",
+                            (job_id, seq)
+                        )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def recover_all(self, max_attempts: int) -> int:
+        # On startup no worker is alive yet, so anything in flight belongs to
+        # a previous run.
+        with self._lock:
+            workers = [row[0] for row in self._connect().execute(
+                "SELECT DISTINCT worker FROM job_messages WHERE status IN ('claimed', 'running') AND worker IS NOT NULL"
+            ).fetchall()]
+        return sum(self.release_worker(worker, max_attempts, "Service restarted") for worker in workers)
+
+    def stale_workers(self, timeout: float) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self._connect().execute(
+                "SELECT DISTINCT worker FROM job_messages WHERE status = 'running' AND claimed_at < ?",
+                (time.time() - timeout,)
+            ).fetchall()]
+
+    def cleanup(self, retention_seconds: float) -> int:
+        cutoff = time.time() - retention_seconds
+        with self._lock:
+            conn = self._connect()
+            job_ids = [row[0] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('done', 'cancelled') AND finished_at < ?",
+                (cutoff,)
+            ).fetchall()]
+            for job_id in job_ids:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM job_messages WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+                conn.execute("COMMIT")
+        for job_id in job_ids:
+            shutil.rmtree(self.job_directory(job_id), ignore_errors=True)
+        if job_ids:
+            logger.info(f"Removed {len(job_ids)} finished jobs older than {retention_seconds:.0f}s")
+        return len(job_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            jobs = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            messages = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM job_messages WHERE status IN ('pending', 'claimed', 'running') GROUP BY status"
+            ).fetchall())
+        return {
+            "jobs": jobs,
+            "pending_messages": messages.get("pending", 0),
+            "running_messages": messages.get("running", 0) + messages.get("claimed", 0),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,62 @@
+import json
+import os
+import signal
+import time
+from loguru import logger
+
+from ..config import settings
+from ..parser.sources import read_message
+from .store import JobStore
+
+
+def run_worker(store_path: str, jobs_dir: str):
+    # Entry point of a bulk worker process. It shares no state with the
+    # request workers: its own rule registry, parser and SQLite connection.
+    if settings.job_worker_nice:
+        try:
+            os.nice(settings.job_worker_nice)
+        except OSError:
+            pass
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from ..audit.pipeline import EMLParseError, audit_eml_bytes
+    from ..history.store import history_store
+
+    history_store.start()
+    store = JobStore(store_path, jobs_dir)
+    worker = os.getpid()
+    logger.info(f"Job worker {worker} started")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    try:
+        while not stopping:
+            claimed = store.claim(worker, settings.job_claim_batch, settings.job_client_concurrency)
+            if not claimed:
+                time.sleep(settings.job_poll_seconds)
+                continue
+            for item in claimed:
+                if stopping:
+                    break
+                # False when the job was cancelled after the claim.
+                if not store.start_message(item["job_id"], item["seq"], worker):
+                    continue
+                try:
+                    report = audit_eml_bytes(read_message(item["ref"]), None, item["profile"], item["rule_names"])
+                except EMLParseError as e:
+                    store.finish_message(item["job_id"], item["seq"], worker, error=f"Failed to parse EML: {str(e)}")
+                    continue
+                except Exception as e:
+                    store.finish_message(item["job_id"], item["seq"], worker, error=f"Audit failed: {str(e)}")
+                    continue
+                store.finish_message(
+                    item["job_id"], item["seq"], worker, json.loads(report.summary)["overall_score"],
+                    report.full, report.summary
+                )
+    finally:
+        # Anything claimed but not started goes back to the queue right away
+        # instead of waiting for the supervisor.
+        store.release_worker(worker, settings.job_max_attempts, "Worker stopped")
+        history_store.close()
+        store.close()
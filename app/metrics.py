@@ -0,0 +1,350 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def copy(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def drain(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, float]):
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., overflow count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, count: int = 1, **labels: str):
+        # count records the same value several times, for batched work timed
+        # as a whole and split evenly.
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += count
+            series[-1] += value * count
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def copy(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            return {key: list(series) for key, series in self._values.items()}
+
+    def drain(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, List[float]]):
+        with self._lock:
+            for key, incoming in values.items():
+                series = self._values.get(key)
+                if series is None:
+                    self._values[key] = list(incoming)
+                else:
+                    for index, amount in enumerate(incoming):
+                        series[index] += amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {repr(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class Gauge:
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float], kind: str = "gauge",
+                 per_process: bool = True):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        # Callback-backed counters owned by other components use kind="counter".
+        self.kind = kind
+        # False for values read from storage every worker shares, which each
+        # worker already reports in full.
+        self.per_process = per_process
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float], kind: str = "gauge",
+              per_process: bool = True) -> Gauge:
+        return self.register(Gauge(name, help_text, callback, kind, per_process))
+
+    def drain(self) -> Dict[str, Any]:
+        return {
+            name: metric.drain()
+            for name, metric in self._metrics.items()
+            if hasattr(metric, "drain")
+        }
+
+    def merge(self, snapshot: Optional[Dict[str, Any]]):
+        for name, values in (snapshot or {}).items():
+            metric = self._metrics.get(name)
+            if metric is not None and values:
+                metric.merge(values)
+
+    def reset(self):
+        self.drain()
+
+    def export(self, gauge_base: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        # JSON-safe totals of this process, read by the other prefork workers.
+        exported: Dict[str, Any] = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Gauge):
+                if not metric.per_process:
+                    continue
+                try:
+                    exported[name] = metric.callback() + (gauge_base or {}).get(name, 0.0)
+                except Exception:
+                    continue
+            else:
+                exported[name] = [[list(key), value] for key, value in metric.copy().items()]
+        return exported
+
+    def _render_merged(self, metric, worker: int, peers: List[Dict[str, Any]], gauge_base: Dict[str, float]) -> List[str]:
+        if isinstance(metric, Gauge):
+            if not metric.per_process:
+                return metric.render()
+            own = metric.callback() + gauge_base.get(metric.name, 0.0)
+            values = [(peer["worker"], peer["metrics"].get(metric.name)) for peer in peers]
+            values = [(slot, value) for slot, value in values if value is not None]
+            if metric.kind == "counter":
+                return [f"{metric.name} {_format_value(own + sum(value for _, value in values))}"]
+            # Levels such as queue depth do not add up across workers.
+            return [
+                f'{metric.name}{{worker="{slot}"}} {_format_value(value)}'
+                for slot, value in sorted([(worker, own)] + values)
+            ]
+
+        if isinstance(metric, Histogram):
+            merged = Histogram(metric.name, metric.help_text, metric.labelnames, metric.buckets)
+        else:
+            merged = Counter(metric.name, metric.help_text, metric.labelnames)
+        merged.merge(metric.copy())
+        for peer in peers:
+            merged.merge({tuple(key): value for key, value in peer["metrics"].get(metric.name, [])})
+        return merged.render()
+
+    def render(self, worker: Optional[int] = None, peers: Optional[List[Dict[str, Any]]] = None,
+               gauge_base: Optional[Dict[str, float]] = None) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                if peers is None:
+                    lines.extend(metric.render())
+                else:
+                    lines.extend(self._render_merged(metric, worker, peers, gauge_base or {}))
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExchange:
+
+    # Under the prefork server each worker counts in its own memory. Every
+    # worker publishes its totals to a file per slot in a directory the
+    # parent owns, and /metrics merges its own live values with the other
+    # slots' files. A replacement worker starts from its slot's last file,
+    # so recycling a worker does not send counters backwards.
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.directory: Optional[str] = None
+        self.worker: Optional[int] = None
+        self.interval = 5.0
+        self._gauge_base: Dict[str, float] = {}
+        self._started = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _path(self, worker: int) -> str:
+        return os.path.join(self.directory, f"worker-{worker}.json")
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def attach(self, directory: str, worker: int, interval: float):
+        self.directory = directory
+        self.worker = worker
+        self.interval = interval
+
+    def start(self):
+        # Called once warm-up has reset the registry, so the predecessor's
+        # totals are not wiped with the warm-up's.
+        if not self.enabled or self._started:
+            return
+        self._started = True
+        previous = self._read(self._path(self.worker))
+        if previous is not None:
+            counted = {}
+            for name, value in previous["metrics"].items():
+                metric = self.registry._metrics.get(name)
+                if isinstance(metric, Gauge):
+                    if metric.kind == "counter":
+                        self._gauge_base[name] = value
+                elif metric is not None:
+                    counted[name] = {tuple(key): amount for key, amount in value}
+            self.registry.merge(counted)
+        self.publish()
+        threading.Thread(target=self._publish_loop, name="metrics-publisher", daemon=True).start()
+
+    def publish(self):
+        if not self._started:
+            return
+        path = self._path(self.worker)
+        body = json.dumps({"worker": self.worker, "pid": os.getpid(), "metrics": self.registry.export(self._gauge_base)})
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(temporary, path)
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception:
+                continue
+
+    def render(self) -> str:
+        if not self._started:
+            return self.registry.render()
+        peers = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("worker-") and name.endswith(".json")):
+                continue
+            peer = self._read(os.path.join(self.directory, name))
+            if peer is not None and peer.get("worker") != self.worker:
+                peers.append(peer)
+        return self.registry.render(self.worker, peers, self._gauge_base)
+
+
+metrics = MetricsRegistry()
+metrics_exchange = MetricsExchange(metrics)
+
+stage_duration = metrics.histogram(
+    "audit_stage_duration_seconds", "Time spent in each audit pipeline stage", ("stage",)
+)
+rule_duration = metrics.histogram(
+    "audit_rule_duration_seconds", "Time spent evaluating each rule", ("rule", "outcome")
+)
+bytes_parsed = metrics.counter("audit_bytes_parsed_total", "Raw message bytes handed to the parser")
+attachments_seen = metrics.counter("audit_attachments_total", "Attachments found while parsing")
+rule_exceptions = metrics.counter("audit_rule_exceptions_total", "Rules that raised while evaluating", ("rule",))
+near_dup_lookups = metrics.counter("audit_near_dup_lookups_total", "Near-duplicate index lookups")
+near_dup_matches = metrics.counter("audit_near_dup_matches_total", "Audits that matched a recent near-duplicate")
+near_dup_reused = metrics.counter("audit_near_dup_reused_results_total", "Rule results reused from a near-duplicate")
@@ -1,4 +1,7 @@
 from .email import EmailMessage, EmailThread, Attachment
 from .audit import RuleResult, AuditResult
+from .features import MessageFeatures
+from .parsed import MESSAGE_FIELDS, AttachmentFacts, HeaderFields, ParsedAttachment, ParsedMessage, ParsedThread
 
-__all__ = ['EmailMessage', 'EmailThread', 'Attachment', 'RuleResult', 'AuditResult'] 
\ No newline at end of file
+__all__ = ['EmailMessage', 'EmailThread', 'Attachment', 'RuleResult', 'AuditResult', 'MessageFeatures',
+           'MESSAGE_FIELDS', 'AttachmentFacts', 'HeaderFields', 'ParsedAttachment', 'ParsedMessage', 'ParsedThread'] 
\ No newline at end of file
@@ -6,6 +6,7 @@ from enum import Enum
 class RuleStatus(str, Enum):
     PASS = "pass"
     FAIL = "fail"
+    TIMEOUT = "timeout"
 
 
 class RuleResult(BaseModel):
@@ -23,7 +24,8 @@ class AuditResult(BaseModel):
     recommendations: List[str]
     rule_results: List[RuleResult]
     statistics: Dict[str, Any]
-    email_thread: Optional[Any] = None
+    # Set on the placeholder result of an audit that raised; never serialized.
+    audit_failed: bool = Field(default=False, exclude=True)
     
     @property
     def passed_rules(self) -> List[RuleResult]:
@@ -31,4 +33,8 @@ class AuditResult(BaseModel):
     
     @property
     def failed_rules(self) -> List[RuleResult]:
-        return [result for result in self.rule_results if result.status == RuleStatus.FAIL] 
\ No newline at end of file
+        return [result for result in self.rule_results if result.status == RuleStatus.FAIL]
+    
+    @property
+    def timed_out_rules(self) -> List[RuleResult]:
+        return [result for result in self.rule_results if result.status == RuleStatus.TIMEOUT] 
\ No newline at end of file
@@ -1,13 +1,26 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+from .features import MessageFeatures
+
 
 class Attachment(BaseModel):
     filename: str
     content_type: str
     size: int
     content_id: Optional[str] = None
+    sha256: Optional[str] = None
+    # Format sniffed from the decoded bytes, which may disagree with content_type.
+    detected_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    payload: Optional[Any] = Field(default=None, exclude=True, repr=False)
+    
+    def read_payload(self) -> bytes:
+        if self.payload is None:
+            return b''
+        return self.payload.read()
 
 
 class EmailMessage(BaseModel):
@@ -15,6 +28,13 @@ class EmailMessage(BaseModel):
     content: Dict[str, str]
     metadata: Dict[str, Any]
     attachments: Optional[List[Attachment]] = None
+    _features: Optional[MessageFeatures] = PrivateAttr(default=None)
+    
+    @property
+    def features(self) -> MessageFeatures:
+        if self._features is None:
+            self._features = MessageFeatures(self)
+        return self._features
     
     @property
     def subject(self) -> str:
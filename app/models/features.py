@@ -0,0 +1,95 @@
+from collections import Counter
+from functools import cached_property
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class MessageFeatures:
+
+    def __init__(self, message: Any):
+        self._message = message
+        self._lower_prefixes: Dict[int, Tuple[str, bool]] = {}
+        self._memo: Dict[Hashable, Any] = {}
+
+    def memo(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def has_memo(self, key: Hashable) -> bool:
+        return key in self._memo
+
+    @cached_property
+    def html_text(self) -> Optional[Any]:
+        # HTML-only messages read their body text from the HTML part, converted
+        # only as far as a caller asks for.
+        if self._message.plain_text or not self._message.html:
+            return None
+        from ..parser.html_text import HTMLTextStream
+        return HTMLTextStream(self._message.html)
+
+    @cached_property
+    def text(self) -> str:
+        if self.html_text is not None:
+            return self.html_text.text()
+        return self._message.plain_text
+
+    @cached_property
+    def normalized_text(self) -> str:
+        return " ".join(self.text.split()).lower()
+
+    @cached_property
+    def lower_text(self) -> str:
+        return self.text.lower()
+
+    def lower_prefix(self, length: int) -> str:
+        cached = self._lower_prefixes.get(length)
+        if cached is not None:
+            return cached[0]
+        # Callers with different bounds, such as declarative rules and the
+        # near-duplicate signer, share one conversion: a shorter prefix is
+        # cut from a longer one, unless lowercasing changed the length of
+        # some character and the cut would land elsewhere.
+        longer = [key for key, (_, exact) in self._lower_prefixes.items() if key > length and exact]
+        if longer:
+            prefix = self._lower_prefixes[min(longer)][0][:length]
+            exact = True
+        else:
+            source = self.html_text.prefix(length) if self.html_text is not None else self.text[:length]
+            prefix = source.lower()
+            exact = len(prefix) == len(source)
+        self._lower_prefixes[length] = (prefix, exact)
+        return prefix
+
+    @cached_property
+    def stripped_length(self) -> int:
+        text = self.text
+        start, end = 0, len(text)
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return end - start
+
+    def stripped_length_upto(self, limit: int) -> int:
+        # Exact up to limit; any larger value only means "longer than limit".
+        if self.html_text is not None and 'text' not in self.__dict__:
+            return self.html_text.stripped_length(limit)
+        return self.stripped_length
+
+    @cached_property
+    def token_count(self) -> int:
+        return len(self.text.split())
+
+    @cached_property
+    def line_count(self) -> int:
+        text = self.text
+        return text.count("\n") + 1 if text else 0
+
+    @cached_property
+    def attachment_type_counts(self) -> Dict[str, int]:
+        attachments = self._message.attachments or []
+        return dict(Counter(att.content_type.split("/", 1)[0] for att in attachments))
+
+    @cached_property
+    def attachment_count(self) -> int:
+        return len(self._message.attachments or [])
@@ -0,0 +1,258 @@
+from datetime import datetime
+from email import policy
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .email import Attachment, EmailMessage, EmailThread
+from .features import MessageFeatures
+
+
+# The parser and rules trust their own data, so the per-request model is a
+# set of plain __slots__ classes. The pydantic models in email.py are only
+# built through to_model() when a schema is actually needed.
+
+# Body fields a rule can ask the parser for. Headers and the parsed date are
+# always extracted; they come from the header block the parser reads anyway.
+MESSAGE_FIELDS = frozenset(('plain_text', 'html', 'attachments'))
+
+HEADER_FIELDS = (
+    'from', 'to', 'subject', 'date', 'cc', 'bcc', 'reply-to',
+    'message-id', 'in-reply-to', 'references', 'content-type'
+)
+_HEADER_INDEX = {name: index for index, name in enumerate(HEADER_FIELDS)}
+
+
+def decode_header_value(name: str, raw: str) -> Optional[str]:
+    # Same result as reading the header through policy.default: RFC 2047
+    # words decoded, addresses and dates normalized, folding removed.
+    try:
+        value = policy.default.header_fetch_parse(name, raw)
+    except Exception:
+        value = ' '.join(raw.split())
+    return str(value) if value else None
+
+
+class HeaderFields:
+
+    __slots__ = ('_values', '_raw')
+
+    def __init__(self, values: Optional[List[Optional[str]]] = None, raw: Optional[List[Optional[str]]] = None):
+        self._values = values if values is not None else [None] * len(HEADER_FIELDS)
+        # Raw source values not decoded yet; an entry is cleared once decoded.
+        self._raw = raw
+
+    @classmethod
+    def from_message(cls, message) -> "HeaderFields":
+        values = []
+        for name in HEADER_FIELDS:
+            value = message.get(name)
+            values.append(str(value) if value else None)
+        return cls(values)
+
+    @classmethod
+    def from_raw_message(cls, message) -> "HeaderFields":
+        # One pass over the raw header list; each field is decoded on first
+        # read, and most never are.
+        raw: List[Optional[str]] = [None] * len(HEADER_FIELDS)
+        for name, value in message.raw_items():
+            index = _HEADER_INDEX.get(name.lower())
+            if index is not None and raw[index] is None:
+                raw[index] = value
+        return cls(None, raw)
+
+    @classmethod
+    def from_dict(cls, headers: Dict[str, str]) -> "HeaderFields":
+        fields = cls()
+        for name, value in headers.items():
+            index = _HEADER_INDEX.get(name.lower())
+            if index is not None and value:
+                fields._values[index] = value
+        return fields
+
+    def get(self, name: str, default: Any = None) -> Any:
+        index = _HEADER_INDEX.get(name)
+        if index is None:
+            return default
+        value = self._values[index]
+        if value is None and self._raw is not None and self._raw[index] is not None:
+            value = self._values[index] = decode_header_value(name, self._raw[index])
+            self._raw[index] = None
+        return default if value is None else value
+
+    def __getitem__(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        return ((name, value) for name, value in ((name, self.get(name)) for name in HEADER_FIELDS) if value is not None)
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"HeaderFields({self.to_dict()!r})"
+
+
+# Declared types that name the same format as the sniffed one; a generic
+# declared type is not a mislabel.
+CONTENT_TYPE_ALIASES = {
+    'image/jpg': 'image/jpeg',
+    'image/pjpeg': 'image/jpeg',
+    'image/x-png': 'image/png',
+    'image/x-ms-bmp': 'image/bmp',
+    'application/x-zip-compressed': 'application/zip',
+    'application/x-gzip': 'application/gzip',
+}
+GENERIC_CONTENT_TYPES = frozenset(('application/octet-stream', 'application/binary'))
+
+
+class AttachmentFacts:
+
+    __slots__ = ('sha256', 'detected_type', 'width', 'height', 'decoded_size')
+
+    def __init__(self, sha256: Optional[str] = None, detected_type: Optional[str] = None,
+                 width: Optional[int] = None, height: Optional[int] = None, decoded_size: Optional[int] = None):
+        self.sha256 = sha256
+        self.detected_type = detected_type
+        self.width = width
+        self.height = height
+        self.decoded_size = decoded_size
+
+
+class ParsedAttachment:
+
+    __slots__ = ('filename', 'content_type', 'size', 'content_id', 'payload', '_facts')
+
+    def __init__(self, filename: str, content_type: str, size: int, content_id: Optional[str] = None, payload: Any = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.content_id = content_id
+        self.payload = payload
+        self._facts: Optional[AttachmentFacts] = None
+
+    def read_payload(self) -> bytes:
+        if self.payload is None:
+            return b''
+        return self.payload.read()
+
+    @property
+    def facts(self) -> AttachmentFacts:
+        # One streaming decode on first use; rules that never ask do not pay
+        # for it.
+        if self._facts is None:
+            inspect = getattr(self.payload, 'inspect', None)
+            self._facts = inspect() if inspect is not None else AttachmentFacts()
+        return self._facts
+
+    @property
+    def sha256(self) -> Optional[str]:
+        return self.facts.sha256
+
+    @property
+    def detected_type(self) -> Optional[str]:
+        return self.facts.detected_type
+
+    @property
+    def dimensions(self) -> Optional[Tuple[int, int]]:
+        facts = self.facts
+        return (facts.width, facts.height) if facts.width is not None else None
+
+    @property
+    def type_mismatch(self) -> bool:
+        detected = self.facts.detected_type
+        declared = self.content_type.lower()
+        if detected is None or declared in GENERIC_CONTENT_TYPES:
+            return False
+        return CONTENT_TYPE_ALIASES.get(declared, declared) != detected
+
+    def to_model(self) -> Attachment:
+        facts = self.facts
+        return Attachment(
+            filename=self.filename,
+            content_type=self.content_type,
+            size=self.size,
+            content_id=self.content_id,
+            sha256=facts.sha256,
+            detected_type=facts.detected_type,
+            width=facts.width,
+            height=facts.height,
+            payload=self.payload
+        )
+
+
+class ParsedMessage:
+
+    __slots__ = ('headers', 'plain_text', '_html', '_html_loader', 'parsed_date', 'attachments', '_features')
+
+    def __init__(self, headers: HeaderFields, plain_text: str = '', html: str = '',
+                 parsed_date: Optional[datetime] = None, attachments: Optional[List[ParsedAttachment]] = None,
+                 html_loader: Optional[Callable[[], str]] = None):
+        self.headers = headers
+        self.plain_text = plain_text
+        self._html = html
+        # HTML parts are decoded on first access; most messages carry a plain
+        # text part and never need them.
+        self._html_loader = html_loader
+        self.parsed_date = parsed_date
+        self.attachments = attachments or []
+        self._features: Optional[MessageFeatures] = None
+
+    @property
+    def html(self) -> str:
+        if self._html_loader is not None:
+            self._html, self._html_loader = self._html_loader(), None
+        return self._html
+
+    @property
+    def features(self) -> MessageFeatures:
+        if self._features is None:
+            self._features = MessageFeatures(self)
+        return self._features
+
+    @property
+    def subject(self) -> str:
+        return self.headers.get('subject', '')
+
+    @property
+    def sender(self) -> str:
+        return self.headers.get('from', '')
+
+    @property
+    def recipient(self) -> str:
+        return self.headers.get('to', '')
+
+    @property
+    def date(self) -> Optional[datetime]:
+        return self.parsed_date
+
+    @property
+    def content(self) -> Dict[str, str]:
+        return {'plain_text': self.plain_text, 'html': self.html}
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {'parsed_date': self.parsed_date}
+
+    def to_model(self) -> EmailMessage:
+        return EmailMessage(
+            headers=self.headers.to_dict(),
+            content=self.content,
+            metadata=self.metadata,
+            attachments=[attachment.to_model() for attachment in self.attachments]
+        )
+
+
+class ParsedThread:
+
+    __slots__ = ('messages',)
+
+    def __init__(self, messages: List[ParsedMessage]):
+        self.messages = messages
+
+    def to_model(self) -> EmailThread:
+        return EmailThread(messages=[message.to_model() for message in self.messages])
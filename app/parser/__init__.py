@@ -2,6 +2,7 @@
 Email Audit Service - EML Parser Package
 """
 
-from .eml_parser import EMLParser, parse_eml_file, parse_eml_data
+from .eml_parser import EMLParser, parse_eml_file, parse_eml_data, parse_eml_stream
+from .html_text import HTMLTextStream, html_to_text
 
-__all__ = ['EMLParser', 'parse_eml_file', 'parse_eml_data'] 
\ No newline at end of file
+__all__ = ['EMLParser', 'parse_eml_file', 'parse_eml_data', 'parse_eml_stream', 'HTMLTextStream', 'html_to_text'] 
\ No newline at end of file
@@ -1,26 +1,41 @@
 import email
 from email import policy
-from email.parser import BytesParser
+from email.parser import BytesParser, BytesHeaderParser
 from email.utils import parsedate_to_datetime
-from typing import Dict, List, Optional, Tuple, Any
+from functools import partial
+from typing import AbstractSet, Any, BinaryIO, List, Optional, Tuple
 import mimetypes
 import base64
 from datetime import datetime
 from loguru import logger
 
+from ..config import settings
+from ..models.parsed import MESSAGE_FIELDS, HeaderFields, ParsedAttachment, ParsedMessage
+from .headers import HEADER_MODES, decode_words, raw_header_policy
+from .payload import LazyPayload, attachment_size
+from .streaming import SpoolingFeedParser
+
 
 class EMLParser:
     
-    def __init__(self):
-        self.policy = policy.default
+    def __init__(self, header_mode: Optional[str] = None):
+        header_mode = header_mode or settings.parser_header_mode
+        if header_mode not in HEADER_MODES:
+            raise ValueError(f"Unknown header mode '{header_mode}', expected one of {HEADER_MODES}")
+        self.header_mode = header_mode
+        self.policy = raw_header_policy if header_mode == "fast" else policy.default
         self.parser = BytesParser(policy=self.policy)
+        self.header_parser = BytesHeaderParser(policy=self.policy)
+    
+    def _headers(self, message) -> HeaderFields:
+        if self.header_mode == "fast":
+            return HeaderFields.from_raw_message(message)
+        return HeaderFields.from_message(message)
     
-    def parse_eml_file(self, file_path: str) -> Dict[str, Any]:
+    def parse_eml_file(self, file_path: str, fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
         try:
             with open(file_path, 'rb') as f:
-                email_data = f.read()
-            
-            return self.parse_eml_data(email_data)
+                return self.parse_eml_stream(f, fields=fields)
             
         except FileNotFoundError:
             logger.error(f"EML file not found: {file_path}")
@@ -29,47 +44,67 @@ class EMLParser:
             logger.error(f"Error parsing EML file {file_path}: {str(e)}")
             raise
     
-    def parse_eml_data(self, email_data: bytes) -> Dict[str, Any]:
+    def parse_eml_data(self, email_data: bytes, fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
         try:
+            if not fields:
+                return self._build_parsed_email(self.header_parser.parsebytes(email_data), fields)
             message = self.parser.parsebytes(email_data)
+            return self._build_parsed_email(message, fields)
             
-            parsed_email = {
-                'headers': self._extract_headers(message),
-                'content': self._extract_content(message),
-                'metadata': self._extract_metadata(message),
-                'attachments': self._extract_attachments(message)
-            }
+        except Exception as e:
+            logger.error(f"Error parsing email data: {str(e)}")
+            raise
+    
+    def parse_eml_headers(self, email_data: bytes) -> HeaderFields:
+        try:
+            message = self.header_parser.parsebytes(email_data)
+            return self._headers(message)
             
-            logger.info(f"Parsed email: {parsed_email['headers'].get('subject', 'No subject')}")
-            return parsed_email
+        except Exception as e:
+            logger.error(f"Error parsing email headers: {str(e)}")
+            raise
+    
+    def parse_eml_stream(self, stream: BinaryIO, chunk_size: Optional[int] = None,
+                         fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
+        chunk_size = chunk_size or settings.upload_chunk_bytes
+        try:
+            if not fields:
+                # Header-only plans never look at the body, so it is not
+                # split into parts at all.
+                return self._build_parsed_email(self.header_parser.parse(stream), fields)
+            feed_parser = SpoolingFeedParser(self.policy)
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                feed_parser.feed(chunk)
+            message = feed_parser.close()
+            return self._build_parsed_email(message, fields)
             
         except Exception as e:
-            logger.error(f"Error parsing email data: {str(e)}")
+            logger.error(f"Error parsing email stream: {str(e)}")
             raise
     
-    def _extract_headers(self, message) -> Dict[str, str]:
-        headers = {}
-        
-        essential_headers = ['from', 'to', 'subject', 'date', 'cc', 'bcc', 'reply-to']
-        
-        for header in essential_headers:
-            value = message.get(header)
-            if value:
-                headers[header] = str(value)
-        
-        additional_headers = ['message-id', 'in-reply-to', 'references', 'content-type']
-        for header in additional_headers:
-            value = message.get(header)
-            if value:
-                headers[header] = str(value)
+    def _build_parsed_email(self, message, fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
+        plain_text, html_parts, attachments = self._extract_parts(message, fields) if fields else ('', [], [])
+        parsed_email = ParsedMessage(
+            headers=self._headers(message),
+            plain_text=plain_text,
+            parsed_date=self._parse_date(message),
+            attachments=attachments,
+            html_loader=partial(self._decode_html, html_parts) if html_parts else None
+        )
         
-        return headers
+        logger.info(f"Parsed email: {parsed_email.headers.get('subject', 'No subject')}")
+        return parsed_email
     
-    def _extract_content(self, message) -> Dict[str, str]:
-        content = {
-            'plain_text': '',
-            'html': ''
-        }
+    def _extract_parts(self, message, fields: AbstractSet[str] = MESSAGE_FIELDS) -> Tuple[str, List[Any], List[ParsedAttachment]]:
+        plain_text = ''
+        html_parts = []
+        attachments = []
+        want_text = 'plain_text' in fields
+        want_html = 'html' in fields
+        want_attachments = 'attachments' in fields
         
         for part in message.walk():
             if part.is_multipart():
@@ -77,67 +112,70 @@ class EMLParser:
             
             content_type = part.get_content_type()
             
-            if content_type == 'text/plain':
+            if content_type == 'text/plain' and want_text:
                 try:
                     text_content = part.get_content()
                     if text_content:
-                        content['plain_text'] += text_content
+                        plain_text += text_content
                 except Exception as e:
                     logger.warning(f"Error extracting plain text: {str(e)}")
             
-            elif content_type == 'text/html':
+            elif content_type == 'text/html' and want_html:
+                html_parts.append(part)
+            
+            if not want_attachments:
+                continue
+            filename = part.get_filename()
+            if filename and self.header_mode == "fast":
+                filename = decode_words(filename)
+            if content_type.startswith('image/') or filename:
                 try:
-                    html_content = part.get_content()
-                    if html_content:
-                        content['html'] += html_content
+                    attachment = ParsedAttachment(
+                        filename=filename or f"attachment_{len(attachments)}",
+                        content_type=content_type,
+                        size=attachment_size(part),
+                        content_id=part.get('content-id'),
+                        payload=LazyPayload(part)
+                    )
+                    attachments.append(attachment)
                 except Exception as e:
-                    logger.warning(f"Error extracting HTML: {str(e)}")
+                    logger.warning(f"Error extracting attachment: {str(e)}")
         
-        return content
+        return plain_text, html_parts, attachments
     
-    def _extract_metadata(self, message) -> Dict[str, Any]:
-        metadata = {
-            'parsed_date': None
-        }
-        
+    def _decode_html(self, parts: List[Any]) -> str:
+        html = ''
+        for part in parts:
+            try:
+                html_content = part.get_content()
+                if html_content:
+                    html += html_content
+            except Exception as e:
+                logger.warning(f"Error extracting HTML: {str(e)}")
+        return html
+    
+    def _parse_date(self, message) -> Optional[datetime]:
         date_header = message.get('date')
         if date_header:
             try:
-                metadata['parsed_date'] = parsedate_to_datetime(date_header)
+                return parsedate_to_datetime(date_header)
             except Exception as e:
                 logger.warning(f"Error parsing date: {str(e)}")
-        
-        return metadata
+        return None
 
-    def _extract_attachments(self, message) -> List[Dict[str, Any]]:
-        attachments = []
-        
-        for part in message.walk():
-            if part.is_multipart():
-                continue
-            
-            content_type = part.get_content_type()
-            
-            if content_type.startswith('image/') or part.get_filename():
-                try:
-                    attachment = {
-                        'filename': part.get_filename() or f"attachment_{len(attachments)}",
-                        'content_type': content_type,
-                        'size': len(part.get_payload(decode=True)) if part.get_payload(decode=True) else 0,
-                        'content_id': part.get('content-id')
-                    }
-                    attachments.append(attachment)
-                except Exception as e:
-                    logger.warning(f"Error extracting attachment: {str(e)}")
-        
-        return attachments
+
+# BytesParser keeps no state between calls, so one instance serves every
+# thread instead of being rebuilt per message.
+default_parser = EMLParser()
+
+
+def parse_eml_file(file_path: str, fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
+    return default_parser.parse_eml_file(file_path, fields)
 
 
-def parse_eml_file(file_path: str) -> Dict[str, Any]:
-    parser = EMLParser()
-    return parser.parse_eml_file(file_path)
+def parse_eml_data(email_data: bytes, fields: AbstractSet[str] = MESSAGE_FIELDS) -> ParsedMessage:
+    return default_parser.parse_eml_data(email_data, fields)
 
 
-def parse_eml_data(email_data: bytes) -> Dict[str, Any]:
-    parser = EMLParser()
-    return parser.parse_eml_data(email_data) 
\ No newline at end of file
+def parse_eml_stream(stream: BinaryIO) -> ParsedMessage:
+    return default_parser.parse_eml_stream(stream)
@@ -0,0 +1,36 @@
+import re
+from email.header import decode_header, make_header
+from email.policy import EmailPolicy
+
+
+HEADER_MODES = ("fast", "structured")
+
+_FOLD = re.compile(r'\r?\n')
+
+
+class RawHeaderPolicy(EmailPolicy):
+
+    # policy.default builds a structured header object for every header the
+    # parser reads, content-type and transfer-encoding of every part
+    # included. This policy hands back the unfolded source text instead.
+    # Bodies are still decoded by the default content manager, and the
+    # top-level headers a rule reads are decoded by HeaderFields on demand.
+
+    def header_fetch_parse(self, name, value):
+        if hasattr(value, 'name'):
+            return value
+        return _FOLD.sub('', value)
+
+
+raw_header_policy = RawHeaderPolicy()
+
+
+def decode_words(value: str) -> str:
+    # RFC 2047 words in parameters such as filenames, which policy.default
+    # decodes while parsing the header.
+    if '=?' not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
@@ -0,0 +1,113 @@
+from html.parser import HTMLParser
+from typing import List
+
+
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'title'))
+
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'tr', 'ul'
+))
+
+DEFAULT_CHUNK_CHARS = 4096
+
+
+class _TextCollector(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces: List[str] = []
+        self.length = 0
+        self._skip_depth = 0
+        self._line_start = True
+        self._space = False
+
+    def _emit(self, text: str):
+        self.pieces.append(text)
+        self.length += len(text)
+
+    def _break(self):
+        if not self._line_start:
+            self._emit('\n')
+            self._line_start = True
+        self._space = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        words = data.split()
+        if not words:
+            self._space = self._space or bool(data)
+            return
+        # Whitespace collapses the way a browser renders it.
+        if not self._line_start and (self._space or data[0].isspace()):
+            self._emit(' ')
+        self._emit(' '.join(words))
+        self._line_start = False
+        self._space = data[-1].isspace()
+
+
+class HTMLTextStream:
+
+    def __init__(self, html: str, chunk_chars: int = DEFAULT_CHUNK_CHARS):
+        self._html = html
+        self._chunk_chars = max(1, chunk_chars)
+        self._offset = 0
+        self._collector = _TextCollector()
+        self._joined = ''
+        self._joined_pieces = 0
+        self.complete = not html
+
+    @property
+    def scanned(self) -> int:
+        return self._offset
+
+    def _advance(self, wanted: int):
+        # Feed the document a chunk at a time and stop as soon as enough text
+        # exists; the rest of a large newsletter is never tokenized.
+        collector = self._collector
+        while not self.complete and collector.length < wanted:
+            chunk = self._html[self._offset:self._offset + self._chunk_chars]
+            self._offset += len(chunk)
+            collector.feed(chunk)
+            if self._offset >= len(self._html):
+                collector.close()
+                self.complete = True
+
+    def _text(self) -> str:
+        pieces = self._collector.pieces
+        if self._joined_pieces != len(pieces):
+            self._joined = ''.join(pieces)
+            self._joined_pieces = len(pieces)
+        return self._joined
+
+    def prefix(self, length: int) -> str:
+        self._advance(length)
+        return self._text()[:length]
+
+    def text(self) -> str:
+        self._advance(len(self._html) + 1)
+        return self._text()
+
+    def stripped_length(self, limit: int) -> int:
+        # Exact up to limit; anything above limit only means "longer". Output
+        # never starts with whitespace and ends with at most one break.
+        self._advance(limit + 2)
+        return len(self._text().strip())
+
+
+def html_to_text(html: str) -> str:
+    return HTMLTextStream(html).text()
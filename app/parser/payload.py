@@ -0,0 +1,148 @@
+import binascii
+from typing import Iterator, Optional, Union
+from loguru import logger
+
+from ..models.parsed import AttachmentFacts
+from .probe import PayloadProbe
+from .streaming import SpilledPayload
+
+
+BASE64_IGNORED = (' ', '\t', '\r', '\n')
+IDENTITY_ENCODINGS = ('', '7bit', '8bit', 'binary')
+
+DECODE_CHUNK_CHARS = 64 * 1024
+SIZE_CHUNK_CHARS = 1024 * 1024
+
+
+def _iter_encoded_chunks(raw: Union[str, SpilledPayload]) -> Iterator[str]:
+    if isinstance(raw, SpilledPayload):
+        yield from raw.iter_chunks(SIZE_CHUNK_CHARS)
+    else:
+        yield raw
+
+
+def _base64_size(raw: Union[str, SpilledPayload]) -> int:
+    significant = 0
+    tail = ''
+    for chunk in _iter_encoded_chunks(raw):
+        significant += len(chunk) - sum(chunk.count(ch) for ch in BASE64_IGNORED)
+        tail = (tail + chunk.rstrip())[-2:] if chunk.strip() else tail
+    padding = len(tail) - len(tail.rstrip('='))
+    data_chars = significant - padding
+    return data_chars // 4 * 3 + max(0, data_chars % 4 - 1)
+
+
+def _quoted_printable_size(raw: Union[str, SpilledPayload]) -> int:
+    size = 0
+    tail = ''
+    for chunk in _iter_encoded_chunks(raw):
+        # "=XX" escapes shrink to one byte and "=\n" soft breaks disappear, so
+        # every "=" accounts for two removed characters ("=\r\n" for three).
+        # A soft break split between two chunks shows up only in the last
+        # characters of one joined to the first of the next.
+        size += len(chunk) - 2 * chunk.count('=') - chunk.count('=\r\n') - (tail + chunk[:2]).count('=\r\n')
+        tail = (tail + chunk)[-2:]
+    return size
+
+
+def _iter_raw_slices(raw: Union[str, SpilledPayload], chunk_chars: int) -> Iterator[str]:
+    if isinstance(raw, SpilledPayload):
+        yield from raw.iter_chunks(chunk_chars)
+    else:
+        for start in range(0, len(raw), chunk_chars):
+            yield raw[start:start + chunk_chars]
+
+
+def _decode_base64_chunks(chunks: Iterator[str]) -> Iterator[bytes]:
+    pending = ''
+    for chunk in chunks:
+        pending += ''.join(chunk.split())
+        # Decode whole quanta only; the remainder waits for the next chunk.
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            yield binascii.a2b_base64(pending[:usable])
+            pending = pending[usable:]
+    if pending.strip('='):
+        yield binascii.a2b_base64(pending + '=' * (-len(pending) % 4))
+
+
+def _decode_quoted_printable_chunks(chunks: Iterator[str]) -> Iterator[bytes]:
+    pending = ''
+    for chunk in chunks:
+        pending += chunk
+        # Escapes and soft breaks never span a line end.
+        cut = pending.rfind('\n') + 1
+        if cut:
+            yield binascii.a2b_qp(pending[:cut].encode('ascii', 'surrogateescape'))
+            pending = pending[cut:]
+    if pending:
+        yield binascii.a2b_qp(pending.encode('ascii', 'surrogateescape'))
+
+
+def iter_decoded_chunks(part, chunk_chars: int = DECODE_CHUNK_CHARS) -> Iterator[bytes]:
+    # Decodes the transfer encoding a slice at a time, so no more than one
+    # slice of the decoded body exists at once.
+    raw = part._payload
+    if isinstance(raw, (str, SpilledPayload)):
+        cte = str(part.get('content-transfer-encoding', '')).strip().lower()
+        if cte == 'base64':
+            yield from _decode_base64_chunks(_iter_raw_slices(raw, chunk_chars))
+            return
+        if cte == 'quoted-printable':
+            yield from _decode_quoted_printable_chunks(_iter_raw_slices(raw, chunk_chars))
+            return
+        if cte in IDENTITY_ENCODINGS:
+            for chunk in _iter_raw_slices(raw, chunk_chars):
+                yield chunk.encode('ascii', 'surrogateescape')
+            return
+    payload = part.get_payload(decode=True)
+    if payload:
+        yield payload
+
+
+def encoded_payload_size(part) -> Optional[int]:
+    raw = part._payload
+    if not isinstance(raw, (str, SpilledPayload)):
+        return None
+
+    cte = str(part.get('content-transfer-encoding', '')).strip().lower()
+    if cte == 'base64':
+        return _base64_size(raw)
+    if cte == 'quoted-printable':
+        return _quoted_printable_size(raw)
+    if cte in IDENTITY_ENCODINGS:
+        return raw.length if isinstance(raw, SpilledPayload) else len(raw)
+    return None
+
+
+def attachment_size(part) -> int:
+    try:
+        size = encoded_payload_size(part)
+    except Exception as e:
+        logger.warning(f"Error sizing attachment from encoded payload: {str(e)}")
+        size = None
+    if size is None:
+        payload = part.get_payload(decode=True)
+        size = len(payload) if payload else 0
+    return size
+
+
+class LazyPayload:
+
+    __slots__ = ('_part',)
+
+    def __init__(self, part):
+        self._part = part
+
+    def read(self) -> bytes:
+        return self._part.get_payload(decode=True) or b''
+
+    def inspect(self) -> AttachmentFacts:
+        probe = PayloadProbe()
+        try:
+            for chunk in iter_decoded_chunks(self._part):
+                probe.feed(chunk)
+        except Exception as e:
+            logger.warning(f"Error inspecting attachment payload: {str(e)}")
+            return AttachmentFacts()
+        return probe.facts()
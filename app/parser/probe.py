@@ -0,0 +1,160 @@
+import hashlib
+import struct
+from typing import Optional, Tuple
+
+from ..models.parsed import AttachmentFacts
+
+
+# Enough leading bytes for every signature below and for the PNG, GIF and
+# WebP headers, which keep their dimensions at fixed offsets.
+HEAD_BYTES = 32
+
+# JPEG keeps its dimensions in the first SOFn segment, after any EXIF or ICC
+# segments; give up if it has not appeared this far in.
+MAX_JPEG_SCAN_BYTES = 1024 * 1024
+
+# SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC).
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD9)) | {0x01}
+
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+)
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, detected in SIGNATURES:
+        if head.startswith(signature):
+            return detected
+    return None
+
+
+def header_dimensions(detected_type: Optional[str], head: bytes) -> Optional[Tuple[int, int]]:
+    if detected_type == 'image/png' and len(head) >= 24 and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if detected_type == 'image/gif' and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if detected_type == 'image/webp' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            b0, b1, b2, b3 = head[21:25]
+            return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little')
+    return None
+
+
+class _JPEGScanner:
+
+    # Walks the marker segments as bytes arrive, skipping segment bodies
+    # without buffering them.
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip = 0
+        self._scanned = 0
+        self.done = False
+        self.dimensions: Optional[Tuple[int, int]] = None
+
+    def feed(self, data: bytes):
+        if self.done:
+            return
+        self._scanned += len(data)
+        if self._skip:
+            skipped = min(self._skip, len(data))
+            self._skip -= skipped
+            data = data[skipped:]
+        self._buffer += data
+        self._parse()
+        if not self.done and self._scanned > MAX_JPEG_SCAN_BYTES:
+            self.done = True
+
+    def _parse(self):
+        buffer = self._buffer
+        while not self.done and not self._skip:
+            # Fill bytes may precede a marker.
+            start = 0
+            while start + 1 < len(buffer) and buffer[start] == 0xFF and buffer[start + 1] == 0xFF:
+                start += 1
+            if start:
+                del buffer[:start]
+            if len(buffer) < 2:
+                return
+            if buffer[0] != 0xFF:
+                self.done = True
+                return
+            marker = buffer[1]
+            if marker in JPEG_STANDALONE_MARKERS:
+                del buffer[:2]
+                continue
+            if marker in (0xD9, 0xDA):
+                # End of image or start of scan: no frame header came first.
+                self.done = True
+                return
+            if marker in JPEG_SOF_MARKERS:
+                if len(buffer) < 9:
+                    return
+                height, width = struct.unpack('>HH', buffer[5:9])
+                self.dimensions = (width, height)
+                self.done = True
+                return
+            if len(buffer) < 4:
+                return
+            length = struct.unpack('>H', buffer[2:4])[0]
+            if length < 2:
+                self.done = True
+                return
+            remaining = 2 + length
+            if remaining <= len(buffer):
+                del buffer[:remaining]
+            else:
+                self._skip = remaining - len(buffer)
+                buffer.clear()
+
+
+class PayloadProbe:
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._head = b''
+        self._jpeg: Optional[_JPEGScanner] = None
+        self.size = 0
+
+    def feed(self, data: bytes):
+        if not data:
+            return
+        self._sha256.update(data)
+        self.size += len(data)
+        if len(self._head) < HEAD_BYTES:
+            missing = HEAD_BYTES - len(self._head)
+            self._head += data[:missing]
+            if self._jpeg is None and len(self._head) >= 3 and self._head.startswith(b'\xff\xd8\xff'):
+                self._jpeg = _JPEGScanner()
+                # The scanner starts after SOI and takes everything seen so far.
+                self._jpeg.feed(self._head[2:] + data[missing:])
+                return
+        if self._jpeg is not None:
+            self._jpeg.feed(data)
+
+    def facts(self) -> AttachmentFacts:
+        detected_type = sniff_type(self._head)
+        if self._jpeg is not None:
+            dimensions = self._jpeg.dimensions
+        else:
+            dimensions = header_dimensions(detected_type, self._head)
+        width, height = dimensions if dimensions else (None, None)
+        return AttachmentFacts(self._sha256.hexdigest(), detected_type, width, height, self.size)
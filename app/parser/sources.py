@@ -0,0 +1,119 @@
+import mmap
+import os
+import re
+import zipfile
+from typing import Iterator, List, NamedTuple, Tuple
+
+
+ZIP_MAGIC = b"PK\x03\x04"
+MBOX_SEPARATOR = re.compile(rb"^From .*\r?\n", re.MULTILINE)
+MBOX_QUOTED_FROM = re.compile(rb"^>(>*From )", re.MULTILINE)
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class ArchiveTooLargeError(Exception):
+    pass
+
+
+def detect_source_kind(filename: str, head: bytes) -> str:
+    lowered = (filename or "").lower()
+    if lowered.endswith(".zip") or head.startswith(ZIP_MAGIC):
+        return "zip"
+    if lowered.endswith(".mbox") or head.startswith(b"From "):
+        return "mbox"
+    return "eml"
+
+
+def extract_zip_messages(path: str, directory: str, max_bytes: int = 0) -> List[Tuple[str, str]]:
+    # Members are copied out one at a time so an archive never has to fit in
+    # memory; names are reduced to their basename to stay inside directory.
+    # The sizes an archive declares can be forged, so max_bytes (0 for no
+    # limit) is checked against the bytes actually written.
+    os.makedirs(directory, exist_ok=True)
+    extracted = []
+    written = 0
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".eml"):
+                continue
+            target = os.path.join(directory, f"{len(extracted):06d}-{os.path.basename(info.filename)}")
+            with archive.open(info) as source, open(target, 'wb') as out:
+                while True:
+                    chunk = source.read(COPY_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if max_bytes and written > max_bytes:
+                        raise ArchiveTooLargeError(f"Archive expands to more than {max_bytes} bytes of messages")
+                    out.write(chunk)
+            extracted.append((target, info.filename))
+    return extracted
+
+
+class MessageRef(NamedTuple):
+    source_id: str
+    path: str
+    offset: int = 0
+    length: int = -1
+    unquote_from: bool = False
+
+
+def is_maildir(path: str) -> bool:
+    return all(os.path.isdir(os.path.join(path, sub)) for sub in ('cur', 'new', 'tmp'))
+
+
+def _iter_mbox_refs(path: str) -> Iterator[MessageRef]:
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = 0
+        body_start = None
+        for match in MBOX_SEPARATOR.finditer(mapped):
+            if body_start is not None:
+                yield MessageRef(f"{path}#{position}", path, body_start, match.start() - body_start, True)
+                position += 1
+            body_start = match.end()
+        if body_start is not None:
+            yield MessageRef(f"{path}#{position}", path, body_start, len(mapped) - body_start, True)
+
+
+def _iter_maildir_refs(path: str) -> Iterator[MessageRef]:
+    for sub in ('new', 'cur'):
+        directory = os.path.join(path, sub)
+        for filename in sorted(os.listdir(directory)):
+            file_path = os.path.join(directory, filename)
+            if os.path.isfile(file_path) and not filename.startswith('.'):
+                yield MessageRef(file_path, file_path)
+
+
+def iter_path_refs(path: str) -> Iterator[MessageRef]:
+    if os.path.isdir(path):
+        if is_maildir(path):
+            yield from _iter_maildir_refs(path)
+            return
+        for entry in sorted(os.listdir(path)):
+            yield from iter_path_refs(os.path.join(path, entry))
+        return
+
+    lowered = path.lower()
+    if lowered.endswith('.eml'):
+        yield MessageRef(path, path)
+    elif lowered.endswith('.mbox'):
+        yield from _iter_mbox_refs(path)
+    else:
+        with open(path, 'rb') as f:
+            head = f.read(5)
+        if head.startswith(b'From '):
+            yield from _iter_mbox_refs(path)
+
+
+def read_message(ref: MessageRef) -> bytes:
+    with open(ref.path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = len(mapped) if ref.length < 0 else ref.offset + ref.length
+            data = mapped[ref.offset:end]
+    if ref.unquote_from:
+        data = MBOX_QUOTED_FROM.sub(rb"\1", data)
+    return data
@@ -0,0 +1,72 @@
+import tempfile
+from typing import Iterator
+from email.feedparser import BytesFeedParser
+from email.message import EmailMessage as MIMEMessage
+
+from ..config import settings
+
+
+class SpilledPayload:
+
+    __slots__ = ('_file', 'length')
+
+    def __init__(self, payload: str):
+        data = payload.encode('ascii', 'surrogateescape')
+        self._file = tempfile.TemporaryFile(prefix='eml-part-')
+        self._file.write(data)
+        self.length = len(data)
+
+    def read(self) -> str:
+        self._file.seek(0)
+        return self._file.read().decode('ascii', 'surrogateescape')
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[str]:
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk.decode('ascii', 'surrogateescape')
+
+    def close(self):
+        self._file.close()
+
+
+class SpoolingMessage(MIMEMessage):
+
+    spill_threshold = settings.attachment_spill_bytes
+
+    def spill(self):
+        if (isinstance(self._payload, str)
+                and len(self._payload) > self.spill_threshold
+                and self.get_content_maintype() != 'text'):
+            self._payload = SpilledPayload(self._payload)
+
+    def get_payload(self, i=None, decode=False):
+        spilled = self._payload
+        if not isinstance(spilled, SpilledPayload):
+            return super().get_payload(i, decode)
+
+        self._payload = spilled.read()
+        try:
+            return super().get_payload(i, decode)
+        finally:
+            self._payload = spilled
+
+
+class SpoolingFeedParser(BytesFeedParser):
+
+    # Large attachment bodies are moved to disk as each part is finished, so
+    # they are not held until the whole message has been audited. A part is
+    # finished when it is popped: by then the parser has already removed the
+    # line break before the next boundary, which belongs to the boundary and
+    # not to the body, and which it only removes from an in-memory body.
+
+    def __init__(self, policy):
+        super().__init__(_factory=SpoolingMessage, policy=policy)
+
+    def _pop_message(self):
+        message = super()._pop_message()
+        if isinstance(message, SpoolingMessage):
+            message.spill()
+        return message
@@ -0,0 +1,205 @@
+import cProfile
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from types import CodeType
+from typing import Any, Callable, Dict, Optional, Tuple
+from loguru import logger
+
+from .config import settings
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB_ROOT = sysconfig.get_paths()["stdlib"]
+SITE_PACKAGES = "site-packages" + os.sep
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def short_path(filename: str) -> str:
+    index = filename.rfind(SITE_PACKAGES)
+    if index >= 0:
+        return filename[index + len(SITE_PACKAGES):]
+    for root in (PROJECT_ROOT, STDLIB_ROOT):
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+def _stage_functions() -> Dict[str, Tuple[Callable, ...]]:
+    from .audit.report import ReportGenerator
+    from .parser.eml_parser import EMLParser
+    from .rules.base import BaseRule
+
+    return {
+        "parse": (EMLParser.parse_eml_file, EMLParser.parse_eml_data),
+        "rules": (BaseRule.run, BaseRule.run_batch),
+        "report": (ReportGenerator.render,),
+    }
+
+
+def _function_label(key: Tuple[str, int, str]) -> str:
+    filename, line, name = key
+    # Built-ins are recorded as ('~', 0, "<built-in method ...>").
+    if filename == '~':
+        return name
+    return f"{short_path(filename)}:{line}({name})"
+
+
+def summarize(profiler: cProfile.Profile, wall_seconds: float, top: int) -> Dict[str, Any]:
+    # pstats keys are (filename, first line, name) -> (primitive calls,
+    # calls, own time, cumulative time, callers).
+    stats = pstats.Stats(profiler).stats
+    stages = {}
+    for stage, functions in _stage_functions().items():
+        keys = {(f.__code__.co_filename, f.__code__.co_firstlineno, f.__code__.co_name) for f in functions}
+        stages[stage] = round(sum(stats[key][3] for key in keys if key in stats) * 1000, 3)
+
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return {
+        "wall_ms": round(wall_seconds * 1000, 3),
+        "stages_ms": stages,
+        "functions": [
+            {
+                "function": _function_label(key),
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "own_ms": round(own * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for key, (primitive_calls, calls, own, cumulative, _) in ranked
+        ],
+    }
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_call(fn: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    # Runs fn under cProfile on the calling thread, so it must be called
+    # where the work happens: inside the executor, not around it. One at a
+    # time, as newer Pythons allow only one active profiler per process.
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Another request is being profiled")
+    try:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        result = profiler.runcall(fn, *args)
+        wall_seconds = time.perf_counter() - started
+    finally:
+        _profile_lock.release()
+    return result, summarize(profiler, wall_seconds, settings.profile_top_functions)
+
+
+class StackSampler:
+
+    # Wall-clock sampler: a daemon thread reads every other thread's stack
+    # at a fixed interval and counts the collapsed stacks. Nothing is
+    # installed in the sampled threads, so they run at full speed.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+        self._pid: Optional[int] = None
+        self._stacks: Counter = Counter()
+        self._labels: Dict[CodeType, str] = {}
+        self.samples = 0
+        self.interval = settings.sampler_interval_seconds
+        self.duration = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        # A forked child inherits the object but not the thread.
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: Optional[float] = None) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval = interval or settings.sampler_interval_seconds
+            self.duration = min(seconds, settings.sampler_max_seconds)
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop, time.monotonic() + self.duration),
+                name="stack-sampler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Sampling stacks every {self.interval * 1000:.1f}ms for {self.duration:.0f}s")
+        return True
+
+    def stop(self) -> bool:
+        with self._lock:
+            if not self.running:
+                return False
+            thread, stop = self._thread, self._stop
+        stop.set()
+        thread.join()
+        return True
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ":").replace(" ", "_"))
+        labels.reverse()
+        return ";".join(labels)
+
+    def _run(self, stop: threading.Event, deadline: float):
+        own = threading.get_ident()
+        while not stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                self._collapse(names.get(ident, f"thread-{ident}"), frame)
+                for ident, frame in sys._current_frames().items()
+                if ident != own
+            ]
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+        self.stopped_at = time.time()
+        logger.info(f"Stack sampler stopped after {self.samples} samples")
+
+    def collapsed(self) -> str:
+        # One "frame;frame;frame count" line per distinct stack, root first:
+        # the input format of flamegraph.pl, speedscope and inferno.
+        with self._lock:
+            items = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            distinct = len(self._stacks)
+        return {
+            "running": self.running,
+            "pid": os.getpid(),
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "interval_seconds": self.interval,
+            "duration_seconds": self.duration,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+stack_sampler = StackSampler()
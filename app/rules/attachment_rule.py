@@ -1,14 +1,16 @@
-from ..models import EmailThread, RuleResult
+from ..models import ParsedThread, RuleResult
 from ..models.audit import RuleStatus
 from .base import BaseRule
 
 
 class AttachmentRule(BaseRule):
     
+    required_fields = frozenset({'attachments'})
+    
     def __init__(self):
         super().__init__("AttachmentRule", "Checks for image attachments", 1.0)
     
-    def evaluate(self, email_thread: EmailThread) -> RuleResult:
+    def evaluate(self, email_thread: ParsedThread) -> RuleResult:
         if not email_thread.messages:
             return self._create_result(
                 status=RuleStatus.FAIL,
@@ -25,12 +27,7 @@ class AttachmentRule(BaseRule):
                 justification="No attachments found"
             )
         
-        image_attachments = [
-            att for att in first_message.attachments
-            if att.content_type.startswith('image/')
-        ]
-        
-        if image_attachments:
+        if first_message.features.attachment_type_counts.get('image'):
             return self._create_result(
                 status=RuleStatus.PASS,
                 score=1.0,
@@ -1,21 +1,72 @@
-from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+import asyncio
+import inspect
+import time
+from abc import ABC
+from typing import Dict, Any, FrozenSet, Optional, Sequence
 from loguru import logger
 
-from ..models import EmailThread, RuleResult
+from ..config import settings
+from ..metrics import rule_duration, rule_exceptions
+from ..models import MESSAGE_FIELDS, ParsedThread, RuleResult
 from ..models.audit import RuleStatus
+from .batch import RuleColumn
 
 
 class BaseRule(ABC):
     
+    # Per-rule budget in seconds; None uses RULE_TIMEOUT_SECONDS.
+    timeout: Optional[float] = None
+    # Message fields the parser must extract for this rule. Rules that do not
+    # say get everything.
+    required_fields: FrozenSet[str] = MESSAGE_FIELDS
+    # False leaves the rule out of the default selection; profiles and
+    # ?rules= can still run it.
+    default_enabled: bool = True
+    # True when the verdict depends on the body text alone. A near-duplicate's
+    # result is reused only when reuse_key also matches.
+    content_only: bool = False
+    
+    def __init_subclass__(cls, **kwargs):
+        # Caught when the rule module is imported, so discovery skips the
+        # class instead of every audit failing it. Intermediate bases opt out
+        # by declaring an abstract method.
+        super().__init_subclass__(**kwargs)
+        if (not inspect.isabstract(cls) and cls.evaluate is BaseRule.evaluate
+                and cls.evaluate_async is BaseRule.evaluate_async):
+            raise TypeError(f"{cls.__name__} implements neither evaluate nor evaluate_async")
+    
     def __init__(self, name: str, description: str, weight: float = 1.0):
         self.name = name
         self.description = description
         self.weight = weight
     
-    @abstractmethod
-    def evaluate(self, email_thread: EmailThread) -> RuleResult:
-        pass
+    def evaluate(self, email_thread: ParsedThread) -> RuleResult:
+        # Async rules only need evaluate_async; this lets them still be run
+        # directly outside the registry.
+        if self.is_async:
+            return asyncio.run(self.evaluate_async(email_thread))
+        raise NotImplementedError(f"{type(self).__name__} implements neither evaluate nor evaluate_async")
+    
+    async def evaluate_async(self, email_thread: ParsedThread) -> RuleResult:
+        raise NotImplementedError(f"{type(self).__name__} does not implement evaluate_async")
+    
+    def evaluate_batch(self, email_threads: Sequence[ParsedThread]) -> RuleColumn:
+        raise NotImplementedError(f"{type(self).__name__} does not implement evaluate_batch")
+    
+    def reuse_key(self, message: Any) -> Optional[str]:
+        # Identifies the exact input the verdict is computed from. The
+        # near-duplicate signature ignores links, digits and everything past
+        # its prefix, so similar bodies alone do not make a verdict reusable.
+        # None never reuses.
+        return None
+    
+    @property
+    def is_async(self) -> bool:
+        return type(self).evaluate_async is not BaseRule.evaluate_async
+    
+    @property
+    def is_batched(self) -> bool:
+        return type(self).evaluate_batch is not BaseRule.evaluate_batch
     
     def _create_result(self, status: RuleStatus, score: float, justification: str, details: Optional[Dict[str, Any]] = None) -> RuleResult:
         return RuleResult(
@@ -26,18 +77,70 @@ class BaseRule(ABC):
             details=details
         )
     
-    def _log_evaluation(self, email_thread: EmailThread, result: RuleResult):
+    def _log_evaluation(self, email_thread: ParsedThread, result: RuleResult):
         logger.info(f"Rule {self.name}: {result.status} - {result.justification}")
     
-    def run(self, email_thread: EmailThread) -> RuleResult:
+    def _failed(self, error: Exception) -> RuleResult:
+        logger.error(f"Rule {self.name} failed: {str(error)}")
+        rule_exceptions.inc(rule=self.name)
+        return self._create_result(
+            status=RuleStatus.FAIL,
+            score=0.0,
+            justification=f"Rule evaluation failed: {str(error)}"
+        )
+    
+    def _finish(self, result: RuleResult, outcome: str, started: float) -> RuleResult:
+        elapsed = time.perf_counter() - started
+        rule_duration.observe(elapsed, rule=self.name, outcome=outcome)
+        if settings.rule_timing_details:
+            result.details = {**(result.details or {}), "duration_ms": round(elapsed * 1000, 3)}
+        return result
+    
+    def run(self, email_thread: ParsedThread) -> RuleResult:
+        started = time.perf_counter()
         try:
             result = self.evaluate(email_thread)
             self._log_evaluation(email_thread, result)
-            return result
+            outcome = getattr(result.status, 'value', result.status)
         except Exception as e:
-            logger.error(f"Rule {self.name} failed: {str(e)}")
-            return self._create_result(
-                status=RuleStatus.FAIL,
-                score=0.0,
-                justification=f"Rule evaluation failed: {str(e)}"
-            ) 
\ No newline at end of file
+            result = self._failed(e)
+            outcome = "error"
+        return self._finish(result, outcome, started)
+    
+    async def run_async(self, email_thread: ParsedThread) -> RuleResult:
+        started = time.perf_counter()
+        try:
+            result = await self.evaluate_async(email_thread)
+            self._log_evaluation(email_thread, result)
+            outcome = getattr(result.status, 'value', result.status)
+        except Exception as e:
+            result = self._failed(e)
+            outcome = "error"
+        return self._finish(result, outcome, started)
+    
+    def run_batch(self, email_threads: Sequence[ParsedThread]) -> Optional[RuleColumn]:
+        # None sends the caller back to running the rule message by message,
+        # which reports any error against the message that caused it.
+        started = time.perf_counter()
+        try:
+            column = self.evaluate_batch(email_threads)
+        except Exception as e:
+            logger.warning(f"Rule {self.name} batch evaluation failed, falling back to per-message: {str(e)}")
+            return None
+        share = (time.perf_counter() - started) / max(1, len(email_threads))
+        for code, count in column.counts().items():
+            outcome = getattr(column.outcomes[code][0], 'value', column.outcomes[code][0])
+            rule_duration.observe(share, count=count, rule=self.name, outcome=outcome)
+        if settings.rule_timing_details:
+            column.duration_ms = round(share * 1000, 3)
+        logger.info(f"Rule {self.name}: evaluated {len(email_threads)} messages in one batch")
+        return column
+    
+    def timeout_result(self, budget: float, justification: Optional[str] = None) -> RuleResult:
+        rule_duration.observe(budget, rule=self.name, outcome="timeout")
+        return self._create_result(
+            status=RuleStatus.TIMEOUT,
+            score=0.0,
+            justification=justification or f"Rule did not finish within {budget:.2f}s",
+            details={"timeout_seconds": round(budget, 3)}
+        )
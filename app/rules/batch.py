@@ -0,0 +1,132 @@
+import re
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..models import ParsedThread, RuleResult
+from ..models.audit import RuleStatus
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Joins per-message texts for a single regex pass. No pattern contains it, so
+# a match never spans two messages, and it is not a word character, so word
+# boundaries behave as they do at the ends of a single text.
+SEGMENT_SEPARATOR = '\x00'
+
+# (status, score, justification) for each outcome code a batch rule reports.
+# "{value}" in the justification is filled from the column's values.
+Outcome = Tuple[RuleStatus, float, str]
+
+
+def int_column(values: Sequence[int]):
+    if numpy is not None:
+        return numpy.fromiter(values, dtype=numpy.int64, count=len(values))
+    return array('q', values)
+
+
+def code_column(codes: Sequence[int]):
+    if numpy is not None:
+        return numpy.asarray(codes, dtype=numpy.uint8)
+    return array('B', codes)
+
+
+def concatenate(texts: Sequence[str]) -> Tuple[str, List[int]]:
+    starts = []
+    position = 0
+    for text in texts:
+        starts.append(position)
+        position += len(text) + 1
+    return SEGMENT_SEPARATOR.join(texts), starts
+
+
+def segments_matching(regex: re.Pattern, texts: Sequence[str]) -> List[bool]:
+    # One search per matching message: after a hit the scan resumes at the
+    # start of the next message.
+    text, starts = concatenate(texts)
+    found = [False] * len(texts)
+    position = 0
+    while True:
+        match = regex.search(text, position)
+        if match is None:
+            break
+        index = bisect_right(starts, match.start()) - 1
+        found[index] = True
+        if index + 1 >= len(starts):
+            break
+        position = starts[index + 1]
+    return found
+
+
+class RuleColumn:
+
+    __slots__ = ('rule_name', 'outcomes', 'codes', 'values', 'details', 'duration_ms')
+
+    def __init__(self, rule_name: str, outcomes: Sequence[Outcome], codes, values=None,
+                 details: Optional[Dict[int, Dict[str, Any]]] = None):
+        self.rule_name = rule_name
+        self.outcomes = outcomes
+        self.codes = codes
+        self.values = values
+        self.details = details or {}
+        self.duration_ms: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def counts(self) -> Dict[int, int]:
+        if numpy is not None and isinstance(self.codes, numpy.ndarray):
+            return {code: int(count) for code, count in enumerate(numpy.bincount(self.codes)) if count}
+        return dict(Counter(self.codes))
+
+    def result(self, index: int) -> RuleResult:
+        status, score, justification = self.outcomes[int(self.codes[index])]
+        if self.values is not None:
+            justification = justification.format(value=int(self.values[index]))
+        details = self.details.get(index)
+        if self.duration_ms is not None:
+            details = {**(details or {}), "duration_ms": self.duration_ms}
+        return RuleResult(
+            rule_name=self.rule_name,
+            status=status,
+            score=score,
+            justification=justification,
+            details=dict(details) if details else None
+        )
+
+
+class BatchResults:
+
+    # Rule verdicts for a batch of threads. Batched rules hold a column each;
+    # a message's RuleResults are only built when it is emitted, and any rule
+    # without a column runs for that message then.
+
+    def __init__(self, rules: Sequence[Any], threads: Sequence[ParsedThread], columns: Dict[str, RuleColumn],
+                 reused: Optional[Sequence[Optional[Dict[str, RuleResult]]]],
+                 execute: Callable[[List[Any], ParsedThread], List[RuleResult]]):
+        self.rules = rules
+        self.threads = threads
+        self.columns = columns
+        self.reused = reused
+        self._execute = execute
+
+    def __len__(self) -> int:
+        return len(self.threads)
+
+    def results(self, index: int) -> List[RuleResult]:
+        reused = (self.reused[index] if self.reused is not None else None) or {}
+        pending = [rule for rule in self.rules if rule.name not in reused and rule.name not in self.columns]
+        fresh = iter(self._execute(pending, self.threads[index]) if pending else ())
+        results = []
+        for rule in self.rules:
+            if rule.name in reused:
+                results.append(reused[rule.name])
+            elif rule.name in self.columns:
+                results.append(self.columns[rule.name].result(index))
+            else:
+                results.append(next(fresh))
+        return results
@@ -0,0 +1,271 @@
+import json
+import os
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from ..config import settings
+from ..models import ParsedThread, RuleResult
+from ..models.audit import RuleStatus
+from .base import BaseRule
+from .batch import RuleColumn, code_column, concatenate
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+DEFINITIONS_DIR = os.path.join(os.path.dirname(__file__), 'definitions')
+REGIONS = ('body', 'subject')
+
+# Outcome codes of DeclarativeRule.evaluate_batch.
+PASSED, FAILED, NO_MESSAGES = range(3)
+
+
+class RuleDefinition(BaseModel):
+    name: str
+    description: str = ""
+    weight: float = 1.0
+    default_enabled: bool = True
+    region: str = Field(default='body', pattern='^(body|subject)$')
+    prefix_length: Optional[int] = None
+    mode: str = Field(default='require', pattern='^(require|forbid)$')
+    whole_word: bool = True
+    patterns: List[str]
+    pass_score: float = 1.0
+    fail_score: float = 0.0
+    pass_justification: str = "Pattern check passed"
+    fail_justification: str = "Pattern check failed"
+    recommendation: Optional[str] = None
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _trie_pattern(phrases: List[str]) -> str:
+    # Alternations are tried one by one at every position, so a flat
+    # "a|b|c" gets slower with every phrase. A trie-shaped regex only ever
+    # follows one branch per character.
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return ('(?:' + body + ')?') if len(branches) == 1 else body + '?'
+        return body
+
+    return render(trie)
+
+
+class PatternMatcher:
+
+    def __init__(self, definitions: List[RuleDefinition]):
+        self.definitions = definitions
+        self._regions: Dict[str, Tuple[re.Pattern, Dict[str, List[str]], Dict[str, List[Tuple[int, bool]]], Optional[int]]] = {}
+
+        for region in REGIONS:
+            owners: Dict[str, List[Tuple[int, bool]]] = {}
+            limit: Optional[int] = 0
+            for index, definition in enumerate(definitions):
+                if definition.region != region:
+                    continue
+                for pattern in definition.patterns:
+                    phrase = pattern.strip().lower()
+                    if phrase:
+                        owners.setdefault(phrase, []).append((index, definition.whole_word))
+                if limit is not None:
+                    limit = None if definition.prefix_length is None else max(limit, definition.prefix_length)
+            if not owners:
+                continue
+
+            phrases = sorted(owners)
+            # A match reports the longest phrase starting at a position; every
+            # shorter phrase that is a prefix of it matched there as well.
+            implied = {
+                phrase: [phrase[:end] for end in range(1, len(phrase) + 1) if phrase[:end] in owners]
+                for phrase in phrases
+            }
+            # Lookahead so overlapping phrases are all seen; when every phrase
+            # is whole-word only word starts need to be tried.
+            anchor = r'(?<!\w)' if all(whole for entries in owners.values() for _, whole in entries) else ''
+            regex = re.compile(anchor + '(?=(' + _trie_pattern(phrases) + '))')
+            self._regions[region] = (regex, implied, owners, limit)
+
+        logger.info(f"Compiled pattern matcher for {len(definitions)} declarative rules")
+
+    def _region_text(self, message, region: str, limit: Optional[int]) -> str:
+        if region == 'subject':
+            text = message.subject.lower()
+            return text if limit is None else text[:limit]
+        if limit is None:
+            return message.features.lower_text
+        return message.features.lower_prefix(limit)
+
+    def _record(self, hits: List[Set[str]], text: str, offset: int, match: re.Match,
+                implied: Dict[str, List[str]], owners: Dict[str, List[Tuple[int, bool]]]):
+        # offset is where the message starts in text, which holds a batch of
+        # messages when called from scan_batch.
+        start = match.start()
+        before_ok = start == 0 or not _is_word_char(text[start - 1])
+        for phrase in implied[match.group(1)]:
+            end = start + len(phrase)
+            after_ok = end == len(text) or not _is_word_char(text[end])
+            for index, whole_word in owners[phrase]:
+                if whole_word and not (before_ok and after_ok):
+                    continue
+                prefix_length = self.definitions[index].prefix_length
+                if prefix_length is not None and end - offset > prefix_length:
+                    continue
+                hits[index].add(phrase)
+
+    def scan(self, message) -> List[Set[str]]:
+        hits: List[Set[str]] = [set() for _ in self.definitions]
+
+        for region, (regex, implied, owners, limit) in self._regions.items():
+            text = self._region_text(message, region, limit)
+            for match in regex.finditer(text):
+                self._record(hits, text, 0, match, implied, owners)
+
+        return hits
+
+    def scan_batch(self, messages: Sequence) -> List[List[Set[str]]]:
+        batch: List[List[Set[str]]] = [[set() for _ in self.definitions] for _ in messages]
+
+        for region, (regex, implied, owners, limit) in self._regions.items():
+            text, starts = concatenate([self._region_text(message, region, limit) for message in messages])
+            for match in regex.finditer(text):
+                index = bisect_right(starts, match.start()) - 1
+                self._record(batch[index], text, starts[index], match, implied, owners)
+
+        return batch
+
+    def hits_for(self, message) -> List[Set[str]]:
+        return message.features.memo(('pattern_hits', id(self)), lambda: self.scan(message))
+
+    def prefetch(self, messages: Sequence):
+        # Every declarative rule shares the matcher, so the first one to see a
+        # batch scans it for all of them.
+        key = ('pattern_hits', id(self))
+        pending = [message for message in messages if not message.features.has_memo(key)]
+        if pending:
+            for message, hits in zip(pending, self.scan_batch(pending)):
+                message.features.memo(key, lambda hits=hits: hits)
+
+
+class DeclarativeRule(BaseRule):
+
+    def __init__(self, definition: RuleDefinition, index: int, matcher: PatternMatcher):
+        super().__init__(definition.name, definition.description, definition.weight)
+        self.required_fields = frozenset({'plain_text', 'html'}) if definition.region == 'body' else frozenset()
+        self.default_enabled = definition.default_enabled
+        self.definition = definition
+        self._index = index
+        self._matcher = matcher
+
+    def evaluate(self, email_thread: ParsedThread) -> RuleResult:
+        if not email_thread.messages:
+            return self._create_result(
+                status=RuleStatus.FAIL,
+                score=0.0,
+                justification="No messages in thread"
+            )
+
+        matches = sorted(self._matcher.hits_for(email_thread.messages[0])[self._index])
+
+        passed = bool(matches) if self.definition.mode == 'require' else not matches
+        details = {"matches": matches} if matches else {}
+        if not passed and self.definition.recommendation:
+            details["recommendation"] = self.definition.recommendation
+
+        return self._create_result(
+            status=RuleStatus.PASS if passed else RuleStatus.FAIL,
+            score=self.definition.pass_score if passed else self.definition.fail_score,
+            justification=self.definition.pass_justification if passed else self.definition.fail_justification,
+            details=details or None
+        )
+
+    def evaluate_batch(self, email_threads: Sequence[ParsedThread]) -> RuleColumn:
+        definition = self.definition
+        self._matcher.prefetch([thread.messages[0] for thread in email_threads if thread.messages])
+        codes = []
+        details = {}
+        for position, thread in enumerate(email_threads):
+            if not thread.messages:
+                codes.append(NO_MESSAGES)
+                continue
+            matches = sorted(self._matcher.hits_for(thread.messages[0])[self._index])
+            passed = bool(matches) if definition.mode == 'require' else not matches
+            codes.append(PASSED if passed else FAILED)
+            entry = {"matches": matches} if matches else {}
+            if not passed and definition.recommendation:
+                entry["recommendation"] = definition.recommendation
+            if entry:
+                details[position] = entry
+        outcomes = (
+            (RuleStatus.PASS, definition.pass_score, definition.pass_justification),
+            (RuleStatus.FAIL, definition.fail_score, definition.fail_justification),
+            (RuleStatus.FAIL, 0.0, "No messages in thread"),
+        )
+        return RuleColumn(self.name, outcomes, code_column(codes), details=details)
+
+
+def _read_definition_file(path: str) -> List[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+        elif yaml is not None:
+            data = yaml.safe_load(f)
+        else:
+            logger.warning(f"Skipping {path}: PyYAML is not installed")
+            return []
+
+    if isinstance(data, dict) and 'rules' in data:
+        data = data['rules']
+    return data if isinstance(data, list) else [data]
+
+
+def load_definitions(definitions_dir: str = DEFINITIONS_DIR) -> List[RuleDefinition]:
+    definitions = []
+    if not os.path.isdir(definitions_dir):
+        return definitions
+
+    for filename in sorted(os.listdir(definitions_dir)):
+        if not filename.endswith(('.json', '.yaml', '.yml')):
+            continue
+        path = os.path.join(definitions_dir, filename)
+        try:
+            for raw in _read_definition_file(path):
+                definitions.append(RuleDefinition(**raw))
+        except Exception as e:
+            logger.error(f"Failed to load rule definitions from {filename}: {str(e)}")
+
+    return definitions
+
+
+def _bounded(definition: RuleDefinition) -> RuleDefinition:
+    # The bound becomes part of the definition, so it is reported with the
+    # rule and changing it changes the rule fingerprint.
+    if definition.region != 'body' or definition.prefix_length is not None or settings.declarative_body_scan_chars <= 0:
+        return definition
+    return definition.model_copy(update={"prefix_length": settings.declarative_body_scan_chars})
+
+
+def build_declarative_rules(definitions: List[RuleDefinition]) -> List[DeclarativeRule]:
+    if not definitions:
+        return []
+    definitions = [_bounded(definition) for definition in definitions]
+    matcher = PatternMatcher(definitions)
+    return [DeclarativeRule(definition, index, matcher) for index, definition in enumerate(definitions)]
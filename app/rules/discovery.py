@@ -0,0 +1,80 @@
+import importlib
+import inspect
+import json
+import os
+import sys
+from importlib.metadata import entry_points
+from typing import List, Type
+from loguru import logger
+
+from .base import BaseRule
+
+
+RULES_DIR = os.path.dirname(__file__)
+MANIFEST_PATH = os.path.join(RULES_DIR, 'manifest.json')
+ENTRY_POINT_GROUP = 'email_audit.rules'
+NON_RULE_MODULES = ('base', 'registry', 'declarative', 'discovery', 'execution', 'plans')
+
+
+def _resolve(target: str, reload_modules: bool) -> Type[BaseRule]:
+    module_name, _, attribute = target.partition(':')
+    module = sys.modules.get(module_name)
+    if module is not None and reload_modules:
+        module = importlib.reload(module)
+    elif module is None:
+        module = importlib.import_module(module_name)
+
+    rule_class = getattr(module, attribute)
+    if not (inspect.isclass(rule_class) and issubclass(rule_class, BaseRule)):
+        raise TypeError(f"{target} is not a BaseRule subclass")
+    return rule_class
+
+
+def scan_rule_modules(rules_dir: str = RULES_DIR) -> List[str]:
+    targets = []
+    for filename in sorted(os.listdir(rules_dir)):
+        if not filename.endswith('.py') or filename.startswith('_'):
+            continue
+        module_name = filename[:-3]
+        if module_name in NON_RULE_MODULES:
+            continue
+        module = importlib.import_module(f'.{module_name}', package='app.rules')
+        for name, obj in inspect.getmembers(module, inspect.isclass):
+            if issubclass(obj, BaseRule) and obj is not BaseRule and obj.__module__ == module.__name__:
+                targets.append(f"{module.__name__}:{name}")
+    return targets
+
+
+def write_manifest(path: str = MANIFEST_PATH) -> List[str]:
+    targets = scan_rule_modules()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"rules": targets}, f, indent=2)
+        f.write('\n')
+    return targets
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> List[str]:
+    if not os.path.exists(path):
+        # Without a manifest fall back to scanning, which is slower but
+        # keeps a freshly added rule file working in development.
+        logger.warning(f"Rule manifest {path} not found, scanning {RULES_DIR}")
+        return scan_rule_modules()
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(json.load(f).get("rules", []))
+
+
+def discover_rule_classes(manifest_path: str = MANIFEST_PATH, reload_modules: bool = False) -> List[Type[BaseRule]]:
+    rule_classes = []
+    for target in load_manifest(manifest_path):
+        try:
+            rule_classes.append(_resolve(target, reload_modules))
+        except Exception as e:
+            logger.error(f"Failed to load rule {target}: {str(e)}")
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            rule_classes.append(_resolve(entry_point.value, reload_modules))
+        except Exception as e:
+            logger.error(f"Failed to load rule plugin {entry_point.name}: {str(e)}")
+
+    return rule_classes
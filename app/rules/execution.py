@@ -0,0 +1,163 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from .base import BaseRule
+from ..config import settings
+from ..models import ParsedThread, RuleResult
+
+
+# Extra time allowed for the rule loop to hand results back after the deadline.
+DEADLINE_GRACE_SECONDS = 0.05
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._timeouts = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            # Half-open: let calls through again, one more timeout reopens it.
+            self._opened_at = None
+            self._timeouts = max(0, self.threshold - 1)
+            return True
+
+    def record(self, timed_out: bool, rule_name: str = ""):
+        with self._lock:
+            if not timed_out:
+                self._timeouts = 0
+                return
+            self._timeouts += 1
+            if self.threshold > 0 and self._timeouts >= self.threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.warning(f"Rule {rule_name} timed out {self._timeouts} times in a row, skipping it for {self.cooldown:.0f}s")
+
+
+class RuleLoop:
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> asyncio.AbstractEventLoop:
+        # One loop per process, shared by every worker thread, so async rules
+        # from concurrent audits multiplex their I/O. Rebuilt after a fork.
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="rule-loop", daemon=True).start()
+                    self._loop, self._pid = loop, os.getpid()
+        return self._loop
+
+
+rule_loop = RuleLoop()
+
+
+def rule_budget(rule: BaseRule) -> float:
+    return rule.timeout if rule.timeout is not None else settings.rule_timeout_seconds
+
+
+def _circuit_open_result(rule: BaseRule) -> RuleResult:
+    result = rule.timeout_result(0.0, "Rule skipped after repeated timeouts")
+    result.details = {"circuit_open": True}
+    return result
+
+
+async def _run_async_rules(
+    entries: List[Tuple[int, BaseRule]],
+    email_thread: ParsedThread,
+    breaker_for: Callable[[str], CircuitBreaker],
+    deadline: float,
+    finished: Dict[int, RuleResult]
+):
+    # Each result lands in finished as soon as its rule is done, so a caller
+    # that stops waiting still has every rule that made it.
+
+    async def run_one(index: int, rule: BaseRule):
+        breaker = breaker_for(rule.name)
+        budget = min(rule_budget(rule), deadline - time.monotonic())
+        if budget <= 0:
+            finished[index] = rule.timeout_result(0.0, "Audit deadline passed before the rule started")
+            return
+        try:
+            result = await asyncio.wait_for(rule.run_async(email_thread), budget)
+        except asyncio.TimeoutError:
+            breaker.record(True, rule.name)
+            finished[index] = rule.timeout_result(budget)
+            return
+        breaker.record(False)
+        finished[index] = result
+
+    await asyncio.gather(*(run_one(index, rule) for index, rule in entries))
+
+
+def execute_rules(
+    rules: List[BaseRule],
+    email_thread: ParsedThread,
+    breaker_for: Callable[[str], CircuitBreaker],
+    deadline: Optional[float] = None
+) -> List[RuleResult]:
+    if deadline is None:
+        deadline = time.monotonic() + settings.audit_deadline_seconds
+
+    results: List[Optional[RuleResult]] = [None] * len(rules)
+    async_entries = []
+    for index, rule in enumerate(rules):
+        if not breaker_for(rule.name).allow():
+            results[index] = _circuit_open_result(rule)
+        elif rule.is_async:
+            async_entries.append((index, rule))
+
+    # Async rules start first so their I/O overlaps with the sync rules,
+    # which run inline on this thread.
+    pending = None
+    finished: Dict[int, RuleResult] = {}
+    if async_entries:
+        pending = asyncio.run_coroutine_threadsafe(
+            _run_async_rules(async_entries, email_thread, breaker_for, deadline, finished), rule_loop.get()
+        )
+
+    for index, rule in enumerate(rules):
+        if results[index] is not None or rule.is_async:
+            continue
+        if time.monotonic() >= deadline:
+            results[index] = rule.timeout_result(0.0, "Audit deadline passed before the rule started")
+            continue
+        started = time.monotonic()
+        results[index] = rule.run(email_thread)
+        # Sync rules cannot be interrupted; an overrun only feeds the breaker.
+        breaker_for(rule.name).record(time.monotonic() - started > rule_budget(rule), rule.name)
+
+    if pending is not None:
+        try:
+            pending.result(max(0.0, deadline - time.monotonic()) + DEADLINE_GRACE_SECONDS)
+        except FutureTimeoutError:
+            # Only the rules still running are cut off.
+            pending.cancel()
+        # A copy, as the loop thread may still be adding to it.
+        for index, result in finished.copy().items():
+            results[index] = result
+
+    return [
+        result if result is not None else rules[index].timeout_result(0.0, "Audit deadline passed")
+        for index, result in enumerate(results)
+    ]
@@ -1,14 +1,41 @@
-from ..models import EmailThread, RuleResult
+import hashlib
+import re
+from typing import Any, Optional, Sequence
+
+from ..models import ParsedThread, RuleResult
 from ..models.audit import RuleStatus
 from .base import BaseRule
+from .batch import RuleColumn, code_column, segments_matching
+
+
+GREETINGS = [
+    'dear', 'hello', 'hi', 'hey', 'good morning', 'good afternoon',
+    'good evening', 'greetings', 'salutations'
+]
+# Same substring test as evaluate, for every message of a batch in one pass.
+GREETING_PATTERN = re.compile('|'.join(re.escape(greeting) for greeting in GREETINGS))
+
+# Outcome codes of evaluate_batch.
+GREETED, NOT_GREETED, NO_MESSAGES = range(3)
+OUTCOMES = (
+    (RuleStatus.PASS, 1.0, "Email contains appropriate greeting"),
+    (RuleStatus.FAIL, 0.0, "Email lacks appropriate greeting"),
+    (RuleStatus.FAIL, 0.0, "No messages in thread"),
+)
 
 
 class GreetingRule(BaseRule):
     
+    required_fields = frozenset({'plain_text', 'html'})
+    content_only = True
+    
     def __init__(self):
         super().__init__("GreetingRule", "Checks if email contains a greeting", 1.0)
     
-    def evaluate(self, email_thread: EmailThread) -> RuleResult:
+    def reuse_key(self, message: Any) -> Optional[str]:
+        return hashlib.sha256(message.features.lower_prefix(200).encode('utf-8')).hexdigest()
+    
+    def evaluate(self, email_thread: ParsedThread) -> RuleResult:
         if not email_thread.messages:
             return self._create_result(
                 status=RuleStatus.FAIL,
@@ -17,15 +44,10 @@ class GreetingRule(BaseRule):
             )
         
         first_message = email_thread.messages[0]
-        content = first_message.plain_text.lower()
-        
-        greetings = [
-            'dear', 'hello', 'hi', 'hey', 'good morning', 'good afternoon',
-            'good evening', 'greetings', 'salutations'
-        ]
+        content = first_message.features.lower_prefix(200)
         
-        for greeting in greetings:
-            if greeting in content[:200]:
+        for greeting in GREETINGS:
+            if greeting in content:
                 return self._create_result(
                     status=RuleStatus.PASS,
                     score=1.0,
@@ -36,4 +58,13 @@ class GreetingRule(BaseRule):
             status=RuleStatus.FAIL,
             score=0.0,
             justification="Email lacks appropriate greeting"
-        ) 
\ No newline at end of file
+        )
+    
+    def evaluate_batch(self, email_threads: Sequence[ParsedThread]) -> RuleColumn:
+        prefixes = [thread.messages[0].features.lower_prefix(200) if thread.messages else '' for thread in email_threads]
+        greeted = segments_matching(GREETING_PATTERN, prefixes)
+        codes = [
+            NO_MESSAGES if not thread.messages else GREETED if found else NOT_GREETED
+            for thread, found in zip(email_threads, greeted)
+        ]
+        return RuleColumn(self.name, OUTCOMES, code_column(codes))
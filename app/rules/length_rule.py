@@ -1,14 +1,40 @@
-from ..models import EmailThread, RuleResult
+from typing import Any, Optional, Sequence
+
+from ..models import ParsedThread, RuleResult
 from ..models.audit import RuleStatus
 from .base import BaseRule
+from .batch import RuleColumn, code_column, int_column, numpy
+
+
+# Outcome codes of evaluate_batch.
+TOO_SHORT, TOO_LONG, APPROPRIATE, NO_MESSAGES = range(4)
+OUTCOMES = (
+    (RuleStatus.FAIL, 0.0, "Email is too short"),
+    (RuleStatus.FAIL, 0.0, "Email is too long"),
+    (RuleStatus.PASS, 1.0, "Email length is appropriate ({value} characters)"),
+    (RuleStatus.FAIL, 0.0, "No messages in thread"),
+)
 
 
 class LengthRule(BaseRule):
     
+    required_fields = frozenset({'plain_text', 'html'})
+    content_only = True
+    
     def __init__(self):
         super().__init__("LengthRule", "Checks email length appropriateness", 1.0)
     
-    def evaluate(self, email_thread: EmailThread) -> RuleResult:
+    def reuse_key(self, message: Any) -> Optional[str]:
+        # The band decides the verdict; a passing justification also quotes
+        # the exact length.
+        content_length = message.features.stripped_length_upto(2000)
+        if content_length < 50:
+            return "short"
+        if content_length > 2000:
+            return "long"
+        return f"appropriate:{content_length}"
+    
+    def evaluate(self, email_thread: ParsedThread) -> RuleResult:
         if not email_thread.messages:
             return self._create_result(
                 status=RuleStatus.FAIL,
@@ -17,7 +43,7 @@ class LengthRule(BaseRule):
             )
         
         first_message = email_thread.messages[0]
-        content_length = len(first_message.plain_text.strip())
+        content_length = first_message.features.stripped_length_upto(2000)
         
         if content_length < 50:
             return self._create_result(
@@ -36,4 +62,20 @@ class LengthRule(BaseRule):
                 status=RuleStatus.PASS,
                 score=1.0,
                 justification=f"Email length is appropriate ({content_length} characters)"
-            ) 
\ No newline at end of file
+            )
+    
+    def evaluate_batch(self, email_threads: Sequence[ParsedThread]) -> RuleColumn:
+        lengths = int_column([
+            thread.messages[0].features.stripped_length_upto(2000) if thread.messages else -1
+            for thread in email_threads
+        ])
+        if numpy is not None:
+            codes = numpy.select(
+                [lengths < 0, lengths < 50, lengths > 2000], [NO_MESSAGES, TOO_SHORT, TOO_LONG], APPROPRIATE
+            )
+        else:
+            codes = [
+                NO_MESSAGES if length < 0 else TOO_SHORT if length < 50 else TOO_LONG if length > 2000 else APPROPRIATE
+                for length in lengths
+            ]
+        return RuleColumn(self.name, OUTCOMES, code_column(codes), lengths)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from typing import Dict, FrozenSet, List, Optional, Sequence
+from loguru import logger
+
+from .base import BaseRule
+
+
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles.json')
+
+DEFAULT_PROFILE = 'default'
+
+
+class UnknownRuleError(ValueError):
+    pass
+
+
+class ExecutionPlan:
+
+    def __init__(self, name: str, rules: List[BaseRule], weights: Dict[str, float]):
+        self.name = name
+        self.rules = rules
+        self.weights = weights
+        self.rule_names = [rule.name for rule in rules]
+        self.fields: FrozenSet[str] = frozenset().union(*(rule.required_fields for rule in rules))
+        self.content_rules = [rule.name for rule in rules if rule.content_only]
+        # Part of the cache key and ETag: the same message audited under a
+        # different selection or weighting is a different report.
+        identity = json.dumps([self.rule_names, [weights[name] for name in self.rule_names]])
+        self.key = hashlib.sha256(identity.encode()).hexdigest()[:12]
+
+    def weight(self, rule_name: str) -> float:
+        return self.weights.get(rule_name, 1.0)
+
+
+def load_profiles(path: str = PROFILES_PATH) -> Dict[str, dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles = json.load(f).get('profiles', {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Failed to load rule profiles from {path}: {str(e)}")
+        return {}
+    logger.info(f"Loaded {len(profiles)} rule profiles")
+    return profiles
+
+
+def parse_rule_list(value: Optional[str]) -> Optional[Sequence[str]]:
+    if not value:
+        return None
+    names = tuple(name.strip() for name in value.split(',') if name.strip())
+    return names or None
+
+
+def compile_plan(
+    rules: Dict[str, BaseRule],
+    profiles: Dict[str, dict],
+    profile: Optional[str] = None,
+    rule_names: Optional[Sequence[str]] = None
+) -> ExecutionPlan:
+    profile_name = profile or DEFAULT_PROFILE
+    definition = profiles.get(profile_name)
+    if definition is None and profile is not None:
+        raise UnknownRuleError(f"Unknown rule profile '{profile}'")
+    definition = definition or {}
+
+    selected = rule_names if rule_names is not None else definition.get('rules')
+    if selected is None:
+        selected = [name for name, rule in rules.items() if rule.default_enabled]
+    unknown = [name for name in selected if name not in rules]
+    if unknown:
+        raise UnknownRuleError(f"Unknown rules: {', '.join(unknown)}")
+
+    overrides = definition.get('weights', {})
+    plan_rules = [rules[name] for name in dict.fromkeys(selected)]
+    weights = {rule.name: float(overrides.get(rule.name, rule.weight)) for rule in plan_rules}
+    name = profile_name if rule_names is None else f"{profile_name}[{','.join(rule.name for rule in plan_rules)}]"
+    return ExecutionPlan(name, plan_rules, weights)
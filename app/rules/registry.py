@@ -1,44 +1,177 @@
-import os
-import importlib
+import hashlib
 import inspect
-from typing import Dict, List, Type, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from loguru import logger
 
 from .base import BaseRule
-from ..models import EmailThread, RuleResult
+from .batch import BatchResults, RuleColumn
+from .declarative import build_declarative_rules, load_definitions
+from .discovery import MANIFEST_PATH, discover_rule_classes
+from .execution import CircuitBreaker, execute_rules, rule_budget
+from .plans import PROFILES_PATH, ExecutionPlan, compile_plan, load_profiles
+from ..config import settings
+from ..models import ParsedThread, RuleResult
 from ..models.audit import RuleStatus
 
 
+def _compute_fingerprint(rules: Dict[str, BaseRule]) -> str:
+    digest = hashlib.sha256()
+    sources = {}
+    
+    for name in sorted(rules):
+        rule = rules[name]
+        rule_class = type(rule)
+        digest.update(f"{name}|{rule_class.__module__}.{rule_class.__qualname__}|{rule.weight}\n".encode())
+        
+        try:
+            source_file = inspect.getsourcefile(rule_class)
+        except TypeError:
+            source_file = None
+        if source_file and source_file not in sources:
+            try:
+                with open(source_file, 'rb') as f:
+                    sources[source_file] = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                sources[source_file] = ''
+        digest.update(sources.get(source_file, '').encode())
+        
+        definition = getattr(rule, 'definition', None)
+        if definition is not None:
+            digest.update(definition.model_dump_json().encode())
+    
+    return digest.hexdigest()[:16]
+
+
+class RuleSet:
+    
+    def __init__(self, rules: Dict[str, BaseRule], profiles: Optional[Dict[str, dict]] = None):
+        self.rules = rules
+        self.profiles = profiles or {}
+        self.fingerprint = _compute_fingerprint(rules)
+        # Compiled plans live with the rule set, so a reload drops them.
+        self.plans: Dict[Tuple[Optional[str], Optional[Tuple[str, ...]]], ExecutionPlan] = {}
+    
+    def plan(self, profile: Optional[str] = None, rule_names: Optional[Sequence[str]] = None) -> ExecutionPlan:
+        key = (profile, tuple(rule_names) if rule_names is not None else None)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = self.plans.setdefault(key, compile_plan(self.rules, self.profiles, profile, rule_names))
+        return plan
+
+
 class RuleRegistry:
     
-    def __init__(self):
-        self.rules: Dict[str, BaseRule] = {}
-        self._discover_rules()
+    def __init__(self, manifest_path: Optional[str] = None):
+        self.manifest_path = manifest_path or settings.rules_manifest_path or MANIFEST_PATH
+        self.profiles_path = settings.rule_profiles_path or PROFILES_PATH
+        self.generation = 0
+        self._ruleset: Optional[RuleSet] = None
+        self._requested_fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        # Kept across reloads so a reload does not reset a tripped breaker.
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Reload generation shared by the prefork server's workers. A reload
+        # in one worker bumps it and the others follow on their next use.
+        self._shared_generation = None
     
-    def _discover_rules(self):
-        rules_dir = os.path.dirname(__file__)
+    def share_generation(self, value):
+        self._shared_generation = value
+    
+    def _build(self, reload_modules: bool = False) -> RuleSet:
+        rules: Dict[str, BaseRule] = {}
         
-        for filename in os.listdir(rules_dir):
-            if filename.endswith('.py') and not filename.startswith('_'):
-                module_name = filename[:-3]
-                
-                if module_name in ['base', 'registry']:
-                    continue
-                
-                try:
-                    module = importlib.import_module(f'.{module_name}', package='app.rules')
-                    
-                    for name, obj in inspect.getmembers(module):
-                        if (inspect.isclass(obj) and 
-                            issubclass(obj, BaseRule) and 
-                            obj != BaseRule):
-                            
-                            rule_instance = obj()
-                            self.rules[rule_instance.name] = rule_instance
-                            logger.info(f"Loaded rule: {rule_instance.name}")
-                            
-                except Exception as e:
-                    logger.error(f"Failed to load rule from {module_name}: {str(e)}")
+        for rule_class in discover_rule_classes(self.manifest_path, reload_modules):
+            try:
+                rule_instance = rule_class()
+            except Exception as e:
+                logger.error(f"Failed to create rule {rule_class.__name__}: {str(e)}")
+                continue
+            if rule_instance.name in rules:
+                logger.error(f"Rule {rule_instance.name} is registered twice, skipping {rule_class.__module__}")
+                continue
+            rules[rule_instance.name] = rule_instance
+            logger.info(f"Loaded rule: {rule_instance.name}")
+        
+        for rule in build_declarative_rules(load_definitions()):
+            if rule.name in rules:
+                logger.error(f"Declarative rule {rule.name} clashes with an existing rule, skipping")
+                continue
+            rules[rule.name] = rule
+            logger.info(f"Loaded declarative rule: {rule.name}")
+        
+        return RuleSet(rules, load_profiles(self.profiles_path))
+    
+    @property
+    def ruleset(self) -> RuleSet:
+        shared = self._shared_generation
+        if shared is not None and shared.value != self.generation:
+            self._follow(shared)
+        ruleset = self._ruleset
+        if ruleset is None:
+            with self._lock:
+                if self._ruleset is None:
+                    self._ruleset = self._build()
+                ruleset = self._ruleset
+        return ruleset
+    
+    @property
+    def rules(self) -> Dict[str, BaseRule]:
+        return self.ruleset.rules
+    
+    @property
+    def fingerprint(self) -> str:
+        return self.ruleset.fingerprint
+    
+    def _swap(self, generation: int) -> RuleSet:
+        # Called with _lock held. The new rule set is built beside the
+        # current one and swapped in with a single assignment; audits that
+        # already hold the old set finish with it.
+        ruleset = self._build(reload_modules=True)
+        previous, self._ruleset = self._ruleset, ruleset
+        self.generation = generation
+        
+        old_fingerprint = previous.fingerprint if previous else None
+        logger.info(f"Reloaded {len(ruleset.rules)} rules, fingerprint {old_fingerprint} -> {ruleset.fingerprint}")
+        return ruleset
+    
+    def _follow(self, shared):
+        with self._lock:
+            if shared.value != self.generation:
+                self._swap(shared.value)
+    
+    def reload(self) -> RuleSet:
+        with self._lock:
+            shared = self._shared_generation
+            if shared is None:
+                return self._swap(self.generation + 1)
+            with shared.get_lock():
+                shared.value = max(shared.value, self.generation) + 1
+                generation = shared.value
+            return self._swap(generation)
+    
+    def ensure_fingerprint(self, fingerprint: Optional[str]):
+        # Called in pool workers with the parent's fingerprint. Reload at most
+        # once per new value so a worker that cannot match it does not
+        # rebuild on every call.
+        if not fingerprint or fingerprint == self._requested_fingerprint:
+            return
+        self._requested_fingerprint = fingerprint
+        if self.fingerprint != fingerprint:
+            self.reload()
+    
+    def plan(self, profile: Optional[str] = None, rule_names: Optional[Sequence[str]] = None) -> ExecutionPlan:
+        return self.ruleset.plan(profile, rule_names)
+    
+    def breaker(self, rule_name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(rule_name)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                rule_name,
+                CircuitBreaker(settings.rule_breaker_threshold, settings.rule_breaker_cooldown_seconds)
+            )
+        return breaker
     
     def get_rule(self, rule_name: str) -> Optional[BaseRule]:
         return self.rules.get(rule_name)
@@ -46,7 +179,7 @@ class RuleRegistry:
     def get_all_rules(self) -> List[BaseRule]:
         return list(self.rules.values())
     
-    def execute_rule(self, rule_name: str, email_thread: EmailThread) -> RuleResult:
+    def execute_rule(self, rule_name: str, email_thread: ParsedThread) -> RuleResult:
         rule = self.get_rule(rule_name)
         if not rule:
             return RuleResult(
@@ -58,13 +191,40 @@ class RuleRegistry:
         
         return rule.run(email_thread)
     
-    def execute_all_rules(self, email_thread: EmailThread) -> List[RuleResult]:
-        results = []
-        for rule in self.get_all_rules():
-            result = rule.run(email_thread)
-            results.append(result)
-        
-        return results
+    def execute_all_rules(self, email_thread: ParsedThread, deadline: Optional[float] = None) -> List[RuleResult]:
+        return execute_rules(self.get_all_rules(), email_thread, self.breaker, deadline)
+    
+    def execute_plan(self, plan: ExecutionPlan, email_thread: ParsedThread, deadline: Optional[float] = None,
+                     reused: Optional[Dict[str, RuleResult]] = None) -> List[RuleResult]:
+        if not reused:
+            return execute_rules(plan.rules, email_thread, self.breaker, deadline)
+        pending = [rule for rule in plan.rules if rule.name not in reused]
+        fresh = iter(execute_rules(pending, email_thread, self.breaker, deadline))
+        return [reused[rule.name] if rule.name in reused else next(fresh) for rule in plan.rules]
+    
+    def execute_plan_batch(self, plan: ExecutionPlan, email_threads: Sequence[ParsedThread],
+                           reused: Optional[Sequence[Optional[Dict[str, RuleResult]]]] = None) -> BatchResults:
+        # Rules with evaluate_batch run once over the whole batch; the rest,
+        # and any batched rule whose batch run fails, run per message when
+        # BatchResults.results is called.
+        columns: Dict[str, RuleColumn] = {}
+        if len(email_threads) >= settings.rule_batch_min_threads:
+            for rule in plan.rules:
+                if not rule.is_batched or rule.is_async:
+                    continue
+                breaker = self.breaker(rule.name)
+                if not breaker.allow():
+                    continue
+                started = time.monotonic()
+                column = rule.run_batch(email_threads)
+                if column is None:
+                    continue
+                columns[rule.name] = column
+                breaker.record(time.monotonic() - started > rule_budget(rule) * len(email_threads), rule.name)
+        return BatchResults(
+            plan.rules, email_threads, columns, reused,
+            lambda rules, email_thread: execute_rules(rules, email_thread, self.breaker)
+        )
 
 
-rule_registry = RuleRegistry() 
\ No newline at end of file
+rule_registry = RuleRegistry()
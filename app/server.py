@@ -0,0 +1,249 @@
+import gc
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from loguru import logger
+
+from .config import settings
+
+
+# Per-worker readiness slots shared with the parent through anonymous shared
+# memory. A slot stays NOT_WARMED until its first worker finishes warming up;
+# a recycled worker's replacement is REPLACING until it is warm again.
+NOT_WARMED, WARM, REPLACING = 0, 1, 2
+
+
+class WorkerReadiness:
+
+    def __init__(self):
+        self._slots = None
+        self._slot: Optional[int] = None
+        self.warmed = False
+        self.warmup: Dict[str, Any] = {}
+
+    @property
+    def managed(self) -> bool:
+        return self._slots is not None
+
+    def attach(self, slots, slot: int):
+        self._slots = slots
+        self._slot = slot
+
+    def mark_warm(self, warmup: Dict[str, Any]):
+        self.warmed = True
+        self.warmup = warmup
+        if self._slots is not None:
+            self._slots[self._slot] = WARM
+
+    @property
+    def ready(self) -> bool:
+        if self._slots is None:
+            return self.warmed
+        return self.warmed and all(state != NOT_WARMED for state in self._slots)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"ready": self.ready, "warmup": self.warmup}
+        if self._slots is not None:
+            stats.update({
+                "mode": "prefork",
+                "worker": self._slot,
+                "workers": len(self._slots),
+                "workers_warm": sum(1 for state in self._slots if state == WARM),
+            })
+        else:
+            stats["mode"] = "single"
+        return stats
+
+
+readiness = WorkerReadiness()
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PreforkServer:
+
+    def __init__(self, host: str, port: int, workers: int):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.max_rss_bytes = settings.server_max_rss_mb * 1024 * 1024
+        self._children: Dict[int, int] = {}
+        self._recycling: Dict[int, float] = {}
+        self._stopping = False
+        self._socket: Optional[socket.socket] = None
+        self._slots = None
+        self._generation = None
+        self._metrics_dir: Optional[str] = None
+        self._app = None
+
+    def _preload(self):
+        # Everything imported and built here is shared with the workers
+        # copy-on-write instead of being rebuilt in each of them.
+        from main import app
+        from .rules.registry import rule_registry
+
+        ruleset = rule_registry.ruleset
+        for profile in ruleset.profiles:
+            ruleset.plan(profile)
+        ruleset.plan()
+        self._app = app
+        # Keep the collector from touching, and so copying, preloaded objects.
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Preloaded {len(ruleset.rules)} rules, fingerprint {ruleset.fingerprint}")
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self._socket = sock
+
+    def _spawn(self, slot: int):
+        if self._slots[slot] == WARM:
+            self._slots[slot] = REPLACING
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                self._run_worker(slot)
+                code = 0
+            except BaseException as e:
+                logger.error(f"Server worker {os.getpid()} failed: {str(e)}")
+            finally:
+                os._exit(code)
+        self._children[pid] = slot
+        logger.info(f"Started server worker {pid} in slot {slot}")
+
+    def _run_worker(self, slot: int):
+        import uvicorn
+        from .metrics import metrics_exchange
+        from .rules.registry import rule_registry
+
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        random.seed()
+        readiness.attach(self._slots, slot)
+        # A reload on any worker bumps the shared generation; the others
+        # rebuild their rules the next time they read them.
+        rule_registry.share_generation(self._generation)
+        metrics_exchange.attach(self._metrics_dir, slot, settings.server_metrics_publish_seconds)
+        limit = None
+        if settings.server_max_requests > 0:
+            # Jitter keeps workers started together from recycling together.
+            limit = settings.server_max_requests + random.randint(0, max(0, settings.server_max_requests_jitter))
+        config = uvicorn.Config(
+            self._app,
+            limit_max_requests=limit,
+            timeout_graceful_shutdown=int(settings.server_graceful_timeout_seconds)
+        )
+        uvicorn.Server(config).run(sockets=[self._socket])
+
+    def _reap(self):
+        # Only our own children: waiting on any pid would also reap the job
+        # workers that multiprocessing tracks itself.
+        for pid, slot in list(self._children.items()):
+            try:
+                waited, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                waited, status = pid, 0
+            if waited == 0:
+                continue
+            del self._children[pid]
+            recycled = self._recycling.pop(pid, None) is not None
+            if self._stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if recycled or code == 0:
+                logger.info(f"Server worker {pid} exited, replacing it")
+            else:
+                logger.warning(f"Server worker {pid} exited with code {code}, replacing it")
+                time.sleep(1.0)
+            self._spawn(slot)
+
+    def _check_memory(self):
+        if not self.max_rss_bytes:
+            return
+        for pid in list(self._children):
+            if pid in self._recycling:
+                continue
+            rss = _rss_bytes(pid)
+            if rss is not None and rss > self.max_rss_bytes:
+                logger.warning(f"Server worker {pid} uses {rss // (1024 * 1024)} MB, recycling it")
+                self._recycling[pid] = time.monotonic()
+                os.kill(pid, signal.SIGTERM)
+        # A worker that ignores SIGTERM past the graceful timeout is killed.
+        deadline = time.monotonic() - settings.server_graceful_timeout_seconds - 5
+        for pid, since in list(self._recycling.items()):
+            if since < deadline and pid in self._children:
+                os.kill(pid, signal.SIGKILL)
+
+    def _stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        from .jobs import job_runner
+
+        self._preload()
+        self._bind()
+        self._slots = multiprocessing.Array('b', self.workers, lock=False)
+        self._generation = multiprocessing.Value('q', 0)
+        self._metrics_dir = tempfile.mkdtemp(prefix="audit-metrics-")
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"Listening on {self.host}:{self.port} with {self.workers} workers")
+        for slot in range(self.workers):
+            self._spawn(slot)
+        # Bulk job workers are supervised here, once, rather than per worker.
+        job_runner.start()
+
+        try:
+            while not self._stopping:
+                time.sleep(1.0)
+                self._reap()
+                self._check_memory()
+        finally:
+            self._shutdown()
+            job_runner.shutdown()
+            shutil.rmtree(self._metrics_dir, ignore_errors=True)
+
+    def _shutdown(self):
+        logger.info("Stopping server workers...")
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + settings.server_graceful_timeout_seconds + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._children.clear()
+        if self._socket is not None:
+            self._socket.close()
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None):
+    PreforkServer(
+        host or settings.server_host,
+        port or settings.server_port,
+        workers or settings.server_workers
+    ).run()
@@ -0,0 +1,3 @@
+from .index import ThreadIndex, thread_index
+
+__all__ = ['ThreadIndex', 'thread_index']
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from ..config import settings
+from ..models import HeaderFields
+
+
+MESSAGE_ID_PATTERN = re.compile(r'<[^<>\s]+>')
+
+
+def extract_message_ids(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return MESSAGE_ID_PATTERN.findall(value)
+
+
+def normalize_message_id(value: Optional[str]) -> Optional[str]:
+    ids = extract_message_ids(value)
+    if ids:
+        return ids[0]
+    value = (value or '').strip()
+    return f"<{value}>" if value else None
+
+
+class ThreadIndex:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ':memory:':
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Every message id seen, whether as a message or only as a
+            # reference, maps to its thread so replies attach with one lookup.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_refs ("
+                "message_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_messages ("
+                "message_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, parent_id TEXT, "
+                "subject TEXT, sender TEXT, date TEXT, received_at REAL NOT NULL, report TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS thread_messages_thread ON thread_messages (thread_id, received_at)")
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened thread index at {self.path}")
+        return self._conn
+
+    def has_message(self, message_id: str) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM thread_messages WHERE message_id = ?", (message_id,)
+            ).fetchone()
+        return row is not None
+
+    def get_thread_id(self, message_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT thread_id FROM thread_refs WHERE message_id = ?", (message_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def add_message(self, message_id: str, headers: HeaderFields, report_json: bytes) -> str:
+        parent_id = normalize_message_id(headers.get('in-reply-to'))
+        references = extract_message_ids(headers.get('references'))
+        # Closest ancestor first: in-reply-to, then references newest to oldest.
+        candidates = [message_id] + ([parent_id] if parent_id else []) + references[::-1]
+
+        with self._lock:
+            conn = self._connect()
+            placeholders = ", ".join("?" * len(candidates))
+            found = {
+                row[0] for row in conn.execute(
+                    f"SELECT thread_id FROM thread_refs WHERE message_id IN ({placeholders})", candidates
+                )
+            }
+            if not found:
+                thread_id = uuid.uuid4().hex
+            elif len(found) == 1:
+                thread_id = found.pop()
+            else:
+                thread_id = self._merge(conn, found)
+
+            conn.executemany(
+                "INSERT OR IGNORE INTO thread_refs (message_id, thread_id) VALUES (?, ?)",
+                [(candidate, thread_id) for candidate in candidates]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO thread_messages "
+                "(message_id, thread_id, parent_id, subject, sender, date, received_at, report) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    message_id, thread_id, parent_id,
+                    headers.get('subject', ''), headers.get('from', ''), headers.get('date', ''),
+                    time.time(), report_json.decode("utf-8")
+                )
+            )
+            conn.commit()
+        return thread_id
+
+    def _merge(self, conn: sqlite3.Connection, thread_ids: set) -> str:
+        # A message linking threads that arrived apart (a reply seen before
+        # its parent) joins them. The oldest thread keeps its id, so the id
+        # does not depend on arrival order once all messages are in. Runs in
+        # the caller's transaction.
+        ordered = sorted(thread_ids)
+        placeholders = ", ".join("?" * len(ordered))
+        row = conn.execute(
+            f"SELECT thread_id FROM thread_messages WHERE thread_id IN ({placeholders}) "
+            "GROUP BY thread_id ORDER BY MIN(received_at), thread_id LIMIT 1",
+            ordered
+        ).fetchone()
+        thread_id = row[0] if row else ordered[0]
+        losers = [other for other in ordered if other != thread_id]
+        placeholders = ", ".join("?" * len(losers))
+        conn.execute(f"UPDATE thread_refs SET thread_id = ? WHERE thread_id IN ({placeholders})", [thread_id] + losers)
+        conn.execute(f"UPDATE thread_messages SET thread_id = ? WHERE thread_id IN ({placeholders})", [thread_id] + losers)
+        logger.info(f"Merged threads {', '.join(losers)} into {thread_id}")
+        return thread_id
+
+    def get_thread(self, thread_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT message_id, parent_id, subject, sender, date, report FROM thread_messages "
+                "WHERE thread_id = ? ORDER BY received_at",
+                (thread_id,)
+            ).fetchall()
+        return [
+            {
+                "message_id": row[0],
+                "parent_id": row[1],
+                "subject": row[2],
+                "sender": row[3],
+                "date": row[4],
+                "report": json.loads(row[5])
+            }
+            for row in rows
+        ]
+
+    def thread_report(self, thread_id: str, new_message_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        messages = self.get_thread(thread_id)
+        scores = [message["report"].get("overall_score", 0.0) for message in messages]
+        new_ids = set(new_message_ids or [])
+        participants = sorted({message["sender"] for message in messages if message["sender"]})
+
+        return {
+            "thread_id": thread_id,
+            "subject": messages[0]["subject"] if messages else "",
+            "message_count": len(messages),
+            "participants": participants,
+            "overall_score": sum(scores) / len(scores) if scores else 0.0,
+            "newly_audited": [message["message_id"] for message in messages if message["message_id"] in new_ids],
+            "messages": messages
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+thread_index = ThreadIndex(settings.thread_index_path)
@@ -0,0 +1,3 @@
+"""
+Email Audit Service - Benchmarks
+"""
@@ -0,0 +1,132 @@
+import os
+import random
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple
+
+
+WORDS = (
+    "project deadline review meeting update team schedule report budget client "
+    "proposal design testing release document feedback summary agenda quarter "
+    "planning request support account delivery campaign newsletter offer"
+).split()
+
+GREETINGS = ["Hello there,", "Hi team,", "Dear customer,", "Good morning,", ""]
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+class CorpusSpec(NamedTuple):
+    name: str
+    count: int = 20
+    body_size: int = 1000
+    attachments: int = 0
+    attachment_size: int = 0
+    depth: int = 1
+    charset: str = "utf-8"
+    # "text", "html" or "both"
+    mix: str = "text"
+    header_lines: int = 0
+
+
+PROFILES: Dict[str, List[CorpusSpec]] = {
+    "quick": [
+        CorpusSpec("plain-text", count=20),
+        CorpusSpec("image-heavy", count=5, attachments=4, attachment_size=256 * 1024),
+        CorpusSpec("html-only", count=10, body_size=20000, mix="html"),
+        CorpusSpec("header-heavy", count=10, header_lines=200),
+    ],
+    "full": [
+        CorpusSpec("plain-text", count=200),
+        CorpusSpec("long-body", count=50, body_size=100000),
+        CorpusSpec("image-heavy", count=20, attachments=8, attachment_size=512 * 1024),
+        CorpusSpec("large-attachment", count=3, attachments=1, attachment_size=20 * 1024 * 1024),
+        CorpusSpec("nested", count=50, depth=5, attachments=2, attachment_size=16 * 1024),
+        CorpusSpec("html-only", count=50, body_size=200000, mix="html"),
+        CorpusSpec("text-and-html", count=50, body_size=5000, mix="both"),
+        CorpusSpec("latin-1", count=50, charset="iso-8859-1"),
+        CorpusSpec("header-heavy", count=50, header_lines=200),
+    ],
+}
+
+
+def _body_text(rng: random.Random, size: int, charset: str) -> str:
+    words = []
+    length = 0
+    extra = "é ü ñ" if charset != "us-ascii" else ""
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+        if rng.random() < 0.02:
+            words.append(extra + "\n\n")
+    text = " ".join(words)[:size]
+    return f"{rng.choice(GREETINGS)}\n\n{text}\n\nBest regards,\nBenchmark"
+
+
+def _html_body(text: str) -> str:
+    paragraphs = "".join(f"<p>{paragraph}</p>" for paragraph in text.split("\n\n"))
+    return (
+        "<html><head><style>p { margin: 0 }</style><script>var x = 1;</script></head>"
+        f"<body><table><tr><td>{paragraphs}</td></tr></table></body></html>"
+    )
+
+
+def _attachment_bytes(rng: random.Random, size: int) -> bytes:
+    return PNG_HEADER + rng.randbytes(max(0, size - len(PNG_HEADER)))
+
+
+def generate_message(spec: CorpusSpec, index: int, seed: int = 0) -> bytes:
+    rng = random.Random(f"{seed}:{spec.name}:{index}")
+    message = EmailMessage()
+    message["From"] = f"sender{index}@example.com"
+    message["To"] = "recipient@example.com"
+    message["Subject"] = f"{spec.name} message {index}"
+    message["Date"] = format_datetime(datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+    message["Message-ID"] = make_msgid(domain="bench.example.com")
+    for line in range(spec.header_lines):
+        message["Received"] = f"from relay{line}.example.com by mx.example.com; Mon, 1 Jan 2024 10:00:{line % 60:02d} +0000"
+    if spec.header_lines:
+        message["References"] = " ".join(f"<ref{line}@example.com>" for line in range(spec.header_lines))
+
+    text = _body_text(rng, spec.body_size, spec.charset)
+    if spec.mix == "html":
+        message.set_content(_html_body(text), subtype="html", charset=spec.charset)
+    else:
+        message.set_content(text, charset=spec.charset)
+        if spec.mix == "both":
+            message.add_alternative(_html_body(text), subtype="html", charset=spec.charset)
+
+    container = message
+    for level in range(1, spec.depth):
+        inner = EmailMessage()
+        inner.set_content(f"Nested part {level}")
+        container.add_attachment(inner)
+        container = inner
+
+    for number in range(spec.attachments):
+        container.add_attachment(
+            _attachment_bytes(rng, spec.attachment_size),
+            maintype="image",
+            subtype="png",
+            filename=f"image{number}.png"
+        )
+
+    return message.as_bytes()
+
+
+def generate_corpus(specs: List[CorpusSpec], seed: int = 0) -> Dict[str, List[bytes]]:
+    return {spec.name: [generate_message(spec, index, seed) for index in range(spec.count)] for spec in specs}
+
+
+def write_corpus(specs: List[CorpusSpec], directory: str, seed: int = 0) -> int:
+    written = 0
+    for name, messages in generate_corpus(specs, seed).items():
+        target = os.path.join(directory, name)
+        os.makedirs(target, exist_ok=True)
+        for index, data in enumerate(messages):
+            with open(os.path.join(target, f"{index:05d}.eml"), "wb") as f:
+                f.write(data)
+            written += 1
+    return written
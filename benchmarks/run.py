@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+# Repeated audits of identical bytes would only measure the result cache.
+os.environ.setdefault("AUDIT_CACHE_MAX_ENTRIES", "0")
+
+from loguru import logger
+
+from app.audit.pipeline import auditor, build_email_thread, report_generator
+from app.parser import EMLParser
+from app.parser.headers import HEADER_MODES
+from .corpus import PROFILES, generate_corpus
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        "min_ms": samples[0] * 1000,
+    }
+
+
+def _per_message(corpus: Dict[str, List[Any]], fn: Callable[[Any], Any]) -> Callable[[], None]:
+    items = [item for messages in corpus.values() for item in messages]
+
+    def run():
+        for item in items:
+            fn(item)
+    return run
+
+
+def _fresh(thread):
+    # Features are memoized per message; drop them so every repeat pays for
+    # them like a new request would.
+    for message in thread.messages:
+        message._features = None
+    return thread
+
+
+def _read_used_headers(message):
+    return message.subject, message.sender, message.date
+
+
+def _api_stage(corpus: Dict[str, List[bytes]]) -> Callable[[], None]:
+    import httpx
+    from main import app
+
+    messages = [data for group in corpus.values() for data in group]
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def post_all():
+        for index, data in enumerate(messages):
+            response = await client.post("/api/v1/audit", files={"file": (f"{index}.eml", data)})
+            response.raise_for_status()
+
+    return lambda: loop.run_until_complete(post_all())
+
+
+def run_benchmarks(profile: str, repeat: int, seed: int, api: bool) -> Dict[str, Any]:
+    specs = PROFILES[profile]
+    corpus = generate_corpus(specs, seed)
+    parser = EMLParser()
+    header_parsers = {mode: EMLParser(mode) for mode in HEADER_MODES}
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, messages in corpus.items():
+        group = {name: messages}
+        threads = {name: [build_email_thread(parser.parse_eml_data(data)) for data in messages]}
+        audits = {name: [auditor.audit_email_thread(thread) for thread in threads[name]]}
+
+        results[f"{name}/parse"] = _measure(_per_message(group, parser.parse_eml_data), repeat)
+        # Parse plus the headers the rules and history actually read, in
+        # each header mode.
+        for mode, mode_parser in header_parsers.items():
+            results[f"{name}/parse-headers/{mode}"] = _measure(
+                _per_message(group, lambda data, mode_parser=mode_parser: _read_used_headers(mode_parser.parse_eml_data(data))),
+                repeat
+            )
+        for rule in auditor.rule_registry.get_all_rules():
+            results[f"{name}/rule/{rule.name}"] = _measure(
+                _per_message(threads, lambda thread, rule=rule: rule.run(_fresh(thread))), repeat
+            )
+        results[f"{name}/audit"] = _measure(
+            _per_message(threads, lambda thread: auditor.audit_email_thread(_fresh(thread))), repeat
+        )
+        # The whole group as one batch, as the CLI audits it.
+        results[f"{name}/audit-batch"] = _measure(
+            lambda name=name: list(auditor.audit_email_threads([_fresh(thread) for thread in threads[name]])), repeat
+        )
+        results[f"{name}/report"] = _measure(_per_message(audits, report_generator.render), repeat)
+        if api:
+            results[f"{name}/api"] = _measure(_api_stage(group), repeat)
+        logger.warning(f"Benchmarked {name} ({len(messages)} messages)")
+
+    return {
+        "profile": profile,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stages": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_ms: float) -> List[str]:
+    regressions = []
+    for stage, timing in current["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        # Sub-millisecond stages are dominated by timer noise.
+        if not previous or previous["median_ms"] < min_ms:
+            continue
+        limit = previous["median_ms"] * (1 + threshold)
+        if timing["median_ms"] > limit:
+            regressions.append(
+                f"{stage}: {timing['median_ms']:.2f}ms vs baseline {previous['median_ms']:.2f}ms "
+                f"(+{(timing['median_ms'] / previous['median_ms'] - 1):.0%})"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Email Audit Service benchmarks")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-api", action="store_true", help="Skip the in-process HTTP stage")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown per stage, 0.25 = 25%%")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore stages faster than this in the baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write this run's results to a file")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    current = run_benchmarks(args.profile, args.repeat, args.seed, not args.no_api)
+    for stage, timing in current["stages"].items():
+        print(f"{stage:50s} median {timing['median_ms']:9.2f}ms  p95 {timing['p95_ms']:9.2f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote baseline to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("profile") != current["profile"]:
+        print(f"Baseline profile '{baseline.get('profile')}' does not match '{current['profile']}', skipping comparison")
+        return 0
+
+    regressions = compare(current, baseline, args.threshold, args.min_ms)
+    if regressions:
+        print("Regressions over threshold:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No stage regressed past the threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
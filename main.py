@@ -1,16 +1,47 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from loguru import logger
 
-from app.api import upload_router
+from app.api import upload_router, batch_router, threads_router, rules_router, history_router, near_duplicates_router, jobs_router, admin_router
+from app.api.ingest import inflight_bytes
+from app.api.middleware import RequestTimingMiddleware, UploadLimitMiddleware
+from app.audit.executor import audit_executor
+from app.audit.pipeline import auditor
+from app.audit.warmup import warm_up
+from app.config import settings
+from app.dedup import near_dup_index
+from app.history import history_store
+from app.jobs import job_runner
+from app.metrics import metrics, metrics_exchange
+from app.server import readiness
+from app.threads import thread_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Email Audit Service starting up...")
+    history_store.start()
+    near_dup_index.start()
+    # Under the prefork server the parent supervises the job workers.
+    if not readiness.managed:
+        job_runner.start()
+    # Requests are accepted only once this returns, so a worker never serves
+    # cold.
+    readiness.mark_warm(warm_up(settings.warmup_dir))
+    metrics_exchange.start()
     yield
     logger.info("Email Audit Service shutting down...")
+    metrics_exchange.publish()
+    if not readiness.managed:
+        job_runner.shutdown()
+    audit_executor.shutdown()
+    thread_index.close()
+    history_store.close()
+    near_dup_index.close()
 
 
 app = FastAPI(
@@ -28,7 +59,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(RequestTimingMiddleware)
+
+metrics.gauge("audit_pool_in_flight", "Audits running or queued in the worker pool",
+              lambda: audit_executor.stats()["in_flight"])
+metrics.gauge("audit_pool_queue_depth", "Audits waiting for a free worker",
+              lambda: audit_executor.stats()["queue_depth"])
+metrics.gauge("audit_pool_saturation", "Fraction of workers busy",
+              lambda: audit_executor.stats()["saturation"])
+metrics.gauge("audit_pool_rejected_total", "Audits rejected with 503 because the pool was full",
+              lambda: audit_executor.stats()["rejected"], kind="counter")
+metrics.gauge("audit_upload_bytes_in_flight", "Upload bytes currently spooled",
+              lambda: inflight_bytes.used)
+metrics.gauge("audit_job_messages_pending", "Job messages waiting for a bulk worker",
+              lambda: job_runner.stats().get("pending_messages", 0), per_process=False)
+metrics.gauge("audit_job_messages_running", "Job messages claimed or being audited by a bulk worker",
+              lambda: job_runner.stats().get("running_messages", 0), per_process=False)
+metrics.gauge("audit_cache_hits_total", "Result cache hits",
+              lambda: auditor.result_cache.stats()["hits"], kind="counter")
+metrics.gauge("audit_cache_misses_total", "Result cache misses",
+              lambda: auditor.result_cache.stats()["misses"], kind="counter")
+
 app.include_router(upload_router)
+app.include_router(batch_router)
+app.include_router(threads_router)
+app.include_router(rules_router)
+app.include_router(history_router)
+app.include_router(near_duplicates_router)
+app.include_router(jobs_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
@@ -42,11 +102,30 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
+    ready = readiness.ready
+    # The job counts come from SQLite.
+    jobs = await asyncio.to_thread(job_runner.stats)
+    body = {
+        "status": "healthy" if ready else "warming_up",
         "service": "email-audit-service",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "readiness": readiness.stats(),
+        "workers": audit_executor.stats(),
+        "upload_bytes_in_flight": inflight_bytes.used,
+        "cache": auditor.result_cache.stats(),
+        "history": history_store.stats(),
+        "near_duplicates": near_dup_index.stats(),
+        "jobs": jobs
     }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    # Gauges such as the job counts query SQLite, and peers' metrics are
+    # read from disk.
+    body = await asyncio.to_thread(metrics_exchange.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.audit.pipeline import audit_eml_batch, audit_eml_bytes
+from app.config import settings
+from app.rules import batch, length_rule
+from app.rules.base import BaseRule
+from benchmarks.corpus import PROFILES, CorpusSpec, generate_corpus
+
+GREETINGS = ["Hi Bob,", "Dear team,", "Good morning all,", "hey", "", "Hello\tthere,"]
+
+
+def _hand_written():
+    messages = []
+    for index, greeting in enumerate(GREETINGS):
+        # Bodies either side of the length bands: 0, 49, 50, 2000 and 2001
+        # characters.
+        for length in (0, 49, 50, 2000, 2001):
+            body = (greeting + "\n\n" + "x" * length)[:max(length, len(greeting))] if length else greeting
+            messages.append(
+                f"From: a{index}@example.com\r\nTo: b@example.com\r\nSubject: Note {length}\r\n\r\n{body}\r\n".encode()
+            )
+    messages.append(b"not an email at all")
+    messages.append(b"From: a@example.com\r\nContent-Type: text/html\r\n\r\n<p>Dear Bob,</p><p>" + b"word " * 30 + b"</p>")
+    return messages
+
+
+def _messages():
+    corpus = generate_corpus(PROFILES["quick"] + [
+        CorpusSpec("text-and-html", count=5, body_size=3000, mix="both"),
+        CorpusSpec("short", count=10, body_size=20),
+    ])
+    return [data for messages in corpus.values() for data in messages] + _hand_written()
+
+
+def _report(report):
+    body = json.loads(report.full)
+    body.pop("audit_timestamp")
+    return body
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_batched_reports_match_per_message_reports(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(batch, "numpy", None)
+        monkeypatch.setattr(length_rule, "numpy", None)
+    elif batch.numpy is None:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(settings, "rule_batch_min_threads", 2)
+    columns = {}
+    run_batch = BaseRule.run_batch
+
+    def recording_run_batch(rule, email_threads):
+        columns[rule.name] = run_batch(rule, email_threads)
+        return columns[rule.name]
+
+    monkeypatch.setattr(BaseRule, "run_batch", recording_run_batch)
+    messages = _messages()
+
+    batched = list(audit_eml_batch(messages))
+
+    # Every column was computed in bulk rather than falling back.
+    assert {"LengthRule", "GreetingRule"} <= set(columns)
+    assert all(column is not None for column in columns.values())
+    assert len(batched) == len(messages)
+    for data, (report, error) in zip(messages, batched):
+        if error is not None:
+            assert report is None
+            continue
+        assert _report(report) == _report(audit_eml_bytes(data))
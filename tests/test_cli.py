@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+from loguru import logger
+
+from app import cli
+
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Hi\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+@pytest.fixture
+def mailbox(tmp_path):
+    for name in ("a.eml", "b.eml"):
+        (tmp_path / name).write_bytes(MESSAGE)
+    yield tmp_path
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+def _run(mailbox, capsys, level):
+    assert cli.main(["audit", str(mailbox), "-w", "1", "-o", str(mailbox / "out.jsonl"), "--log-level", level]) == 0
+    return capsys.readouterr().err
+
+
+def test_progress_is_logged_at_info(mailbox, capsys):
+    err = _run(mailbox, capsys, "WARNING")
+    assert "INFO" in err and "Audited 2 messages, 0 failed" in err
+    assert "WARNING" not in err
+    # Per-message logs from the audit pipeline stay below the threshold.
+    assert "Generated JSON report" not in err
+
+
+def test_progress_is_hidden_above_warning(mailbox, capsys):
+    assert _run(mailbox, capsys, "ERROR") == ""
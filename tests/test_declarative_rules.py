@@ -0,0 +1,53 @@
+from app.audit import pipeline
+from app.config import settings
+from app.models.audit import RuleStatus
+from app.rules.declarative import RuleDefinition, build_declarative_rules
+
+DEFINITION = RuleDefinition(name="ClickRule", region="body", mode="forbid", patterns=["click here"])
+FILLER = "<p>" + "planning review " * 50 + "</p>\n"
+
+
+def _thread(html: str):
+    data = (
+        "From: a@example.com\r\nTo: b@example.com\r\nSubject: Notes\r\n"
+        "Content-Type: text/html; charset=utf-8\r\n\r\n<html><body>" + html + "</body></html>\r\n"
+    ).encode("utf-8")
+    return pipeline.build_email_thread(pipeline.parse_eml_data(data))
+
+
+def test_body_rules_scan_a_bounded_prefix_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "declarative_body_scan_chars", 2000)
+    rule, = build_declarative_rules([DEFINITION])
+    assert rule.definition.prefix_length == 2000
+
+    assert rule.evaluate(_thread("<p>Click here</p>" + FILLER * 20)).status == RuleStatus.FAIL
+    assert rule.evaluate(_thread(FILLER * 20 + "<p>Click here</p>")).status == RuleStatus.PASS
+
+
+def test_zero_scan_chars_scans_the_whole_body(monkeypatch):
+    monkeypatch.setattr(settings, "declarative_body_scan_chars", 0)
+    rule, = build_declarative_rules([DEFINITION])
+
+    assert rule.definition.prefix_length is None
+    assert rule.evaluate(_thread(FILLER * 20 + "<p>Click here</p>")).status == RuleStatus.FAIL
+
+
+def test_shorter_body_prefixes_are_cut_from_a_longer_one():
+    message = _thread("<p>Click HERE</p>" + FILLER * 40).messages[0]
+    features = message.features
+    signed = features.lower_prefix(16000)
+    scanned = features.html_text.scanned
+
+    assert features.lower_prefix(8000) == signed[:8000]
+    assert features.html_text.scanned == scanned
+    assert features.lower_prefix(8000).startswith("click here")
+
+
+def test_prefix_is_recomputed_when_lowercasing_changes_lengths():
+    # "İ" lowercases to two characters, so cutting the longer prefix would
+    # not give the lowercased shorter one.
+    message = _thread("<p>" + "İ" * 10 + " click</p>").messages[0]
+    features = message.features
+    features.lower_prefix(100)
+
+    assert features.lower_prefix(5) == ("İ" * 5).lower()
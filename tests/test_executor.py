@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.audit.executor import AuditExecutor, PoolSaturatedError, audit_executor
+from main import app
+
+# No other test audits this message, so no cached report answers first.
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Busy\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+@pytest.fixture
+def executor():
+    executor = AuditExecutor("thread", max_workers=1, max_queue=1, retry_after=7)
+    yield executor
+    executor.shutdown()
+
+
+async def _started(executor, gate, count):
+    tasks = [asyncio.create_task(executor.run(gate.wait, 5)) for _ in range(count)]
+    while executor.stats()["in_flight"] < count:
+        await asyncio.sleep(0.001)
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_calls_past_workers_and_queue_are_rejected(executor):
+    gate = threading.Event()
+    tasks = await _started(executor, gate, 2)
+
+    stats = executor.stats()
+    assert (stats["active"], stats["queue_depth"], stats["accepting"]) == (1, 1, False)
+    with pytest.raises(PoolSaturatedError) as rejected:
+        await executor.run(gate.wait, 5)
+    assert rejected.value.retry_after == 7
+
+    gate.set()
+    assert await asyncio.gather(*tasks) == [True, True]
+    stats = executor.stats()
+    assert (stats["in_flight"], stats["rejected"], stats["completed"]) == (0, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_waiting_calls_are_admitted_as_slots_free(executor):
+    gate = threading.Event()
+    tasks = await _started(executor, gate, 2)
+    waiting = asyncio.create_task(executor.run(lambda: "done", wait=True))
+    await asyncio.sleep(0.01)
+
+    assert not waiting.done()
+    assert executor.stats()["waiting"] == 1
+
+    gate.set()
+    assert await waiting == "done"
+    await asyncio.gather(*tasks)
+    assert executor.stats()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_keeps_its_slot_until_the_worker_finishes(executor):
+    gate = threading.Event()
+    task, = await _started(executor, gate, 1)
+    task.cancel()
+    await asyncio.sleep(0.01)
+
+    # The worker thread is still busy with the abandoned call.
+    assert executor.stats()["in_flight"] == 1
+
+    gate.set()
+    while executor.stats()["in_flight"]:
+        await asyncio.sleep(0.001)
+    assert executor.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue(executor):
+    gate = threading.Event()
+    tasks = await _started(executor, gate, 2)
+    abandoned = asyncio.create_task(executor.run(lambda: "never", wait=True))
+    waiting = asyncio.create_task(executor.run(lambda: "done", wait=True))
+    await asyncio.sleep(0.01)
+
+    abandoned.cancel()
+    await asyncio.sleep(0.01)
+    assert executor.stats()["waiting"] == 1
+
+    gate.set()
+    assert await waiting == "done"
+    await asyncio.gather(*tasks)
+
+
+def test_saturated_pool_answers_503_with_retry_after(monkeypatch):
+    monkeypatch.setattr(audit_executor, "_in_flight", audit_executor.capacity)
+    response = TestClient(app).post("/api/v1/audit", files={"file": ("m.eml", MESSAGE)})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(audit_executor.retry_after)
@@ -0,0 +1,54 @@
+import pytest
+
+from app.audit.pipeline import auditor, build_email_thread
+from app.parser import EMLParser
+from benchmarks.corpus import PROFILES, CorpusSpec, generate_corpus
+
+HAND_WRITTEN = [
+    b"From: =?utf-8?q?J=C3=BCrgen_M=C3=BCller?= <j@example.com>\r\n"
+    b"To: \"Doe, Jane\" <jane@example.com>, bob@example.com\r\n"
+    b"Cc: undisclosed-recipients:;\r\n"
+    b"Subject: =?utf-8?b?R3LDvMOfZSBhdXMgS8O2bG4=?= and\r\n =?iso-8859-1?q?caf=E9?=\r\n"
+    b"Date: Mon, 1 Jan 2024 10:00:00 +0100\r\n"
+    b"Message-ID: <a@example.com>\r\n\r\nHello Jane,\r\n\r\nSee you soon.\r\n\r\nBest regards,\r\nJ\r\n",
+
+    b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Report\r\nDate: not a date\r\n"
+    b"MIME-Version: 1.0\r\nContent-Type: multipart/mixed;\r\n boundary=\"XYZ\"\r\n\r\n"
+    b"--XYZ\r\nContent-Type: text/plain; charset=\"iso-8859-1\"\r\nContent-Transfer-Encoding: quoted-printable\r\n\r\n"
+    b"Hi Bob,=0D=0A caf=E9 au lait =\r\ncontinued\r\n"
+    b"--XYZ\r\nContent-Type: application/pdf;\r\n name=\"=?utf-8?q?r=C3=A9sum=C3=A9.pdf?=\"\r\n"
+    b"Content-Disposition: attachment;\r\n filename*=utf-8''r%C3%A9sum%C3%A9.pdf\r\nContent-Transfer-Encoding: base64\r\n\r\n"
+    b"JVBERi0xLjQKJcfsj6IK\r\n--XYZ--\r\n",
+
+    b"From: Sender <s@example.com>\r\nTo: r@example.com\r\nSubject:\r\n"
+    b"In-Reply-To: <parent@example.com>\r\nReferences: <root@example.com>\r\n <parent@example.com>\r\n"
+    b"Content-Type: text/html; charset=utf-8\r\n\r\n<p>Dear team,</p><p>Click here to claim your prize.</p>\r\n",
+
+    b"Subject: no sender\r\n\r\n",
+]
+
+
+def _messages():
+    corpus = generate_corpus(PROFILES["quick"] + [
+        CorpusSpec("latin-1", count=5, charset="iso-8859-1"),
+        CorpusSpec("nested", count=5, depth=3, attachments=1, attachment_size=1024),
+        CorpusSpec("text-and-html", count=5, body_size=3000, mix="both"),
+    ])
+    return [data for messages in corpus.values() for data in messages] + HAND_WRITTEN
+
+
+def _verdicts(parsed):
+    result = auditor.audit_email_thread(build_email_thread(parsed))
+    return [(r.rule_name, r.status, r.score, r.justification, r.details) for r in result.rule_results]
+
+
+MESSAGES = _messages()
+
+
+@pytest.mark.parametrize("data", MESSAGES, ids=[str(index) for index in range(len(MESSAGES))])
+def test_fast_and_structured_modes_build_the_same_model(data):
+    fast = EMLParser("fast").parse_eml_data(data)
+    structured = EMLParser("structured").parse_eml_data(data)
+
+    assert fast.to_model().model_dump() == structured.to_model().model_dump()
+    assert _verdicts(fast) == _verdicts(structured)
@@ -0,0 +1,73 @@
+import pytest
+
+from app.audit.pipeline import auditor, build_email_thread
+from app.parser import parse_eml_data
+from app.parser.html_text import HTMLTextStream, html_to_text
+
+PARAGRAPH = "<p>Quarterly &amp; planning   review with the <b>vendor</b>\n team.</p>"
+DOCUMENT = (
+    "<html><head><style>p { color: red }</style><script>var hidden = 1;</script></head><body>"
+    + PARAGRAPH * 400
+    + "<table><tr><td>cell one</td><td>cell two</td></tr></table></body></html>"
+)
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 5, 64, 4096])
+@pytest.mark.parametrize("length", [0, 1, 10, 100, 1000, 100000])
+def test_prefix_matches_the_full_conversion(chunk_chars, length):
+    stream = HTMLTextStream(DOCUMENT, chunk_chars=chunk_chars)
+
+    assert stream.prefix(length) == html_to_text(DOCUMENT)[:length]
+
+
+def test_conversion_skips_scripts_and_collapses_whitespace():
+    text = html_to_text(DOCUMENT)
+
+    assert "hidden" not in text and "color" not in text
+    assert text.startswith("Quarterly & planning review with the vendor team.\nQuarterly")
+    assert text.endswith("cell one\ncell two\n")
+
+
+def test_prefix_stops_reading_once_it_has_enough_text():
+    stream = HTMLTextStream(DOCUMENT, chunk_chars=256)
+    stream.prefix(100)
+
+    assert not stream.complete
+    # The text needs well under two paragraphs of markup, plus the head.
+    assert stream.scanned <= 512
+
+    stream.prefix(50)
+    assert stream.scanned <= 512
+
+
+def test_stripped_length_is_exact_up_to_the_limit():
+    full = len(html_to_text(DOCUMENT).strip())
+    short = "<p>  a short   note </p>"
+
+    assert HTMLTextStream(short).stripped_length(2000) == len("a short note")
+    assert HTMLTextStream(DOCUMENT).stripped_length(full + 10) == full
+    stream = HTMLTextStream(DOCUMENT, chunk_chars=256)
+    assert stream.stripped_length(2000) > 2000
+    assert not stream.complete
+
+
+def test_text_reads_the_whole_document():
+    stream = HTMLTextStream(DOCUMENT, chunk_chars=256)
+    stream.prefix(10)
+
+    assert stream.text() == html_to_text(DOCUMENT)
+    assert stream.complete
+    assert stream.scanned == len(DOCUMENT)
+
+
+def test_default_audit_converts_only_a_prefix_of_large_html():
+    data = (
+        "From: a@example.com\r\nTo: b@example.com\r\nSubject: Notes\r\n"
+        "Content-Type: text/html; charset=utf-8\r\n\r\n" + DOCUMENT * 20
+    ).encode("utf-8")
+    email_thread = build_email_thread(parse_eml_data(data))
+    auditor.audit_email_thread(email_thread)
+
+    stream = email_thread.messages[0].features.html_text
+    assert not stream.complete
+    assert stream.scanned < len(DOCUMENT * 20) // 4
@@ -0,0 +1,51 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.api.ingest import collect_message_refs
+from app.parser.sources import ArchiveTooLargeError, extract_zip_messages
+
+MESSAGE = b"From: a@example.com\r\nSubject: Hi\r\n\r\nHello\r\n"
+
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+def test_extraction_stops_at_byte_limit(tmp_path):
+    archive = tmp_path / "bomb.zip"
+    # Two megabytes of zeros compress to a few kilobytes.
+    _zip(archive, {"a.eml": b"\0" * (2 * 1024 * 1024)})
+
+    with pytest.raises(ArchiveTooLargeError):
+        extract_zip_messages(str(archive), str(tmp_path / "out"), max_bytes=1024 * 1024)
+    assert sum(os.path.getsize(tmp_path / "out" / name) for name in os.listdir(tmp_path / "out")) <= 1024 * 1024
+
+
+def test_sources_are_named_after_the_upload(tmp_path):
+    archive = tmp_path / "0000-c.zip"
+    _zip(archive, {"f1.eml": MESSAGE, "dir/f2.eml": MESSAGE, "notes.txt": b"skip"})
+    mailbox = tmp_path / "0001-box.mbox"
+    mailbox.write_bytes(b"From a\n" + MESSAGE + b"From b\n" + MESSAGE)
+    message = tmp_path / "0002-a.eml"
+    message.write_bytes(MESSAGE)
+
+    refs = collect_message_refs(
+        [(str(archive), "c.zip"), (str(mailbox), "box.mbox"), (str(message), "a.eml")], str(tmp_path), 1024 * 1024
+    )
+
+    assert [ref.source_id for ref in refs] == ["c.zip/f1.eml", "c.zip/dir/f2.eml", "box.mbox#0", "box.mbox#1", "a.eml"]
+    assert all(str(tmp_path) not in ref.source_id for ref in refs)
+
+
+def test_extraction_limit_covers_all_archives_of_a_job(tmp_path):
+    first, second = tmp_path / "0000-a.zip", tmp_path / "0001-b.zip"
+    _zip(first, {"m.eml": b"x" * 1000})
+    _zip(second, {"m.eml": b"x" * 1000})
+
+    with pytest.raises(ArchiveTooLargeError):
+        collect_message_refs([(str(first), "a.zip"), (str(second), "b.zip")], str(tmp_path), 1500)
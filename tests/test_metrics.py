@@ -0,0 +1,103 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.metrics import MetricsRegistry
+from main import app
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (-?[0-9.e+-]+|\+Inf|NaN)$')
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Counted\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+def _families(text):
+    # Checks the text exposition format and returns {family: [(name, labels, value)]}.
+    assert text.endswith("\n")
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            current = line.split(" ", 3)[2]
+            families[current] = []
+            continue
+        if line.startswith("# TYPE "):
+            assert line.split(" ")[2] == current
+            assert line.split(" ")[3] in ("counter", "gauge", "histogram")
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name = match.group(1)
+        assert name == current or name in (f"{current}_bucket", f"{current}_sum", f"{current}_count"), line
+        families[current].append((name, match.group(2) or "", float(match.group(3))))
+    return families
+
+
+def _registry():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("path",))
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    registry.gauge("queue_depth", "Queue depth", lambda: 3)
+    registry.gauge("jobs_pending", "Shared job count", lambda: 7, per_process=False)
+    return registry, requests, latency
+
+
+def test_counters_histograms_and_gauges_render_in_text_format():
+    registry, requests, latency = _registry()
+    requests.inc(path='/a "quoted"\\path')
+    requests.inc(2, path="/b")
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, stage="parse")
+
+    families = _families(registry.render())
+
+    assert families["requests_total"] == [
+        ("requests_total", '{path="/a \\"quoted\\"\\\\path"}', 1.0),
+        ("requests_total", '{path="/b"}', 2.0),
+    ]
+    assert families["latency_seconds"] == [
+        ("latency_seconds_bucket", '{stage="parse",le="0.1"}', 1.0),
+        ("latency_seconds_bucket", '{stage="parse",le="1.0"}', 3.0),
+        ("latency_seconds_bucket", '{stage="parse",le="+Inf"}', 4.0),
+        ("latency_seconds_sum", '{stage="parse"}', 6.05),
+        ("latency_seconds_count", '{stage="parse"}', 4.0),
+    ]
+    assert families["queue_depth"] == [("queue_depth", "", 3.0)]
+
+
+def test_peer_totals_are_merged_per_kind():
+    registry, requests, latency = _registry()
+    requests.inc(path="/a")
+    latency.observe(0.5, stage="parse")
+    peer = {"worker": 1, "metrics": {
+        "requests_total": [[["/a"], 4.0]],
+        "latency_seconds": [[["parse"], [1.0, 0.0, 0.0, 0.05]]],
+        "queue_depth": 5,
+    }}
+
+    families = _families(registry.render(worker=0, peers=[peer]))
+
+    assert families["requests_total"] == [("requests_total", '{path="/a"}', 5.0)]
+    assert ("latency_seconds_count", '{stage="parse"}', 2.0) in families["latency_seconds"]
+    # Levels are reported per worker; shared values only once.
+    assert families["queue_depth"] == [("queue_depth", '{worker="0"}', 3.0), ("queue_depth", '{worker="1"}', 5.0)]
+    assert families["jobs_pending"] == [("jobs_pending", "", 7.0)]
+
+
+def test_metrics_endpoint_reports_audits():
+    client = TestClient(app)
+    assert client.post("/api/v1/audit", files={"file": ("m.eml", MESSAGE)}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    families = _families(response.text)
+
+    stages = {labels: value for name, labels, value in families["audit_stage_duration_seconds"] if name.endswith("_count")}
+    assert stages['{stage="parse"}'] >= 1 and stages['{stage="audit"}'] >= 1
+    # Buckets are cumulative and end with the count.
+    for name in ("audit_rule_duration_seconds", "audit_stage_duration_seconds"):
+        series = {}
+        for sample, labels, value in families[name]:
+            series.setdefault(re.sub(r',le="[^"]*"\}$', "}", labels), []).append(value)
+        assert series
+        for values in series.values():
+            buckets, total, count = values[:-2], values[-2], values[-1]
+            assert buckets == sorted(buckets) and buckets[-1] == count and total >= 0
+    assert families["audit_pool_in_flight"]
@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from app.audit import pipeline
+from app.dedup import minhash
+from app.dedup.index import NearDuplicateIndex
+
+RULES = ("GreetingRule", "LengthRule", "SpamPhraseRule")
+
+WORDS = (
+    "planning review roadmap staffing budget quarter vendor contract timeline milestone design release "
+    "support migration customer feedback recruiting training security audit metrics report"
+).split()
+_random = random.Random(7)
+BODY = " ".join(_random.choice(WORDS) for _ in range(250))
+
+
+def _message(body: str) -> bytes:
+    return (
+        "From: sender@example.com\r\nTo: bob@example.com\r\nSubject: Planning review\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n\r\n" + body + "\r\n"
+    ).encode("utf-8")
+
+
+def _statuses(report) -> dict:
+    summary = json.loads(report.full)
+    return {result["rule_name"]: result for result in summary["rule_results"]}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = NearDuplicateIndex(min_similarity=0.85, enabled=True, reuse=True)
+    monkeypatch.setattr(pipeline, "near_dup_index", index)
+    return index
+
+
+def test_near_duplicate_does_not_reuse_greeting_or_phrase_verdicts(index):
+    first = _statuses(pipeline.audit_eml_bytes(_message("Hi Bob, " + BODY), rule_names=RULES))
+    assert first["GreetingRule"]["status"] == "pass"
+    assert first["SpamPhraseRule"]["status"] == "pass"
+
+    second_message = _message(BODY + " Click here, winner!")
+    signature = index.signature_for(pipeline.build_email_thread(pipeline.parse_eml_data(second_message)).messages[0])
+    assert index.lookup(signature) is not None
+
+    second = _statuses(pipeline.audit_eml_bytes(second_message, rule_names=RULES))
+    assert second["GreetingRule"]["status"] == "fail"
+    assert second["SpamPhraseRule"]["status"] == "fail"
+    assert "near_duplicate_of" not in (second["GreetingRule"]["details"] or {})
+
+
+def test_near_duplicate_reuses_only_matching_inputs(index):
+    pipeline.audit_eml_bytes(_message("Hi Bob, " + BODY + " See https://example.com/a"), rule_names=RULES)
+    second = _statuses(pipeline.audit_eml_bytes(_message("Hi Bob, " + BODY + " See https://example.com/b"), rule_names=RULES))
+
+    assert "near_duplicate_of" in (second["GreetingRule"]["details"] or {})
+    assert "near_duplicate_of" not in (second["SpamPhraseRule"]["details"] or {})
+
+
+def test_disabled_index_skips_signing(monkeypatch):
+    index = NearDuplicateIndex(enabled=False)
+    monkeypatch.setattr(pipeline, "near_dup_index", index)
+    monkeypatch.setattr(index, "signature_for", lambda message: pytest.fail("signed with detection off"))
+
+    pipeline.audit_eml_bytes(_message("Hi Bob, " + BODY), rule_names=RULES)
+
+
+def test_numpy_signature_matches_pure_python():
+    pytest.importorskip("numpy")
+    hashes = minhash.shingle_hashes(BODY)
+    expected = minhash.array('I', [
+        min(((a * value + b) % minhash._PRIME) & minhash._MASK for value in hashes)
+        for a, b in minhash._PERMUTATIONS
+    ])
+    assert minhash._numpy_signature(hashes) == expected
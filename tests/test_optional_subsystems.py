@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.history import history_store
+from app.jobs import job_runner
+from app.threads import thread_index
+from main import app
+
+MESSAGE = b"Message-ID: <a@example.com>\r\nFrom: a@example.com\r\nSubject: Hi\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_stores_are_opt_in(monkeypatch):
+    for name in ("JOBS_DB", "AUDIT_HISTORY_DB", "THREAD_INDEX_DB"):
+        monkeypatch.delenv(name, raising=False)
+    defaults = Settings()
+    assert defaults.jobs_db_path == ""
+    assert defaults.history_db_path == ""
+    assert defaults.thread_index_path == ""
+
+
+def test_plain_app_starts_no_background_work(client, monkeypatch):
+    monkeypatch.setattr(job_runner.store, "path", "")
+    monkeypatch.setattr(history_store, "path", "")
+    with client:
+        health = client.get("/health").json()
+        assert health["jobs"]["enabled"] is False
+        assert health["jobs"].get("alive", 0) == 0
+        assert health["history"]["enabled"] is False
+        assert client.get("/metrics").status_code == 200
+
+
+def test_thread_api_is_disabled_without_index(client, monkeypatch):
+    monkeypatch.setattr(thread_index, "path", "")
+    assert client.post("/api/v1/threads", files={"files": ("a.eml", MESSAGE)}).status_code == 404
+    assert client.get("/api/v1/threads/abc").status_code == 404
+
+
+def test_thread_api_with_index(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(thread_index, "path", str(tmp_path / "threads.db"))
+    try:
+        response = client.post("/api/v1/threads", files={"files": ("a.eml", MESSAGE)})
+        assert response.status_code == 200
+        [thread] = response.json()["threads"]
+        assert client.get(f"/api/v1/threads/{thread['thread_id']}").status_code == 200
+    finally:
+        thread_index.close()
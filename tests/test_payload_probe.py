@@ -0,0 +1,112 @@
+import hashlib
+import struct
+from email.message import EmailMessage
+
+import pytest
+
+from app.parser import parse_eml_data
+from app.parser.probe import MAX_JPEG_SCAN_BYTES, PayloadProbe
+
+
+def _png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00" + b"\x00" * 64
+
+
+def _gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 64
+
+
+def _webp(chunk, payload):
+    body = b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body + b"\x00" * 16
+
+
+def _webp_vp8(width, height):
+    return _webp(b"VP8 ", b"\x00\x00\x00" + b"\x9d\x01\x2a" + struct.pack("<HH", width, height) + b"\x00" * 8)
+
+
+def _webp_vp8l(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    return _webp(b"VP8L", b"\x2f" + struct.pack("<I", bits) + b"\x00" * 8)
+
+
+def _webp_vp8x(width, height):
+    return _webp(b"VP8X", b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little"))
+
+
+def _segment(marker, body):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(body) + 2) + body
+
+
+def _jpeg(width, height, exif_bytes=0, sof=0xC0):
+    return (
+        b"\xff\xd8"
+        + _segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")
+        + b"".join(_segment(0xE1, b"\x00" * min(60000, exif_bytes - done)) for done in range(0, exif_bytes, 60000))
+        + b"\xff\xff"
+        + _segment(sof, b"\x08" + struct.pack(">HH", height, width) + b"\x03" + b"\x00" * 9)
+        + _segment(0xDA, b"\x00" * 10)
+        + b"\x00" * 128 + b"\xff\xd9"
+    )
+
+
+def _probe(data, chunk_size):
+    probe = PayloadProbe()
+    for start in range(0, len(data), chunk_size):
+        probe.feed(data[start:start + chunk_size])
+    return probe.facts()
+
+
+@pytest.mark.parametrize("data, detected, dimensions", [
+    (_png(640, 480), "image/png", (640, 480)),
+    (_gif(320, 200), "image/gif", (320, 200)),
+    (_webp_vp8(300, 150), "image/webp", (300, 150)),
+    (_webp_vp8l(1000, 16383), "image/webp", (1000, 16383)),
+    (_webp_vp8x(4000, 3000), "image/webp", (4000, 3000)),
+    (_jpeg(1024, 768), "image/jpeg", (1024, 768)),
+    (_jpeg(800, 600, exif_bytes=200000, sof=0xC2), "image/jpeg", (800, 600)),
+    (b"%PDF-1.4\n" + b"\x00" * 64, "application/pdf", None),
+    (b"plain text", None, None),
+])
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_probe_reads_type_and_dimensions(data, detected, dimensions, chunk_size):
+    facts = _probe(data, chunk_size)
+
+    assert facts.detected_type == detected
+    assert ((facts.width, facts.height) if facts.width is not None else None) == dimensions
+    assert facts.sha256 == hashlib.sha256(data).hexdigest()
+    assert facts.decoded_size == len(data)
+
+
+def test_jpeg_frame_header_past_the_scan_limit_is_not_read():
+    facts = _probe(_jpeg(800, 600, exif_bytes=MAX_JPEG_SCAN_BYTES + 200000), 64 * 1024)
+
+    assert facts.detected_type == "image/jpeg"
+    assert facts.width is None
+
+
+def test_jpeg_without_frame_header_has_no_dimensions():
+    data = b"\xff\xd8" + _segment(0xDA, b"\x00" * 10) + b"\x00" * 64
+    assert _probe(data, 5).width is None
+
+
+def _attachment(data, maintype, subtype):
+    message = EmailMessage()
+    message["From"] = "a@example.com"
+    message["Subject"] = "Files"
+    message.set_content("See attached.")
+    message.add_attachment(data, maintype=maintype, subtype=subtype, filename="file.bin")
+    return parse_eml_data(message.as_bytes()).attachments[0]
+
+
+def test_attachment_declared_as_another_type_is_a_mismatch():
+    attachment = _attachment(_jpeg(64, 32), "image", "png")
+
+    assert attachment.detected_type == "image/jpeg"
+    assert attachment.dimensions == (64, 32)
+    assert attachment.type_mismatch
+
+
+@pytest.mark.parametrize("maintype, subtype", [("image", "jpeg"), ("image", "jpg"), ("application", "octet-stream")])
+def test_matching_or_generic_declared_type_is_not_a_mismatch(maintype, subtype):
+    assert not _attachment(_jpeg(64, 32), maintype, subtype).type_mismatch
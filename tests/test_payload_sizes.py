@@ -0,0 +1,35 @@
+import base64
+import binascii
+import quopri
+
+import pytest
+
+from app.parser import payload
+from app.parser.streaming import SpilledPayload
+
+DATA = bytes(range(256)) * 8 + "Grüße aus Köln = 100 %\r\n".encode("utf-8") * 20
+
+
+def _spilled(text: str, monkeypatch, chunk_chars: int) -> SpilledPayload:
+    monkeypatch.setattr(payload, "SIZE_CHUNK_CHARS", chunk_chars)
+    return SpilledPayload(text)
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 5, 7, 64])
+def test_quoted_printable_size_matches_decoded_length(monkeypatch, chunk_chars):
+    # Soft breaks as "=\r\n", the way a message read from disk keeps them.
+    encoded = quopri.encodestring(DATA).decode("ascii").replace("\n", "\r\n")
+    raw = _spilled(encoded, monkeypatch, chunk_chars)
+
+    assert payload._quoted_printable_size(raw) == len(binascii.a2b_qp(encoded))
+    assert payload._quoted_printable_size(encoded) == len(binascii.a2b_qp(encoded))
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 3, 4, 76, 1000])
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 100, len(DATA)])
+def test_base64_size_matches_decoded_length(monkeypatch, chunk_chars, length):
+    encoded = base64.encodebytes(DATA[:length]).decode("ascii").replace("\n", "\r\n")
+    raw = _spilled(encoded, monkeypatch, chunk_chars)
+
+    assert payload._base64_size(raw) == length
+    assert payload._base64_size(encoded) == length
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.config import settings
+from app.profiling import stack_sampler
+from main import app
+
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Profiled\r\n\r\nHi Bob, see you soon.\r\n"
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    yield TestClient(app)
+    stack_sampler.stop()
+
+
+def _profile(client, headers=ADMIN):
+    return client.post("/api/v1/audit?profiling=true", files={"file": ("m.eml", MESSAGE)}, headers=headers)
+
+
+def test_profiling_needs_the_admin_token(client, monkeypatch):
+    assert _profile(client, headers={}).status_code == 403
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert _profile(client).status_code == 404
+
+
+def test_profiled_audit_returns_report_and_stage_breakdown(client):
+    # Profiled twice: a profiled audit always runs afresh, even when cached.
+    for _ in range(2):
+        body = _profile(client).json()
+
+        assert body["report"]["rule_results"]
+        profile = body["profile"]
+        assert set(profile["stages_ms"]) == {"parse", "rules", "report"}
+        assert profile["stages_ms"]["parse"] > 0 and profile["stages_ms"]["rules"] > 0
+        assert 0 < len(profile["functions"]) <= settings.profile_top_functions
+        assert {"function", "calls", "primitive_calls", "own_ms", "cumulative_ms"} == set(profile["functions"][0])
+
+
+def test_concurrent_profiling_is_refused(client):
+    with profiling._profile_lock:
+        assert _profile(client).status_code == 409
+
+
+def _busy_marker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collects_collapsed_stacks(client):
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_marker, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        started = client.post("/api/v1/admin/sampler?seconds=30&interval=0.002", headers=ADMIN)
+        assert started.status_code == 200 and started.json()["running"]
+        assert client.post("/api/v1/admin/sampler?seconds=30", headers=ADMIN).status_code == 409
+
+        while client.get("/api/v1/admin/sampler", headers=ADMIN).json()["samples"] < 5:
+            time.sleep(0.01)
+        stopped = client.delete("/api/v1/admin/sampler", headers=ADMIN).json()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert not stopped["running"] and stopped["samples"] >= 5
+    stacks = client.get("/api/v1/admin/sampler/stacks", headers=ADMIN)
+    assert stacks.headers["x-sampler-pid"] == str(os.getpid())
+    lines = stacks.text.splitlines()
+    assert len(lines) == stopped["distinct_stacks"]
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and " " not in stack.split(";")[0]
+    assert any(line.startswith("busy_worker;") and "_busy_marker" in line for line in lines)
+
+
+def test_sampler_stops_on_its_own(client):
+    client.post("/api/v1/admin/sampler?seconds=0.05&interval=0.005", headers=ADMIN)
+    deadline = time.monotonic() + 5
+    while stack_sampler.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stats = client.get("/api/v1/admin/sampler", headers=ADMIN).json()
+    assert not stats["running"] and stats["stopped_at"] is not None
+
+
+def test_sampler_endpoints_need_the_admin_token(client):
+    assert client.get("/api/v1/admin/sampler").status_code == 403
+    assert client.post("/api/v1/admin/sampler").status_code == 403
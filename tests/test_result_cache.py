@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.audit.pipeline import auditor, report_generator
+from app.models import ParsedThread
+from app.models.audit import RuleStatus
+from app.rules.base import BaseRule
+from main import app
+
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Hi\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+class HangingRule(BaseRule):
+
+    timeout = 0.05
+
+    async def evaluate_async(self, email_thread):
+        await asyncio.sleep(1.0)
+        return self._create_result(RuleStatus.PASS, 1.0, "late")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(auditor.rule_registry.ruleset.rules, "HangingRule", HangingRule("HangingRule", ""))
+    return TestClient(app)
+
+
+def _post(client, rules):
+    return client.post(f"/api/v1/audit?rules={rules}", files={"file": ("m.eml", MESSAGE)})
+
+
+def test_timed_out_report_is_not_cached(client):
+    first = _post(client, "HangingRule,GreetingRule")
+    assert first.json()["rule_results"][0]["status"] == "timeout"
+    assert "etag" not in first.headers
+
+    plan = auditor.rule_registry.plan(None, ["HangingRule", "GreetingRule"])
+    assert auditor.get_cached_report(hashlib.sha256(MESSAGE).hexdigest(), plan) is None
+
+
+def test_complete_report_is_cached_with_etag(client):
+    first = _post(client, "GreetingRule")
+    assert first.headers["etag"]
+    assert _post(client, "GreetingRule").headers["etag"] == first.headers["etag"]
+    revalidated = client.post(
+        "/api/v1/audit?rules=GreetingRule", files={"file": ("m.eml", MESSAGE)},
+        headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+
+def test_failed_audit_is_not_cacheable():
+    result = auditor._create_error_result(ParsedThread([]), "boom")
+    report = report_generator.render(result)
+    assert not report.cacheable
+    assert b"audit_failed" not in report.full
+
+
+def _revalidate(client, etag, view="full"):
+    return client.post(
+        f"/api/v1/audit?rules=GreetingRule&view={view}", files={"file": ("m.eml", MESSAGE)},
+        headers={"If-None-Match": etag}
+    )
+
+
+def test_if_none_match_accepts_weak_lists_and_wildcard(client):
+    etag = _post(client, "GreetingRule").headers["etag"]
+
+    assert _revalidate(client, f"W/{etag}").status_code == 304
+    assert _revalidate(client, f'"other", {etag}').status_code == 304
+    assert _revalidate(client, "*").status_code == 304
+    assert _revalidate(client, '"other"').status_code == 200
+
+
+def test_each_view_has_its_own_etag(client):
+    full = _post(client, "GreetingRule").headers["etag"]
+    summary = _revalidate(client, '"none"', view="summary")
+
+    assert summary.headers["etag"] != full
+    assert _revalidate(client, full, view="summary").status_code == 200
+    assert _revalidate(client, summary.headers["etag"], view="summary").status_code == 304
+
+
+def test_fingerprint_change_invalidates_cache_and_etag(client, monkeypatch):
+    digest = hashlib.sha256(MESSAGE).hexdigest()
+    plan = auditor.rule_registry.plan(None, ["GreetingRule"])
+    old = _post(client, "GreetingRule").headers["etag"]
+    assert auditor.get_cached_report(digest, plan) is not None
+
+    # A reload with changed rules gives the rule set a new fingerprint.
+    monkeypatch.setattr(auditor.rule_registry.ruleset, "fingerprint", "changed")
+    assert auditor.get_cached_report(digest, plan) is None
+
+    response = _revalidate(client, old)
+    assert response.status_code == 200
+    assert response.headers["etag"] != old
+    assert auditor.get_cached_report(digest, plan) is not None
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from abc import abstractmethod
+
+import pytest
+
+from app.models import ParsedThread
+from app.models.audit import RuleStatus
+from app.rules.base import BaseRule
+from app.rules.execution import CircuitBreaker, execute_rules
+
+
+class QuickRule(BaseRule):
+
+    async def evaluate_async(self, email_thread):
+        return self._create_result(RuleStatus.PASS, 1.0, "quick")
+
+
+class SlowCleanupRule(BaseRule):
+
+    # Takes a while to wind down once cancelled, e.g. closing a connection,
+    # so the whole async batch overruns the audit deadline.
+    timeout = 5.0
+
+    async def evaluate_async(self, email_thread):
+        try:
+            await asyncio.sleep(5.0)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.5)
+            raise
+        return self._create_result(RuleStatus.PASS, 1.0, "slow")
+
+
+def _breakers():
+    breakers = {}
+    return lambda name: breakers.setdefault(name, CircuitBreaker(threshold=0, cooldown=0.0))
+
+
+def test_rule_without_evaluate_is_rejected_at_definition():
+    with pytest.raises(TypeError):
+        class EmptyRule(BaseRule):
+            pass
+
+
+def test_abstract_intermediate_base_is_allowed():
+    class LookupRule(BaseRule):
+
+        @abstractmethod
+        def lookup(self, email_thread):
+            pass
+
+    class DomainRule(LookupRule):
+
+        def lookup(self, email_thread):
+            return True
+
+        def evaluate(self, email_thread):
+            return self._create_result(RuleStatus.PASS, 1.0, "ok")
+
+    assert DomainRule("DomainRule", "").evaluate(ParsedThread(messages=[])).status == RuleStatus.PASS
+
+
+def test_deadline_keeps_finished_async_results():
+    rules = [QuickRule("QuickRule", ""), SlowCleanupRule("SlowCleanupRule", "")]
+
+    results = execute_rules(rules, ParsedThread(messages=[]), _breakers(), deadline=time.monotonic() + 0.3)
+
+    assert results[0].status == RuleStatus.PASS
+    assert results[1].status == RuleStatus.TIMEOUT
@@ -0,0 +1,10 @@
+from app.rules.registry import rule_registry
+
+
+def test_spam_phrase_rule_is_opt_in():
+    ruleset = rule_registry.ruleset
+
+    assert "SpamPhraseRule" in ruleset.rules
+    assert "SpamPhraseRule" not in ruleset.plan().rule_names
+    assert "SpamPhraseRule" in ruleset.plan("deliverability").rule_names
+    assert ruleset.plan(rule_names=["SpamPhraseRule"]).rule_names == ["SpamPhraseRule"]
@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    return TestClient(app)
+
+
+def test_reload_requires_admin_token(client):
+    assert client.post("/api/v1/rules/reload").status_code == 403
+    assert client.post("/api/v1/rules/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/api/v1/rules/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["rules"]
+
+
+def test_reload_is_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert client.post("/api/v1/rules/reload", headers={"X-Admin-Token": "secret"}).status_code == 404
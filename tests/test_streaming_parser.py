@@ -0,0 +1,72 @@
+import hashlib
+import io
+import random
+from email.message import EmailMessage
+
+import pytest
+
+from app.parser import EMLParser
+from app.parser.streaming import SpilledPayload, SpoolingMessage
+
+rng = random.Random(3)
+IMAGE = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x01\x00\x00\x00\x00\x80" + rng.randbytes(200 * 1024)
+# Mostly printable with "=" and high bytes, so quoted-printable escapes and
+# soft breaks land on every chunk boundary sooner or later.
+BLOB = bytes(rng.choice(b"abc=\xe9\n ") for _ in range(100 * 1024))
+
+
+def _message() -> bytes:
+    message = EmailMessage()
+    message["From"] = "a@example.com"
+    message["To"] = "b@example.com"
+    message["Subject"] = "Files"
+    message.set_content("Hi Bob,\n\nThe files are attached.\n")
+    message.add_attachment(IMAGE, maintype="image", subtype="png", filename="chart.png")
+    message.add_attachment(BLOB, maintype="application", subtype="octet-stream", filename="data.bin", cte="quoted-printable")
+    return message.as_bytes()
+
+
+@pytest.fixture(autouse=True)
+def small_spill_threshold(monkeypatch):
+    monkeypatch.setattr(SpoolingMessage, "spill_threshold", 16 * 1024)
+
+
+def _summary(parsed):
+    return parsed.plain_text, [
+        (a.filename, a.content_type, a.size, a.sha256, a.detected_type, a.dimensions) for a in parsed.attachments
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096, 65536])
+def test_large_parts_are_spilled_and_read_back(chunk_size):
+    parsed = EMLParser().parse_eml_stream(io.BytesIO(_message()), chunk_size=chunk_size)
+    image, blob = parsed.attachments
+
+    assert all(isinstance(a.payload._part._payload, SpilledPayload) for a in parsed.attachments)
+    assert image.read_payload() == IMAGE and blob.read_payload() == BLOB
+    assert (image.size, blob.size) == (len(IMAGE), len(BLOB))
+    assert image.sha256 == hashlib.sha256(IMAGE).hexdigest()
+    assert blob.sha256 == hashlib.sha256(BLOB).hexdigest()
+    assert image.dimensions == (256, 128)
+
+
+def test_streamed_parse_matches_parsing_in_memory():
+    data = _message()
+    streamed = EMLParser().parse_eml_stream(io.BytesIO(data), chunk_size=1000)
+    in_memory = EMLParser().parse_eml_data(data)
+
+    assert _summary(streamed) == _summary(in_memory)
+
+
+def test_single_part_message_body_is_spilled():
+    message = EmailMessage()
+    message["From"] = "a@example.com"
+    message["Subject"] = "Raw"
+    message.set_content(IMAGE, maintype="image", subtype="png", filename="chart.png")
+
+    parsed = EMLParser().parse_eml_stream(io.BytesIO(message.as_bytes()), chunk_size=4096)
+    image, = parsed.attachments
+
+    assert isinstance(image.payload._part._payload, SpilledPayload)
+    assert image.read_payload() == IMAGE
+    assert image.size == len(IMAGE)
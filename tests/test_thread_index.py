@@ -0,0 +1,41 @@
+from app.models import HeaderFields
+from app.threads.index import ThreadIndex
+
+
+def _headers(message_id, in_reply_to=None, references=None) -> HeaderFields:
+    return HeaderFields.from_dict({"message-id": message_id, "in-reply-to": in_reply_to, "references": references})
+
+
+def _add(index, message_id, **kwargs) -> str:
+    return index.add_message(message_id, _headers(message_id, **kwargs), b'{"overall_score": 1.0}')
+
+
+def test_out_of_order_reply_merges_threads():
+    index = ThreadIndex(":memory:")
+    first = _add(index, "<a>")
+    # C replies to B only, so until B arrives it starts a thread of its own.
+    orphan = _add(index, "<c>", in_reply_to="<b>", references="<b>")
+    assert orphan != first
+
+    merged = _add(index, "<b>", in_reply_to="<a>", references="<a>")
+
+    assert merged == first
+    assert {index.get_thread_id(message_id) for message_id in ("<a>", "<b>", "<c>")} == {first}
+    assert sorted(message["message_id"] for message in index.get_thread(first)) == ["<a>", "<b>", "<c>"]
+    assert index.get_thread(orphan) == []
+
+
+def test_arrival_order_does_not_change_threads():
+    in_order = ThreadIndex(":memory:")
+    _add(in_order, "<a>")
+    _add(in_order, "<b>", in_reply_to="<a>", references="<a>")
+    _add(in_order, "<c>", in_reply_to="<b>", references="<b>")
+
+    out_of_order = ThreadIndex(":memory:")
+    _add(out_of_order, "<a>")
+    _add(out_of_order, "<c>", in_reply_to="<b>", references="<b>")
+    _add(out_of_order, "<b>", in_reply_to="<a>", references="<a>")
+
+    for index in (in_order, out_of_order):
+        thread_id = index.get_thread_id("<a>")
+        assert sorted(message["message_id"] for message in index.get_thread(thread_id)) == ["<a>", "<b>", "<c>"]
@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.ingest import inflight_bytes
+from app.api.middleware import MULTIPART_OVERHEAD_BYTES
+from app.config import settings
+from main import app
+
+MESSAGE = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: Hi\r\n\r\nHi Bob, see you soon.\r\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_bytes", 1024)
+    return TestClient(app)
+
+
+def _chunks(total: int, size: int = 16 * 1024):
+    for _ in range(total // size):
+        yield b"x" * size
+
+
+def test_content_length_over_limit_is_refused_before_reading(client):
+    body = b"x" * (1024 + MULTIPART_OVERHEAD_BYTES + 1)
+    response = client.post("/api/v1/audit", content=body, headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 413
+
+
+def test_body_without_length_is_cut_off_at_limit(client):
+    response = client.post(
+        "/api/v1/audit", content=_chunks(4 * MULTIPART_OVERHEAD_BYTES),
+        headers={"Content-Type": "multipart/form-data; boundary=x"}
+    )
+    assert response.status_code == 413
+    assert inflight_bytes.used == 0
+
+
+def test_file_part_over_limit_gets_413(client):
+    response = client.post("/api/v1/audit", files={"file": ("m.eml", b"x" * 2048)})
+    assert response.status_code == 413
+
+
+def test_in_flight_budget_returns_503(client, monkeypatch):
+    monkeypatch.setattr(inflight_bytes, "limit", 10)
+    response = client.post("/api/v1/audit", files={"file": ("m.eml", MESSAGE)})
+    assert response.status_code == 503
+    assert response.headers["retry-after"]
+    assert inflight_bytes.used == 0
+
+
+def test_accepted_upload_releases_budget(client):
+    response = client.post("/api/v1/audit", files={"file": ("m.eml", MESSAGE)})
+    assert response.status_code == 200
+    assert inflight_bytes.used == 0
+
+
+def _zip(members):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return data.getvalue()
+
+
+def test_batch_archive_is_extracted_with_a_cap(client, monkeypatch):
+    monkeypatch.setattr(settings, "max_batch_extracted_bytes", 1024 * 1024)
+    # Two megabytes of zeros compress to a few kilobytes.
+    bomb = _zip({"a.eml": b"\0" * (2 * 1024 * 1024)})
+    response = client.post("/api/v1/audit/batch", files={"files": ("bomb.zip", bomb)})
+    assert response.status_code == 413
+
+
+def test_batch_messages_are_read_from_disk_and_removed(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    files = [
+        ("files", ("c.zip", _zip({"f1.eml": MESSAGE, "notes.txt": b"skip"}))),
+        ("files", ("box.mbox", b"From a\n" + MESSAGE + b"From b\n" + MESSAGE)),
+        ("files", ("a.eml", MESSAGE)),
+    ]
+    response = client.post("/api/v1/audit/batch?view=summary", files=files)
+    assert response.status_code == 200
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["filename"] for line in lines) == ["a.eml", "box.mbox#0", "box.mbox#1", "c.zip/f1.eml"]
+    assert all("report" in line for line in lines)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("eml-batch-")]